@@ -4,15 +4,51 @@ NetArchon Command Execution Module
 Framework for executing commands on network devices with proper error handling.
 """
 
+import re
+import select
 import socket
 import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional, Pattern, Tuple, Union
 
-from ..models.connection import ConnectionInfo, CommandResult
+from ..models.connection import ConnectionInfo, ConnectionStatus, CommandResult
 from ..utils.exceptions import CommandExecutionError, TimeoutError
 from ..utils.logger import get_logger
 
+_ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+_WS_RE = re.compile(r'\s+')
+_BLANKLINES_RE = re.compile(r'\n\s*\n\s*\n')
+_CONTROL_CHAR_TABLE = {code: None for code in range(32) if chr(code) not in '\t\n'}
+_CHAIN_META_RE = re.compile(r'[;&|`$<>\n\r"\'\\]')
+
+# Error a network CLI prints for a rejected command while still exiting 0,
+# e.g. "% Invalid input detected at '^' marker." or "% Incomplete command."
+_CLI_ERROR_RE = re.compile(
+    r'(?im)^[ \t]*(%[ \t]*(?:invalid|incomplete|ambiguous|unknown)\b[^\r\n]*|syntax error\b[^\r\n]*)'
+)
+
+_RECV_BUFFER_SIZE = 65536
+_SHELL_WIDTH = 511
+_PROMPT_PROBE_DELAY = 1.0
+
+# Prompt at the end of the buffer when a shell opens, e.g. "router1#",
+# "router1(config-if)#" or "admin@mx1>"; group 1 is the base prompt
+_INITIAL_PROMPT_RE = re.compile(rb'(?:^|[\r\n])([^\r\n#>()\[\]]+)(?:\([^)\r\n]*\))?[#>][ \t]*\Z')
+
+# Configuration line that renames the device, and with it the prompt
+_HOSTNAME_COMMAND_RE = re.compile(rb'(?m)^[ \t]*hostname[ \t]+(\S+)')
+
+
+def _prompt_pattern(*bases: bytes) -> Pattern[bytes]:
+    """Compile a pattern matching prompts with any of ``bases``.
+    
+    Group 1 is the mode part after the base prompt, e.g. ``b"(config-if)#"``.
+    """
+    names = b'|'.join(re.escape(base) for base in bases)
+    return re.compile(rb'(?m)(?:^|(?<=\r))(?:' + names + rb')((?:\([^)\r\n]*\))?[#>])')
+
 
 class CommandExecutor:
     """Main command execution logic for network devices."""
@@ -25,6 +61,7 @@ class CommandExecutor:
         """
         self.default_timeout = default_timeout
         self.logger = get_logger(f"{__name__}.CommandExecutor")
+        self.parser = CommandParser()
     
     def execute_command(self, 
                        connection: ConnectionInfo, 
@@ -52,27 +89,28 @@ class CommandExecutor:
                         command=command,
                         timeout=timeout)
         
-        if not hasattr(connection, '_ssh_client') or not connection._ssh_client:
-            raise CommandExecutionError(f"No active SSH connection for device {connection.device_id}",
-                                      {"device_id": connection.device_id})
+        client = self._get_active_client(connection)
         
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
+        timestamp = datetime.utcnow()
         
         try:
             # Execute command via SSH
-            stdin, stdout, stderr = connection._ssh_client.exec_command(
+            stdin, stdout, stderr = client.exec_command(
                 command, timeout=timeout
             )
             
-            # Read output and error streams
-            output = stdout.read().decode('utf-8', errors='replace')
-            error = stderr.read().decode('utf-8', errors='replace')
+            # Stream output and error from the channel as they arrive
+            channel = stdout.channel
+            out_buf, err_buf = self._read_channel(channel, timeout)
+            output = out_buf.decode('utf-8', errors='replace')
+            error = err_buf.decode('utf-8', errors='replace')
             
             # Calculate execution time
-            execution_time = time.time() - start_time
+            execution_time = (time.monotonic_ns() - start_ns) / 1e9
             
             # Determine success based on exit status
-            exit_status = stdout.channel.recv_exit_status()
+            exit_status = channel.recv_exit_status()
             success = exit_status == 0
             
             # Update connection activity
@@ -83,7 +121,7 @@ class CommandExecutor:
                 output=output,
                 error=error,
                 execution_time=execution_time,
-                timestamp=datetime.utcnow(),
+                timestamp=timestamp,
                 command=command,
                 device_id=connection.device_id
             )
@@ -103,7 +141,7 @@ class CommandExecutor:
             return result
             
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = (time.monotonic_ns() - start_ns) / 1e9
             
             # Handle timeout specifically
             if "timeout" in str(e).lower():
@@ -130,11 +168,153 @@ class CommandExecutor:
                 output="",
                 error=str(e),
                 execution_time=execution_time,
-                timestamp=datetime.utcnow(),
+                timestamp=timestamp,
                 command=command,
                 device_id=connection.device_id
             )
     
+    def _get_active_client(self, connection: ConnectionInfo):
+        """Return the connection's SSH client after checking its transport is alive.
+        
+        Failing fast here avoids blocking for the full command timeout on a
+        connection whose transport has already dropped.
+        
+        Args:
+            connection: Connection to check
+            
+        Returns:
+            The connection's SSH client
+            
+        Raises:
+            CommandExecutionError: If there is no client or its transport is inactive
+        """
+        client = connection._ssh_client
+        if client is None:
+            raise CommandExecutionError(f"No active SSH connection for device {connection.device_id}",
+                                      {"device_id": connection.device_id})
+        
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            connection.set_status(ConnectionStatus.DISCONNECTED)
+            raise CommandExecutionError(f"SSH transport for device {connection.device_id} is no longer active",
+                                      {"device_id": connection.device_id})
+        
+        return client
+    
+    def _read_channel(self, channel, timeout: float) -> Tuple[bytearray, bytearray]:
+        """Drain stdout and stderr from an exec channel until the command exits.
+        
+        Args:
+            channel: Paramiko channel returned by exec_command
+            timeout: Maximum seconds to wait without receiving any data
+            
+        Returns:
+            Tuple of (stdout bytes, stderr bytes)
+            
+        Raises:
+            socket.timeout: If no data arrives within the timeout
+        """
+        out_buf = bytearray()
+        err_buf = bytearray()
+        for chunk in self._iter_channel(channel, timeout, err_buf):
+            out_buf.extend(chunk)
+        return out_buf, err_buf
+    
+    def _iter_channel(self, channel, timeout: float, err_buf: bytearray) -> Iterator[bytes]:
+        """Yield stdout chunks from an exec channel as they arrive until the command exits.
+        
+        Stderr is drained into ``err_buf`` alongside so a chatty stderr cannot
+        stall the channel window.
+        
+        Args:
+            channel: Paramiko channel returned by exec_command
+            timeout: Maximum seconds to wait without receiving any data
+            err_buf: Buffer that receives stderr data
+            
+        Yields:
+            Raw stdout chunks
+            
+        Raises:
+            socket.timeout: If no data arrives within the timeout
+        """
+        while True:
+            received = False
+            if channel.recv_ready():
+                data = channel.recv(_RECV_BUFFER_SIZE)
+                if data:
+                    yield data
+                    received = True
+            if channel.recv_stderr_ready():
+                data = channel.recv_stderr(_RECV_BUFFER_SIZE)
+                if data:
+                    err_buf.extend(data)
+                    received = True
+            if received:
+                continue
+            
+            # Exit status arrives after all data, so check it before re-probing buffers
+            if (channel.exit_status_ready() and not channel.recv_ready()
+                    and not channel.recv_stderr_ready()):
+                return
+            
+            # Block in the kernel until either stream has data or the channel closes
+            readable, _, _ = select.select([channel], [], [], timeout)
+            if not readable:
+                raise socket.timeout(f"Command timeout after {timeout} seconds")
+    
+    def execute_command_stream(self, 
+                               connection: ConnectionInfo, 
+                               command: str, 
+                               timeout: Optional[int] = None) -> Iterator[bytes]:
+        """Execute a command and yield its raw stdout as it arrives.
+        
+        Unlike ``execute_command`` the output is never held in full or
+        decoded, so large outputs can be hashed or written as they stream in.
+        
+        Args:
+            connection: Active connection to the device
+            command: Command to execute
+            timeout: Maximum seconds to wait without receiving any data
+            
+        Yields:
+            Raw stdout chunks
+            
+        Raises:
+            CommandExecutionError: If the command cannot run or exits non-zero
+            TimeoutError: If no data arrives within the timeout
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        
+        self.logger.info(f"Streaming command: {command}", 
+                        device_id=connection.device_id, 
+                        command=command,
+                        timeout=timeout)
+        
+        client = self._get_active_client(connection)
+        err_buf = bytearray()
+        try:
+            stdin, stdout, stderr = client.exec_command(command, timeout=timeout)
+            channel = stdout.channel
+            yield from self._iter_channel(channel, timeout, err_buf)
+            exit_status = channel.recv_exit_status()
+        except socket.timeout as e:
+            raise TimeoutError(f"Command '{command}' timed out after {timeout} seconds",
+                             {"device_id": connection.device_id, 
+                              "command": command, 
+                              "timeout": timeout}) from e
+        except Exception as e:
+            raise CommandExecutionError(f"Command execution failed: {str(e)}",
+                                      {"device_id": connection.device_id, "command": command}) from e
+        
+        connection.update_activity()
+        if exit_status != 0:
+            error = err_buf.decode('utf-8', errors='replace')
+            raise CommandExecutionError(f"Command failed with exit status {exit_status}: {error}",
+                                      {"device_id": connection.device_id, 
+                                       "command": command,
+                                       "exit_status": exit_status})
+    
     def execute_with_privilege(self, 
                               connection: ConnectionInfo, 
                               command: str, 
@@ -161,15 +341,14 @@ class CommandExecutor:
                         device_id=connection.device_id, 
                         command=command)
         
-        if not hasattr(connection, '_ssh_client') or not connection._ssh_client:
-            raise CommandExecutionError(f"No active SSH connection for device {connection.device_id}",
-                                      {"device_id": connection.device_id})
+        client = self._get_active_client(connection)
         
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
+        timestamp = datetime.utcnow()
         
         try:
             # Create interactive shell for privilege escalation
-            shell = connection._ssh_client.invoke_shell()
+            shell = client.invoke_shell()
             shell.settimeout(timeout)
             
             # Wait for initial prompt
@@ -227,31 +406,14 @@ class CommandExecutor:
             # Process output
             full_output = ''.join(output_parts)
             
-            # Clean up output (remove command echo and prompts)
-            lines = full_output.split('\n')
-            cleaned_lines = []
-            skip_next = False
-            
-            for line in lines:
-                if skip_next:
-                    skip_next = False
-                    continue
-                    
-                # Skip command echo
-                if command in line:
-                    skip_next = True
-                    continue
-                    
-                # Skip prompts and enable commands
-                if line.strip().endswith('#') or line.strip().endswith('>'):
-                    continue
-                if 'enable' in line and len(line.strip()) < 10:
-                    continue
-                    
-                cleaned_lines.append(line)
-            
-            cleaned_output = '\n'.join(cleaned_lines).strip()
-            execution_time = time.time() - start_time
+            # Clean up output (remove command echo, prompts and enable echo) in one pass
+            clean_re = re.compile(
+                rf'(?m)^.*{re.escape(command)}.*$\n?'
+                r'|^.*[#>][^\S\n]*$\n?'
+                r'|^[^\S\n]*enable[^\S\n]*$\n?'
+            )
+            cleaned_output = clean_re.sub('', full_output).strip()
+            execution_time = (time.monotonic_ns() - start_ns) / 1e9
             
             # Update connection activity
             connection.update_activity()
@@ -261,7 +423,7 @@ class CommandExecutor:
                 output=cleaned_output,
                 error="",
                 execution_time=execution_time,
-                timestamp=datetime.utcnow(),
+                timestamp=timestamp,
                 command=command,
                 device_id=connection.device_id
             )
@@ -274,7 +436,7 @@ class CommandExecutor:
             return result
             
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = (time.monotonic_ns() - start_ns) / 1e9
             
             self.logger.error(f"Privileged command execution failed: {str(e)}",
                             device_id=connection.device_id,
@@ -287,7 +449,7 @@ class CommandExecutor:
                 output="",
                 error=f"Privileged execution failed: {str(e)}",
                 execution_time=execution_time,
-                timestamp=datetime.utcnow(),
+                timestamp=timestamp,
                 command=command,
                 device_id=connection.device_id
             )
@@ -308,17 +470,64 @@ class CommandExecutor:
         Returns:
             List of CommandResult objects
         """
+        return list(self.iter_execute(connection, commands, timeout, stop_on_error))
+    
+    def iter_execute(self, 
+                     connection: ConnectionInfo, 
+                     commands: List[str],
+                     timeout: Optional[int] = None,
+                     stop_on_error: bool = False) -> Iterator[CommandResult]:
+        """Execute multiple commands sequentially, yielding each result as it completes.
+        
+        Commands rejected by the command parser are reported as failed results
+        without being sent to the device.
+        
+        Args:
+            connection: Active connection to the device
+            commands: List of commands to execute
+            timeout: Command timeout in seconds (uses default if None)
+            stop_on_error: Whether to stop execution on first error
+            
+        Yields:
+            CommandResult for each executed or rejected command
+        """
         self.logger.info(f"Executing {len(commands)} commands",
                         device_id=connection.device_id,
                         command_count=len(commands),
                         stop_on_error=stop_on_error)
         
-        results = []
+        successful = 0
+        failed = 0
+        batch_timestamp = datetime.utcnow()
         
         for i, command in enumerate(commands):
+            if not self.parser.validate_command(command):
+                result = CommandResult(
+                    success=False,
+                    output="",
+                    error="Command rejected by validator",
+                    execution_time=0.0,
+                    timestamp=batch_timestamp,
+                    command=command,
+                    device_id=connection.device_id
+                )
+                failed += 1
+                yield result
+                
+                if stop_on_error:
+                    self.logger.warning(f"Stopping command execution due to rejected command {i+1}",
+                                      device_id=connection.device_id,
+                                      failed_command=command)
+                    break
+                continue
+            
             try:
                 result = self.execute_command(connection, command, timeout)
-                results.append(result)
+                if result.success:
+                    successful += 1
+                else:
+                    failed += 1
+                yield result
                 
                 # Check if we should stop on error
                 if stop_on_error and result.has_error():
@@ -331,16 +540,16 @@ class CommandExecutor:
                     
             except Exception as e:
                 # Create error result
-                error_result = CommandResult(
+                failed += 1
+                yield CommandResult(
                     success=False,
                     output="",
                     error=str(e),
                     execution_time=0.0,
-                    timestamp=datetime.utcnow(),
+                    timestamp=batch_timestamp,
                     command=command,
                     device_id=connection.device_id
                 )
-                results.append(error_result)
                 
                 if stop_on_error:
                     self.logger.error(f"Stopping command execution due to exception in command {i+1}",
@@ -349,14 +558,261 @@ class CommandExecutor:
                                     error=str(e))
                     break
         
-        self.logger.info(f"Completed execution of {len(results)} commands",
+        self.logger.info(f"Completed execution of {successful + failed} commands",
                         device_id=connection.device_id,
-                        successful_commands=sum(1 for r in results if r.success),
-                        failed_commands=sum(1 for r in results if not r.success))
+                        successful_commands=successful,
+                        failed_commands=failed)
+
+    
+    def execute_batch_read(self, 
+                           connection: ConnectionInfo, 
+                           commands: List[str],
+                           timeout: Optional[int] = None) -> List[CommandResult]:
+        """Execute several read-only commands in a single SSH exec round trip.
+        
+        Commands are chained with a unique echoed delimiter, followed by the
+        exit status of the command before it, and the combined output is
+        split back into one result per command. A command fails if its exit
+        status is non-zero or its output contains a CLI error such as
+        "% Invalid input"; network CLIs often exit 0 or do not expand the
+        status at all. If any command cannot be chained safely, or the output
+        cannot be split cleanly, the commands are executed one at a time
+        instead.
         
+        Args:
+            connection: Active connection to the device
+            commands: Read-only commands to execute
+            timeout: Command timeout in seconds (uses default if None)
+            
+        Returns:
+            List of CommandResult objects in the same order as commands
+        """
+        if len(commands) < 2:
+            return self.execute_commands(connection, commands, timeout)
+        
+        delimiter = f"===NETARCHON_DELIM_{uuid.uuid4().hex}==="
+        if not all(self.parser.is_chainable(command, delimiter) for command in commands):
+            self.logger.debug("Batch contains commands that cannot be chained, executing sequentially",
+                            device_id=connection.device_id)
+            return self.execute_commands(connection, commands, timeout)
+        
+        joined = f' ; echo "{delimiter}" $? ; '.join(commands)
+        batch_result = self.execute_command(connection, joined, timeout)
+        
+        # Splitting on a capturing pattern interleaves each command's output
+        # with the exit status echoed after it
+        parts = re.split(rf'\r?\n?{delimiter}[ \t]*(\S*)\r?\n?', batch_result.output)
+        outputs = parts[0::2]
+        if len(outputs) != len(commands):
+            self.logger.warning("Batch output could not be split per command, executing sequentially",
+                              device_id=connection.device_id,
+                              expected=len(commands),
+                              received=len(outputs))
+            return self.execute_commands(connection, commands, timeout)
+        
+        self.logger.debug(f"Executed {len(commands)} commands in one round trip",
+                        device_id=connection.device_id,
+                        execution_time=batch_result.execution_time)
+        
+        # The last command has no delimiter after it, so the exec exit status is
+        # its own; an unexpanded status such as a literal "$?" counts as success
+        # and leaves only the CLI error check
+        statuses = [not status.isdigit() or status == '0' for status in parts[1::2]]
+        statuses.append(batch_result.success)
+        errors = [""] * (len(commands) - 1) + [batch_result.error]
+        
+        results = []
+        for command, output, status_ok, error in zip(commands, outputs, statuses, errors):
+            cli_error = _CLI_ERROR_RE.search(output)
+            if cli_error and not error:
+                error = cli_error.group(1).strip()
+            results.append(CommandResult(
+                success=status_ok and cli_error is None,
+                output=output,
+                error=error,
+                execution_time=batch_result.execution_time,
+                timestamp=batch_result.timestamp,
+                command=command,
+                device_id=connection.device_id
+            ))
         return results
 
 
+    @contextmanager
+    def session(self, 
+                connection: ConnectionInfo, 
+                timeout: Optional[int] = None) -> Iterator["ShellSession"]:
+        """Open one interactive shell channel for a sequence of commands.
+        
+        Mode changes such as entering configuration mode persist across
+        commands sent through the session, and no channel is set up per
+        command. The channel is closed when the context exits.
+        
+        Args:
+            connection: Active connection to the device
+            timeout: Seconds to wait for each prompt (uses default if None)
+            
+        Yields:
+            ShellSession positioned at the device prompt
+            
+        Raises:
+            CommandExecutionError: If the shell cannot be opened
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        
+        client = self._get_active_client(connection)
+        channel = client.invoke_shell(width=_SHELL_WIDTH)
+        self.logger.debug("Opened shell session", device_id=connection.device_id)
+        try:
+            session = ShellSession(channel, connection.device_id, timeout)
+            session.find_prompt()
+            yield session
+        finally:
+            channel.close()
+            connection.update_activity()
+
+
+class ShellSession:
+    """Interactive shell channel that is kept open across several commands."""
+    
+    def __init__(self, channel, device_id: str, timeout: float):
+        """Initialize shell session.
+        
+        Args:
+            channel: Paramiko channel returned by invoke_shell
+            device_id: Device the channel belongs to
+            timeout: Default seconds to wait for expected output
+        """
+        self.channel = channel
+        self.device_id = device_id
+        self.timeout = timeout
+        self.prompt_re: Optional[Pattern[bytes]] = None
+        self.base_prompt: Optional[bytes] = None
+        self.prompt_mode: Optional[bytes] = None
+        self._initial_mode: Optional[bytes] = None
+        self._buffer = bytearray()
+    
+    def send(self, data: Union[str, bytes]) -> None:
+        """Send raw data to the shell.
+        
+        Args:
+            data: Text or bytes to send
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.channel.sendall(data)
+    
+    def expect(self, 
+               pattern: Pattern[bytes], 
+               count: int = 1, 
+               timeout: Optional[float] = None) -> bytes:
+        """Read until ``pattern`` has matched ``count`` times.
+        
+        Data after the last match stays buffered for the next call.
+        
+        Args:
+            pattern: Compiled bytes pattern to wait for
+            count: Number of matches to wait for
+            timeout: Maximum seconds to wait without receiving any data
+            
+        Returns:
+            Received data up to and including the last match
+            
+        Raises:
+            TimeoutError: If no data arrives within the timeout
+            CommandExecutionError: If the channel closes first
+        """
+        if timeout is None:
+            timeout = self.timeout
+        
+        pos = 0
+        found = 0
+        while True:
+            # Resume after the last complete match so a prompt split across
+            # reads is rescanned once the rest of it arrives
+            while found < count:
+                match = pattern.search(self._buffer, pos)
+                if not match:
+                    break
+                found += 1
+                pos = match.end()
+            if found >= count:
+                data = bytes(self._buffer[:pos])
+                del self._buffer[:pos]
+                return data
+            
+            readable, _, _ = select.select([self.channel], [], [], timeout)
+            if not readable:
+                raise TimeoutError(f"Timed out after {timeout} seconds waiting for shell output",
+                                 {"device_id": self.device_id, "timeout": timeout})
+            data = self.channel.recv(_RECV_BUFFER_SIZE)
+            if not data:
+                raise CommandExecutionError(f"Shell channel closed for device {self.device_id}",
+                                          {"device_id": self.device_id})
+            self._buffer.extend(data)
+    
+    def find_prompt(self) -> bytes:
+        """Wait for the device prompt and learn the pattern for later prompts.
+        
+        Returns:
+            Base prompt, e.g. ``b"router1"``
+        """
+        try:
+            match_data = self.expect(_INITIAL_PROMPT_RE, timeout=min(self.timeout, _PROMPT_PROBE_DELAY))
+        except TimeoutError:
+            # Some devices only print a prompt once they see input
+            self.send(b"\n")
+            match_data = self.expect(_INITIAL_PROMPT_RE)
+        
+        base = _INITIAL_PROMPT_RE.search(match_data).group(1).strip()
+        self.base_prompt = base
+        self.prompt_re = _prompt_pattern(base)
+        self.prompt_mode = self._initial_mode = self.prompt_re.search(match_data).group(1)
+        return base
+    
+    @property
+    def in_initial_mode(self) -> bool:
+        """Whether the last prompt shows the mode the session started in."""
+        return self.prompt_mode == self._initial_mode
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> str:
+        """Send a command and return everything the device prints until it is done.
+        
+        Multi-line commands are sent in one write and complete once a prompt
+        has been seen for every line. A ``hostname`` line changes the prompt
+        the device prints, so prompts with either name are accepted and the
+        new name is used from then on.
+        
+        Args:
+            command: Command, or newline-separated commands, to send
+            timeout: Maximum seconds to wait without receiving any data
+            
+        Returns:
+            Decoded output including echoed commands and prompts
+        """
+        if self.prompt_re is None:
+            self.find_prompt()
+        data = (command + '\n').encode('utf-8')
+        
+        prompt_re = self.prompt_re
+        renames = _HOSTNAME_COMMAND_RE.findall(data)
+        if renames:
+            prompt_re = _prompt_pattern(self.base_prompt, *renames)
+        
+        self.send(data)
+        output = self.expect(prompt_re, count=command.count('\n') + 1, timeout=timeout)
+        
+        if renames:
+            self.base_prompt = renames[-1]
+            self.prompt_re = _prompt_pattern(self.base_prompt)
+        last_prompt = None
+        for last_prompt in prompt_re.finditer(output):
+            pass
+        self.prompt_mode = last_prompt.group(1)
+        return output.decode('utf-8', errors='replace')
+
+
 class CommandParser:
     """Parses and validates commands before execution."""
     
@@ -369,6 +825,15 @@ class CommandParser:
             'reload', 'reboot', 'shutdown', 'erase', 'format', 'delete',
             'clear', 'reset', 'factory-reset', 'write erase'
         }
+        self.suspicious_patterns = ['rm -rf', 'dd if=', '> /dev/', 'mkfs']
+        
+        # Single alternations so validation is one scan instead of one per keyword.
+        # Dangerous commands match as whole words at the start of the command, so
+        # read-only commands such as "show system information" are not refused
+        # for containing "format"
+        dangerous = sorted(self.dangerous_commands, key=len, reverse=True)
+        self._danger_re = re.compile(rf"^\s*(?:{'|'.join(map(re.escape, dangerous))})\b")
+        self._suspicious_re = re.compile('|'.join(map(re.escape, self.suspicious_patterns)))
     
     def validate_command(self, command: str) -> bool:
         """Validate command for safety and syntax.
@@ -386,11 +851,11 @@ class CommandParser:
         command_lower = command.lower().strip()
         
         # Check for dangerous commands
-        for dangerous in self.dangerous_commands:
-            if dangerous in command_lower:
-                self.logger.warning(f"Potentially dangerous command rejected: {command}",
-                                  dangerous_pattern=dangerous)
-                return False
+        match = self._danger_re.match(command_lower)
+        if match:
+            self.logger.warning(f"Potentially dangerous command rejected: {command}",
+                              dangerous_pattern=match.group(0))
+            return False
         
         # Basic syntax validation
         if len(command) > 1000:  # Arbitrary length limit
@@ -398,12 +863,30 @@ class CommandParser:
             return False
         
         # Check for suspicious patterns
-        suspicious_patterns = ['rm -rf', 'dd if=', '> /dev/', 'mkfs']
-        for pattern in suspicious_patterns:
-            if pattern in command_lower:
-                self.logger.warning(f"Suspicious command pattern rejected: {command}",
-                                  pattern=pattern)
-                return False
+        match = self._suspicious_re.search(command_lower)
+        if match:
+            self.logger.warning(f"Suspicious command pattern rejected: {command}",
+                              pattern=match.group(0))
+            return False
+        
+        return True
+    
+    def is_chainable(self, command: str, delimiter: str) -> bool:
+        """Check whether a command can be safely chained into a batched exec.
+        
+        Args:
+            command: Command to check
+            delimiter: Delimiter used to separate command outputs
+            
+        Returns:
+            True if the command is valid and contains no chaining metacharacters
+        """
+        if not self.validate_command(command):
+            return False
+        
+        if delimiter in command or _CHAIN_META_RE.search(command):
+            self.logger.debug(f"Command cannot be chained: {command}")
+            return False
         
         return True
     
@@ -423,11 +906,10 @@ class CommandParser:
         sanitized = command.strip()
         
         # Remove multiple consecutive spaces
-        import re
-        sanitized = re.sub(r'\s+', ' ', sanitized)
+        sanitized = _WS_RE.sub(' ', sanitized)
         
         # Remove null bytes and other control characters
-        sanitized = ''.join(char for char in sanitized if ord(char) >= 32 or char in '\t\n')
+        sanitized = sanitized.translate(_CONTROL_CHAR_TABLE)
         
         self.logger.debug(f"Command sanitized",
                          original_length=len(command),
@@ -470,9 +952,6 @@ class ResponseProcessor:
         )
         
         # Add metadata based on command type
-        if not hasattr(enhanced_result, 'additional_data'):
-            enhanced_result.additional_data = {}
-        
         enhanced_result.additional_data.update(
             self._extract_metadata(result.command, cleaned_output)
         )
@@ -491,17 +970,14 @@ class ResponseProcessor:
         if not output:
             return ""
         
-        import re
-        
         # Remove ANSI escape sequences
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        cleaned = ansi_escape.sub('', output)
+        cleaned = _ANSI_RE.sub('', output)
         
         # Remove carriage returns
         cleaned = cleaned.replace('\r', '')
         
         # Remove excessive blank lines
-        cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)
+        cleaned = _BLANKLINES_RE.sub('\n\n', cleaned)
         
         # Strip leading/trailing whitespace
         cleaned = cleaned.strip()
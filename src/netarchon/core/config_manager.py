@@ -4,73 +4,514 @@ NetArchon Configuration Management Module
 Safe configuration backup, deployment, and rollback for network devices.
 """
 
+import asyncio
+import difflib
 import hashlib
+import itertools
+import mmap
 import os
+import re
+import sqlite3
+import threading
 import time
+import weakref
+import zlib
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from ..models.connection import ConnectionInfo, CommandResult
 from ..models.device import DeviceType
-from ..utils.exceptions import ConfigurationError
+from ..utils.exceptions import ConfigurationError, NetArchonError
 from ..utils.logger import get_logger
 from .command_executor import CommandExecutor
 
+# Optional SIMD/multithreaded hashing for large configurations
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Optional zstd compression of stored backups
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_CHECKSUM_DIGEST_SIZE = 16
+_CHECKSUM_ALGORITHM = 'blake3' if BLAKE3_AVAILABLE else 'blake2b'
+_BACKUP_WRITE_BUFFER = 1 << 20
+_DIRECT_IO_ALIGNMENT = 4096
+_DEFAULT_CONCURRENCY = 32
+_CONNECTIVITY_TTL = 2.0
+_BACKUP_SEPARATOR = b"# " + b"=" * 50 + b"\n"
+_COMPRESSION_SUFFIXES = {'zstd': '.zst', 'zlib': '.z'}
+_BACKUP_EXTENSIONS = tuple(ext + suffix for ext in ('.txt', '.patch')
+                           for suffix in ('', *_COMPRESSION_SUFFIXES.values()))
+_ZSTD_LEVEL = 3
+_BACKUP_HEADER_TEMPLATE = (
+    "# NetArchon Configuration Backup\n"
+    "# Device: {device}\n"
+    "# Timestamp: {timestamp}\n"
+    "# Reason: {reason}\n"
+    "# Checksum: {checksum}\n"
+    "# Checksum-Algorithm: {algorithm}\n"
+    "# Command: {command}\n"
+)
+_INDEX_FILENAME = 'index.sqlite'
+_INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS backups (
+        path TEXT PRIMARY KEY,
+        device TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        algorithm TEXT,
+        base TEXT,
+        depth INTEGER NOT NULL DEFAULT 0,
+        reason TEXT,
+        config_offset INTEGER NOT NULL,
+        compression TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_backups_device_ts ON backups (device, ts);
+    CREATE INDEX IF NOT EXISTS idx_backups_checksum ON backups (checksum);
+"""
+_INDEX_INSERT = (
+    "INSERT OR REPLACE INTO backups "
+    "(path, device, ts, checksum, algorithm, base, depth, reason, config_offset, compression) "
+    "VALUES (:path, :device, :ts, :checksum, :algorithm, :base, :depth, :reason, "
+    ":config_offset, :compression)"
+)
+_DELTA_HEADER_TEMPLATE = "# Base: {base}\n# Delta-Depth: {depth}\n"
+
+_VERSION_RE = re.compile(r'version', re.IGNORECASE)
+_HOSTNAME_RE = re.compile(r'hostname', re.IGNORECASE)
+# Errors a device prints for a rejected configuration line; other '%' lines
+# are informational or warning notices and do not fail a deployment
+_CONFIG_ERROR_RE = re.compile(
+    r'(?im)^[ \t]*%[ \t]*(?:invalid|incomplete|ambiguous|unknown)\b.*$|invalid input.*$'
+)
+
+
+def _compress(data: bytes, compression: Optional[str]) -> bytes:
+    """Compress a stored backup body with the given method (None stores it as-is)."""
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    if compression == 'zlib':
+        return zlib.compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    """Reverse ``_compress`` for a stored backup body.
+    
+    Raises:
+        ConfigurationError: If the method is unknown or unavailable
+    """
+    if not compression:
+        return data
+    if compression == 'zstd' and ZSTD_AVAILABLE:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    raise ConfigurationError(f"Cannot decompress backup stored with '{compression}'")
+
+
+def _iter_config_lines(config_content: str) -> Iterator[str]:
+    """Yield stripped, non-empty configuration lines, skipping '#' comment lines.
+    
+    Stripping through map() keeps the per-line work in C; comments are
+    recognised after stripping, so indented '#' lines are skipped too. A
+    trailing ``end``, which every IOS running-config has, is dropped so
+    leaving configuration mode stays with apply_config.
+    """
+    lines = (line for line in map(str.strip, config_content.splitlines())
+             if line and line[0] != '#')
+    previous = next(lines, None)
+    for line in lines:
+        yield previous
+        previous = line
+    if previous is not None and previous != 'end':
+        yield previous
+
+
+def _config_errors(batch: Sequence[str], output: str) -> List[Tuple[str, str]]:
+    """Match each device error in a batch's shell output to the line that caused it.
+    
+    The shell echoes every line as the device reads it, so an error belongs
+    to the last batch line echoed before it. Errors seen before any line is
+    echoed are attributed to the first line of the batch.
+    
+    Args:
+        batch: Configuration lines sent in one write
+        output: Shell output for the batch, including echoed lines and prompts
+        
+    Returns:
+        List of (configuration line, error message) tuples
+    """
+    errors = []
+    current = batch[0]
+    pending = 0
+    for output_line in output.splitlines():
+        output_line = output_line.rstrip()
+        if pending < len(batch) and output_line.endswith(batch[pending]):
+            current = batch[pending]
+            pending += 1
+            continue
+        match = _CONFIG_ERROR_RE.search(output_line)
+        if match:
+            errors.append((current, match.group(0).strip()))
+    return errors
+
+
+@dataclass(frozen=True)
+class CmdSet:
+    """Configuration commands for a device type."""
+    __slots__ = ('show_config', 'save_config', 'configure_mode', 'exit_config', 'reload')
+    
+    show_config: str
+    save_config: str
+    configure_mode: str
+    exit_config: str
+    reload: str
+
 
 class ConfigManager:
     """Main configuration management logic for network devices."""
     
-    def __init__(self, backup_directory: str = "backups"):
+    # Device-specific configuration commands, shared by all instances
+    cmd_for: Dict[DeviceType, CmdSet] = {
+        DeviceType.CISCO_IOS: CmdSet(
+            show_config='show running-config',
+            save_config='copy running-config startup-config',
+            configure_mode='configure terminal',
+            exit_config='end',
+            reload='reload'
+        ),
+        DeviceType.CISCO_NXOS: CmdSet(
+            show_config='show running-config',
+            save_config='copy running-config startup-config',
+            configure_mode='configure terminal',
+            exit_config='end',
+            reload='reload'
+        ),
+        DeviceType.JUNIPER_JUNOS: CmdSet(
+            show_config='show configuration',
+            save_config='commit',
+            configure_mode='configure',
+            exit_config='exit',
+            reload='request system reboot'
+        ),
+        DeviceType.ARISTA_EOS: CmdSet(
+            show_config='show running-config',
+            save_config='copy running-config startup-config',
+            configure_mode='configure terminal',
+            exit_config='end',
+            reload='reload'
+        ),
+        DeviceType.GENERIC: CmdSet(
+            show_config='show running-config',
+            save_config='write memory',
+            configure_mode='configure terminal',
+            exit_config='end',
+            reload='reload'
+        )
+    }
+    
+    def __init__(self, backup_directory: str = "backups", apply_batch_size: int = 500,
+                 max_delta_chain: int = 10, direct_io: bool = False,
+                 compression: Optional[str] = None):
         """Initialize configuration manager.
         
         Args:
             backup_directory: Directory to store configuration backups
+            apply_batch_size: Maximum configuration lines sent per command during apply
+            max_delta_chain: Maximum delta backups stored after a full backup
+                before a new full backup is written; 0 disables delta backups
+            direct_io: Write backups with O_DIRECT, bypassing the page cache,
+                where the platform and filesystem support it
+            compression: Compress stored configurations with 'zstd' (requires
+                the optional ``zstandard`` package) or 'zlib'; None disables it
         """
+        if apply_batch_size < 1:
+            raise ValueError("apply_batch_size must be at least 1")
+        if max_delta_chain < 0:
+            raise ValueError("max_delta_chain must not be negative")
+        if compression not in (None, *_COMPRESSION_SUFFIXES):
+            raise ValueError(f"Unsupported backup compression: {compression}")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        
         self.backup_directory = backup_directory
+        self.apply_batch_size = apply_batch_size
+        self.max_delta_chain = max_delta_chain
+        self.direct_io = direct_io and hasattr(os, 'O_DIRECT')
+        self.compression = compression
         self.logger = get_logger(f"{__name__}.ConfigManager")
         self.command_executor = CommandExecutor()
         
-        # Device-specific configuration commands
-        self.config_commands = {
-            DeviceType.CISCO_IOS: {
-                'show_config': 'show running-config',
-                'save_config': 'copy running-config startup-config',
-                'configure_mode': 'configure terminal',
-                'exit_config': 'exit',
-                'reload': 'reload'
-            },
-            DeviceType.CISCO_NXOS: {
-                'show_config': 'show running-config',
-                'save_config': 'copy running-config startup-config',
-                'configure_mode': 'configure terminal',
-                'exit_config': 'exit',
-                'reload': 'reload'
-            },
-            DeviceType.JUNIPER_JUNOS: {
-                'show_config': 'show configuration',
-                'save_config': 'commit',
-                'configure_mode': 'configure',
-                'exit_config': 'exit',
-                'reload': 'request system reboot'
-            },
-            DeviceType.ARISTA_EOS: {
-                'show_config': 'show running-config',
-                'save_config': 'copy running-config startup-config',
-                'configure_mode': 'configure terminal',
-                'exit_config': 'exit',
-                'reload': 'reload'
-            },
-            DeviceType.GENERIC: {
-                'show_config': 'show running-config',
-                'save_config': 'write memory',
-                'configure_mode': 'configure terminal',
-                'exit_config': 'exit',
-                'reload': 'reload'
-            }
-        }
+        # Device-specific configuration commands as nested dicts, kept for
+        # callers that look commands up by key; this class uses cmd_for
+        self.config_commands = {device_type: asdict(commands)
+                                for device_type, commands in self.cmd_for.items()}
         
         # Ensure backup directory exists
         os.makedirs(self.backup_directory, exist_ok=True)
+        
+        # Latest backup checksum/path/delta depth per device, used to skip
+        # unchanged backups and to decide when to write a new full backup
+        self._last_hash: Dict[str, str] = {}
+        self._last_path: Dict[str, str] = {}
+        self._last_depth: Dict[str, int] = {}
+        # Every stored config per device by checksum -> (path, delta depth), so a
+        # config seen before is stored as a reference to the earlier backup
+        self._content_index: Dict[str, Dict[str, Tuple[str, int]]] = {}
+        
+        # Monotonic time of the last successful command per device, letting a
+        # pre-deployment connectivity probe reuse a command that just succeeded
+        self._last_reachable: Dict[str, float] = {}
+        
+        # SQLite index of backup metadata and config offsets, shared by the
+        # worker threads used for concurrent backups
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.backup_directory, _INDEX_FILENAME),
+                                   isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_INDEX_SCHEMA)
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(backups)")}
+        if 'compression' not in columns:
+            self._db.execute("ALTER TABLE backups ADD COLUMN compression TEXT")
+        # Closes the index if the manager is garbage collected without close()
+        self._db_finalizer = weakref.finalize(self, self._db.close)
+        self._load_backup_index()
+    
+    def close(self) -> None:
+        """Close the backup index database. Calling it again has no effect."""
+        with self._db_lock:
+            self._db_finalizer()
+    
+    def __enter__(self) -> "ConfigManager":
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Context manager exit; closes the backup index database."""
+        self.close()
+    
+    def _load_backup_index(self) -> None:
+        """Populate the last-backup caches from the SQLite index.
+        
+        Backup files missing from the index (e.g. written before it existed)
+        have their headers parsed once and are added; index rows whose file
+        has been removed are dropped.
+        """
+        with self._db_lock:
+            indexed = {row['path']: row for row in self._db.execute("SELECT * FROM backups")}
+        
+        # Runs over every backup on disk, so bind the path helpers locally
+        join = os.path.join
+        on_disk = set()
+        for entry in os.scandir(self.backup_directory):
+            if not entry.is_dir():
+                continue
+            prefix = f"{entry.name}_config_"
+            on_disk.update(join(entry.name, name) for name in os.listdir(entry.path)
+                           if name.startswith(prefix) and name.endswith(_BACKUP_EXTENSIONS))
+        
+        new_rows = []
+        for rel_path in on_disk:
+            if rel_path not in indexed:
+                row = self._index_row_from_file(rel_path)
+                if row:
+                    new_rows.append(row)
+                    indexed[rel_path] = row
+        
+        stale = [(path,) for path in indexed.keys() - on_disk]
+        with self._db_lock:
+            if new_rows:
+                self._db.executemany(_INDEX_INSERT, new_rows)
+            if stale:
+                self._db.executemany("DELETE FROM backups WHERE path = ?", stale)
+        
+        # Filenames embed the timestamp, so path order is backup order per device
+        backup_directory = self.backup_directory
+        index_content = self._index_content
+        for rel_path in sorted(on_disk & indexed.keys()):
+            row = indexed[rel_path]
+            path = join(backup_directory, rel_path)
+            device_id = row['device']
+            index_content(device_id, row['checksum'], path, row['depth'])
+            self._last_hash[device_id] = row['checksum']
+            self._last_path[device_id] = path
+            self._last_depth[device_id] = row['depth']
+    
+    def _index_row_from_file(self, rel_path: str) -> Optional[Dict]:
+        """Build an index row by parsing a backup file's header.
+        
+        Args:
+            rel_path: Backup path relative to the backup directory
+            
+        Returns:
+            Index row or None if the file is not a valid backup
+        """
+        try:
+            with open(os.path.join(self.backup_directory, rel_path), 'rb') as f:
+                head = f.read(4096)
+                while _BACKUP_SEPARATOR not in head:
+                    chunk = f.read(4096)
+                    if not chunk:
+                        return None
+                    head += chunk
+        except OSError:
+            return None
+        
+        separator = head.find(_BACKUP_SEPARATOR)
+        metadata = self._parse_backup_header(
+            head[:separator].decode('utf-8', errors='replace').splitlines())
+        if not metadata.get('Checksum'):
+            return None
+        
+        config_offset = separator + len(_BACKUP_SEPARATOR)
+        if head[config_offset:config_offset + 1] == b"\n":
+            config_offset += 1
+        return {
+            'path': rel_path,
+            'device': os.path.dirname(rel_path),
+            'ts': metadata.get('Timestamp', ''),
+            'checksum': metadata['Checksum'],
+            'algorithm': metadata.get('Checksum-Algorithm'),
+            'base': metadata.get('Base'),
+            'depth': int(metadata.get('Delta-Depth', 0)),
+            'reason': metadata.get('Reason'),
+            'config_offset': config_offset,
+            'compression': metadata.get('Compression'),
+        }
+    
+    def list_backups(self, device_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """List a device's backups from the index, newest first.
+        
+        Args:
+            device_id: Device to list backups for
+            limit: Maximum number of backups to return
+            
+        Returns:
+            List of dictionaries with path, timestamp, checksum, reason and
+            whether the backup is stored as a delta
+        """
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT path, ts, checksum, reason, base FROM backups "
+                "WHERE device = ? ORDER BY path DESC LIMIT ?",
+                (device_id, -1 if limit is None else limit)).fetchall()
+        return [
+            {
+                'path': os.path.join(self.backup_directory, row['path']),
+                'timestamp': row['ts'],
+                'checksum': row['checksum'],
+                'reason': row['reason'],
+                'is_delta': row['base'] is not None,
+            }
+            for row in rows
+        ]
+    
+    def _lookup_backup(self, backup_path: str) -> Optional[sqlite3.Row]:
+        """Return the index row for a backup path, if it is indexed."""
+        rel_path = os.path.relpath(os.path.abspath(backup_path), os.path.abspath(self.backup_directory))
+        with self._db_lock:
+            return self._db.execute("SELECT * FROM backups WHERE path = ?", (rel_path,)).fetchone()
+    
+    def _index_content(self, device_id: str, checksum: str, path: str, depth: int) -> None:
+        """Record a stored config, keeping the backup cheapest to reconstruct."""
+        device_index = self._content_index.setdefault(device_id, {})
+        known = device_index.get(checksum)
+        if known is None or depth < known[1]:
+            device_index[checksum] = (path, depth)
+    
+    def _read_backup_header(self, backup_path: str) -> Dict[str, str]:
+        """Read the metadata fields recorded in a backup file's header.
+        
+        Args:
+            backup_path: Path to the backup file
+            
+        Returns:
+            Dictionary of header field names to values (empty if unreadable)
+        """
+        try:
+            with open(backup_path, 'r', errors='replace') as f:
+                return self._parse_backup_header(
+                    itertools.takewhile(lambda line: line.startswith('#')
+                                        and not line.startswith('# ' + '='*50), f))
+        except OSError:
+            return {}
+    
+    @staticmethod
+    def _parse_backup_header(lines) -> Dict[str, str]:
+        """Parse ``# Key: value`` metadata lines into a dictionary."""
+        metadata = {}
+        for line in lines:
+            key, sep, value = line[2:].partition(': ')
+            if sep:
+                metadata[key] = value.strip()
+        return metadata
+    
+    def _new_config_hasher(self):
+        """Create an incremental hasher for configuration content.
+        
+        Uses BLAKE3 when the optional ``blake3`` package is installed and
+        falls back to the stdlib BLAKE2b otherwise; both produce a
+        16-byte digest.
+        """
+        if BLAKE3_AVAILABLE:
+            return blake3.blake3()
+        return hashlib.blake2b(digest_size=_CHECKSUM_DIGEST_SIZE)
+    
+    def _config_checksum(self, config_bytes: bytes) -> str:
+        """Calculate the checksum of encoded configuration content.
+        
+        Args:
+            config_bytes: UTF-8 encoded configuration
+            
+        Returns:
+            Hex digest of the configuration
+        """
+        hasher = self._new_config_hasher()
+        hasher.update(config_bytes)
+        return self._hexdigest(hasher)
+    
+    @staticmethod
+    def _hexdigest(hasher) -> str:
+        """Return the hex digest of a hasher from ``_new_config_hasher``."""
+        if BLAKE3_AVAILABLE:
+            return hasher.hexdigest(length=_CHECKSUM_DIGEST_SIZE)
+        return hasher.hexdigest()
+    
+    def _fetch_config(self, connection: ConnectionInfo, show_config_cmd: str) -> Tuple[bytes, str]:
+        """Stream the device configuration, hashing it as chunks arrive.
+        
+        The raw output is never decoded to a str, so only the received bytes
+        are held in memory.
+        
+        Args:
+            connection: Active connection to the device
+            show_config_cmd: Command that prints the configuration
+            
+        Returns:
+            Tuple of (raw configuration bytes, checksum)
+            
+        Raises:
+            ConfigurationError: If the configuration cannot be retrieved
+        """
+        hasher = self._new_config_hasher()
+        chunks = []
+        try:
+            for chunk in self.command_executor.execute_command_stream(connection, show_config_cmd):
+                hasher.update(chunk)
+                chunks.append(chunk)
+        except NetArchonError as e:
+            raise ConfigurationError(f"Failed to retrieve configuration: {e}") from e
+        return b"".join(chunks), self._hexdigest(hasher)
     
     def backup_config(self, connection: ConnectionInfo, reason: str = "Manual backup") -> Optional[str]:
         """Create a backup of the current device configuration.
@@ -91,37 +532,94 @@ class ConfigManager:
         try:
             # Get device type from connection or default to generic
             device_type = getattr(connection, 'device_type', DeviceType.GENERIC)
-            show_config_cmd = self.config_commands[device_type]['show_config']
+            show_config_cmd = self.cmd_for[device_type].show_config
             
-            # Execute show config command
-            result = self.command_executor.execute_command(connection, show_config_cmd)
+            # Stream the configuration, checksumming it on the way in
+            config_bytes, checksum = self._fetch_config(connection, show_config_cmd)
+            self._last_reachable[connection.device_id] = time.monotonic()
             
-            if not result.success:
-                raise ConfigurationError(f"Failed to retrieve configuration: {result.error}")
+            # Skip the write if nothing changed
+            last_path = self._last_path.get(connection.device_id)
+            if (self._last_hash.get(connection.device_id) == checksum
+                    and last_path and os.path.exists(last_path)):
+                self.logger.info(f"Configuration unchanged, reusing backup: {last_path}",
+                               device_id=connection.device_id,
+                               backup_path=last_path,
+                               checksum=checksum)
+                return last_path
             
-            # Generate backup filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{connection.device_id}_config_{timestamp}.txt"
+            # Generate backup filename with timestamp; microseconds keep quick
+            # successive backups from overwriting a file a delta is based on
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S_%f")
             backup_path = os.path.join(self.backup_directory, connection.device_id)
             
             # Ensure device-specific backup directory exists
             os.makedirs(backup_path, exist_ok=True)
+            
+            # Store a delta against the previous backup while the chain is short
+            # and the delta is actually smaller than the full configuration. A
+            # config identical to an older backup is stored as a reference to it.
+            delta = None
+            base_path = last_path
+            depth = self._last_depth.get(connection.device_id, 0) + 1
+            known = self._content_index.get(connection.device_id, {}).get(checksum)
+            if known and known[1] < self.max_delta_chain and os.path.exists(known[0]):
+                base_path, depth = known[0], known[1] + 1
+            
+            if base_path and depth <= self.max_delta_chain and os.path.exists(base_path):
+                try:
+                    delta = self._encode_delta(self._materialize(base_path), config_bytes)
+                except (OSError, ConfigurationError) as e:
+                    self.logger.warning(f"Cannot read previous backup, writing full backup: {e}",
+                                      device_id=connection.device_id, backup_path=base_path)
+                if delta is not None and len(delta) >= len(config_bytes):
+                    delta = None
+            
+            extension = '.patch' if delta is not None else '.txt'
+            if self.compression:
+                extension += _COMPRESSION_SUFFIXES[self.compression]
+            filename = f"{connection.device_id}_config_{timestamp}{extension}"
             full_path = os.path.join(backup_path, filename)
             
-            # Calculate configuration checksum
-            config_content = result.output
-            checksum = hashlib.md5(config_content.encode()).hexdigest()
-            
-            # Write backup file with metadata
-            with open(full_path, 'w') as f:
-                f.write(f"# NetArchon Configuration Backup\n")
-                f.write(f"# Device: {connection.device_id}\n")
-                f.write(f"# Timestamp: {datetime.now().isoformat()}\n")
-                f.write(f"# Reason: {reason}\n")
-                f.write(f"# Checksum: {checksum}\n")
-                f.write(f"# Command: {show_config_cmd}\n")
-                f.write("# " + "="*50 + "\n\n")
-                f.write(config_content)
+            # Write backup file with metadata; the encoded bytes used for the
+            # checksum are written as-is so the config is only encoded once
+            header = _BACKUP_HEADER_TEMPLATE.format(
+                device=connection.device_id,
+                timestamp=now.isoformat(),
+                reason=reason,
+                checksum=checksum,
+                algorithm=_CHECKSUM_ALGORITHM,
+                command=show_config_cmd
+            )
+            if delta is not None:
+                header += _DELTA_HEADER_TEMPLATE.format(base=os.path.basename(base_path), depth=depth)
+            if self.compression:
+                header += f"# Compression: {self.compression}\n"
+            header = header.encode() + _BACKUP_SEPARATOR + b"\n"
+            
+            body = config_bytes if delta is None else delta
+            self._write_backup(full_path, header, _compress(body, self.compression))
+            
+            with self._db_lock:
+                self._db.execute(_INDEX_INSERT, {
+                    'path': os.path.join(connection.device_id, filename),
+                    'device': connection.device_id,
+                    'ts': now.isoformat(),
+                    'checksum': checksum,
+                    'algorithm': _CHECKSUM_ALGORITHM,
+                    'base': os.path.basename(base_path) if delta is not None else None,
+                    'depth': depth if delta is not None else 0,
+                    'reason': reason,
+                    'config_offset': len(header),
+                    'compression': self.compression,
+                })
+            
+            self._last_hash[connection.device_id] = checksum
+            self._last_path[connection.device_id] = full_path
+            self._last_depth[connection.device_id] = depth if delta is not None else 0
+            self._index_content(connection.device_id, checksum, full_path,
+                                self._last_depth[connection.device_id])
             
             self.logger.info(f"Configuration backup completed: {full_path}",
                            device_id=connection.device_id, 
@@ -135,6 +633,318 @@ class ConfigManager:
             self.logger.error(error_msg, device_id=connection.device_id)
             raise ConfigurationError(error_msg) from e
     
+    def _encode_delta(self, base: bytes, target: bytes) -> bytes:
+        """Encode target configuration as a line-based delta against base.
+        
+        The delta is a sequence of ``=<start> <count>`` instructions copying
+        lines from base and ``+<count>`` instructions followed by that many
+        literal lines.
+        
+        Args:
+            base: Previous configuration content
+            target: New configuration content
+            
+        Returns:
+            Encoded delta
+        """
+        base_lines = base.splitlines(keepends=True)
+        target_lines = target.splitlines(keepends=True)
+        matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+        
+        parts = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                parts.append(f"={i1} {i2 - i1}\n".encode())
+            elif tag in ('replace', 'insert'):
+                parts.append(f"+{j2 - j1}\n".encode())
+                parts.extend(target_lines[j1:j2])
+        return b"".join(parts)
+    
+    def _apply_delta(self, base: bytes, delta: bytes) -> bytes:
+        """Reconstruct configuration content from a base and an encoded delta.
+        
+        Args:
+            base: Configuration content the delta was computed against
+            delta: Delta produced by ``_encode_delta``
+            
+        Returns:
+            Reconstructed configuration content
+            
+        Raises:
+            ConfigurationError: If the delta is malformed
+        """
+        base_lines = base.splitlines(keepends=True)
+        delta_lines = delta.splitlines(keepends=True)
+        output = []
+        i = 0
+        try:
+            while i < len(delta_lines):
+                op = delta_lines[i]
+                i += 1
+                if op.startswith(b'='):
+                    start, count = map(int, op[1:].split())
+                    output.extend(base_lines[start:start + count])
+                elif op.startswith(b'+'):
+                    count = int(op[1:])
+                    output.extend(delta_lines[i:i + count])
+                    i += count
+                else:
+                    raise ValueError(f"unknown delta instruction {op!r}")
+        except ValueError as e:
+            raise ConfigurationError(f"Corrupt configuration delta: {e}") from e
+        return b"".join(output)
+    
+    def _materialize(self, backup_path: str) -> bytes:
+        """Return the full configuration stored in a backup, following delta chains.
+        
+        Args:
+            backup_path: Path to a full or delta backup file
+            
+        Returns:
+            Encoded configuration content
+            
+        Raises:
+            ConfigurationError: If the backup or one of its bases is invalid
+        """
+        row = self._lookup_backup(backup_path)
+        if row is not None:
+            # Indexed backups are read straight from the stored config offset
+            with open(backup_path, 'rb') as f:
+                f.seek(row['config_offset'])
+                body = f.read()
+            metadata = {'Base': row['base'], 'Checksum': row['checksum'],
+                        'Checksum-Algorithm': row['algorithm'], 'Compression': row['compression']}
+        else:
+            body, metadata = self._read_backup_file(backup_path)
+        body = _decompress(body, metadata.get('Compression'))
+        
+        base_name = metadata.get('Base')
+        if not base_name:
+            return body
+        
+        base_path = os.path.join(os.path.dirname(backup_path), base_name)
+        if not os.path.exists(base_path):
+            raise ConfigurationError(f"Delta base backup not found: {base_path}")
+        config_bytes = self._apply_delta(self._materialize(base_path), body)
+        
+        if (metadata.get('Checksum-Algorithm') == _CHECKSUM_ALGORITHM
+                and self._config_checksum(config_bytes) != metadata.get('Checksum')):
+            raise ConfigurationError(f"Checksum mismatch reconstructing backup: {backup_path}")
+        return config_bytes
+    
+    def _read_backup_file(self, backup_path: str) -> Tuple[bytes, Dict[str, str]]:
+        """Split an unindexed backup file into its body and header metadata.
+        
+        Args:
+            backup_path: Path to the backup file
+            
+        Returns:
+            Tuple of (stored body, header metadata)
+            
+        Raises:
+            ConfigurationError: If the file has no header separator
+        """
+        with open(backup_path, 'rb') as f:
+            data = f.read()
+        
+        separator = data.find(_BACKUP_SEPARATOR)
+        if separator == -1:
+            raise ConfigurationError("Invalid backup file format")
+        body = data[separator + len(_BACKUP_SEPARATOR):]
+        if body.startswith(b"\n"):
+            body = body[1:]
+        
+        metadata = self._parse_backup_header(
+            data[:separator].decode('utf-8', errors='replace').splitlines())
+        return body, metadata
+    
+    def _write_backup(self, full_path: str, header: bytes, config_bytes: bytes) -> None:
+        """Atomically write a backup file so readers never see a partial backup.
+        
+        The backup is written to a temporary file (with a single ``writev``
+        where available), fsynced, then renamed over the final path. The
+        containing directory is fsynced on POSIX so the rename itself is durable.
+        
+        Args:
+            full_path: Final path of the backup file
+            header: Encoded metadata header
+            config_bytes: Encoded configuration to store after the header
+        """
+        tmp_path = full_path + '.tmp'
+        try:
+            if self.direct_io and self._write_direct(tmp_path, header, config_bytes):
+                pass
+            elif hasattr(os, 'writev'):
+                # Scatter-gather write hands both buffers to the kernel in one
+                # syscall without first copying them into a userspace buffer
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    buffers = [memoryview(header), memoryview(config_bytes)]
+                    while buffers:
+                        written = os.writev(fd, buffers)
+                        while buffers and written >= len(buffers[0]):
+                            written -= len(buffers[0])
+                            buffers.pop(0)
+                        if buffers:
+                            buffers[0] = buffers[0][written:]
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            else:
+                with open(tmp_path, 'wb', buffering=_BACKUP_WRITE_BUFFER) as f:
+                    f.write(header)
+                    f.write(config_bytes)
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        if os.name == 'posix':
+            dir_fd = os.open(os.path.dirname(full_path) or '.',
+                             os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    
+    def _write_direct(self, path: str, header: bytes, config_bytes: bytes) -> bool:
+        """Write and fsync a file with O_DIRECT from a page-aligned buffer.
+        
+        O_DIRECT needs aligned buffers and lengths, so the data is copied into
+        an anonymous mmap padded to the alignment and the file is truncated
+        back to its real size afterwards.
+        
+        Args:
+            path: File to create
+            header: Encoded metadata header
+            config_bytes: Encoded configuration to store after the header
+            
+        Returns:
+            True if written, False if the filesystem does not support O_DIRECT
+        """
+        # Some filesystems (tmpfs, some overlay and NFS setups) accept O_DIRECT
+        # at open but reject the write itself with EINVAL, so failures at either
+        # step disable direct I/O and leave the caller to rewrite the file
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT, 0o644)
+        except OSError as e:
+            self._disable_direct_io(e)
+            return False
+        
+        size = len(header) + len(config_bytes)
+        aligned_size = max(_DIRECT_IO_ALIGNMENT, -(-size // _DIRECT_IO_ALIGNMENT) * _DIRECT_IO_ALIGNMENT)
+        try:
+            with mmap.mmap(-1, aligned_size) as buf:
+                buf[:len(header)] = header
+                buf[len(header):size] = config_bytes
+                view = memoryview(buf)
+                try:
+                    written = 0
+                    while written < aligned_size:
+                        # Release each slice so a failed write cannot leave
+                        # the mmap with an exported buffer it cannot close
+                        with view[written:] as chunk:
+                            written += os.write(fd, chunk)
+                finally:
+                    view.release()
+            os.ftruncate(fd, size)
+            os.fsync(fd)
+        except OSError as e:
+            self._disable_direct_io(e)
+            return False
+        finally:
+            os.close(fd)
+        return True
+    
+    def _disable_direct_io(self, error: OSError) -> None:
+        """Switch backups to buffered writes after an O_DIRECT failure."""
+        self.logger.warning(f"O_DIRECT not supported for backups, using buffered writes: {error}")
+        self.direct_io = False
+    
+    async def backup_config_async(self, connection: ConnectionInfo,
+                                  reason: str = "Manual backup") -> Optional[str]:
+        """Create a configuration backup without blocking the running event loop.
+        
+        The SSH retrieval and the backup file write are both blocking, so the
+        whole backup runs in the loop's default thread pool executor.
+        
+        Args:
+            connection: Active connection to the device
+            reason: Reason for the backup
+            
+        Returns:
+            Path to the backup file or None if backup failed
+            
+        Raises:
+            ConfigurationError: If backup operation fails
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.backup_config, connection, reason)
+    
+    async def backup_many(self, connections: Sequence[ConnectionInfo],
+                          reason: str = "Manual backup",
+                          concurrency: int = _DEFAULT_CONCURRENCY) -> List[Union[str, BaseException]]:
+        """Back up several devices concurrently.
+        
+        Each backup runs in a worker thread so total time is bounded by the
+        slowest devices rather than the sum of all device latencies.
+        
+        Args:
+            connections: Active connections to the devices
+            reason: Reason for the backups
+            concurrency: Maximum number of backups in flight at once
+            
+        Returns:
+            Backup path or raised exception per connection, in input order
+        """
+        return await self._run_many(self.backup_config,
+                                    [(connection, reason) for connection in connections],
+                                    concurrency)
+    
+    async def apply_many(self, deployments: Sequence[Tuple[ConnectionInfo, str]],
+                         backup_first: bool = True, timeout: int = 300,
+                         concurrency: int = _DEFAULT_CONCURRENCY) -> List[Union[bool, BaseException]]:
+        """Apply configurations to several devices concurrently.
+        
+        Args:
+            deployments: (connection, config_content) pairs to deploy
+            backup_first: Whether to create a backup before each deployment
+            timeout: Maximum time to wait for each configuration application
+            concurrency: Maximum number of deployments in flight at once
+            
+        Returns:
+            Deployment result or raised exception per device, in input order
+        """
+        return await self._run_many(self.apply_config,
+                                    [(connection, config_content, backup_first, timeout)
+                                     for connection, config_content in deployments],
+                                    concurrency)
+    
+    async def _run_many(self, func: Callable, calls: List[tuple], concurrency: int) -> list:
+        """Run blocking per-device calls in threads with bounded concurrency.
+        
+        Exceptions are returned in place of results so one failing device
+        does not abort the rest of the batch.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(args: tuple):
+            async with semaphore:
+                return await asyncio.to_thread(func, *args)
+        
+        results = await asyncio.gather(*(run_one(args) for args in calls),
+                                       return_exceptions=True)
+        failed = sum(1 for r in results if isinstance(r, BaseException))
+        self.logger.info(f"Completed {func.__name__} for {len(calls)} devices",
+                         device_count=len(calls), failed_count=failed)
+        return results
+    
     def validate_config_syntax(self, config_content: str, device_type: DeviceType) -> bool:
         """Basic validation of configuration syntax.
         
@@ -145,26 +955,36 @@ class ConfigManager:
         Returns:
             True if configuration appears valid, False otherwise
         """
-        if not config_content or not config_content.strip():
+        if not config_content:
             return False
         
         # Basic validation checks
-        config_lines = config_content.strip().split('\n')
+        stripped = config_content.strip()
+        if not stripped:
+            return False
         
         # Check for minimum configuration length
-        if len(config_lines) < 5:
+        if stripped.count('\n') < 4:
             return False
         
         # Device-specific validation patterns
         if device_type in [DeviceType.CISCO_IOS, DeviceType.CISCO_NXOS, DeviceType.ARISTA_EOS]:
             # Look for basic Cisco-style configuration elements
-            has_version = any('version' in line.lower() for line in config_lines[:10])
-            has_hostname = any('hostname' in line.lower() for line in config_lines)
-            return has_version or has_hostname
+            # 'version' must appear in the first 10 lines; bound the regex scan
+            # at the 10th newline instead of splitting out the head
+            head_end = -1
+            for _ in range(10):
+                head_end = stripped.find('\n', head_end + 1)
+                if head_end == -1:
+                    head_end = len(stripped)
+                    break
+            if _VERSION_RE.search(stripped, 0, head_end):
+                return True
+            return _HOSTNAME_RE.search(stripped) is not None
             
         elif device_type == DeviceType.JUNIPER_JUNOS:
             # Look for Juniper configuration structure
-            has_juniper_syntax = any('{' in line and '}' in config_content for line in config_lines)
+            has_juniper_syntax = '{' in config_content and '}' in config_content
             return has_juniper_syntax
         
         # Generic validation - just check for reasonable content
@@ -187,6 +1007,7 @@ class ConfigManager:
             ConfigurationError: If configuration application fails
         """
         device_type = getattr(connection, 'device_type', DeviceType.GENERIC)
+        commands = self.cmd_for[device_type]
         
         self.logger.info(f"Starting configuration deployment for device {connection.device_id}",
                         device_id=connection.device_id, backup_first=backup_first)
@@ -203,37 +1024,43 @@ class ConfigManager:
             if not self.validate_config_syntax(config_content, device_type):
                 raise ConfigurationError("Configuration validation failed")
             
-            # Step 3: Test connectivity before deployment
-            if not self._test_connectivity(connection):
+            # Step 3: Test connectivity before deployment; a backup that just
+            # succeeded already proved the device is reachable
+            if not self._test_connectivity(connection, max_age=_CONNECTIVITY_TTL):
                 raise ConfigurationError("Device connectivity test failed before deployment")
             
-            # Step 4: Enter configuration mode
-            config_mode_cmd = self.config_commands[device_type]['configure_mode']
-            result = self.command_executor.execute_command(connection, config_mode_cmd)
-            if not result.success:
-                raise ConfigurationError(f"Failed to enter configuration mode: {result.error}")
-            
-            # Step 5: Apply configuration line by line
-            config_lines = [line.strip() for line in config_content.split('\n') 
-                          if line.strip() and not line.startswith('#')]
-            
+            # Steps 4-6: Enter configuration mode, apply the configuration in
+            # batches of lines and exit, all in one shell session so the
+            # configuration mode persists across batches
             failed_commands = []
-            for line in config_lines:
-                if line:  # Skip empty lines
-                    result = self.command_executor.execute_command(connection, line, timeout=30)
-                    if not result.success:
-                        failed_commands.append((line, result.error))
-                        self.logger.warning(f"Configuration command failed: {line}",
+            with self.command_executor.session(connection, timeout=timeout) as session:
+                output = session.run(commands.configure_mode)
+                mode_error = _CONFIG_ERROR_RE.search(output)
+                if mode_error:
+                    raise ConfigurationError(
+                        f"Failed to enter configuration mode: {mode_error.group(0).strip()}")
+                
+                lines_iter = _iter_config_lines(config_content)
+                while True:
+                    batch = list(itertools.islice(lines_iter, self.apply_batch_size))
+                    if not batch:
+                        break
+                    
+                    output = session.run('\n'.join(batch))
+                    for command, error in _config_errors(batch, output):
+                        failed_commands.append((command, error))
+                        self.logger.warning(f"Configuration command failed: {command}",
                                           device_id=connection.device_id, 
-                                          command=line, error=result.error)
-            
-            # Step 6: Exit configuration mode
-            exit_cmd = self.config_commands[device_type]['exit_config']
-            self.command_executor.execute_command(connection, exit_cmd)
+                                          command=command, error=error)
+                
+                # The configuration may already have left configuration mode;
+                # exiting again from exec mode would log the shell out
+                if not session.in_initial_mode:
+                    session.run(commands.exit_config)
             
             # Step 7: Save configuration if no failures
             if not failed_commands:
-                save_cmd = self.config_commands[device_type]['save_config']
+                save_cmd = commands.save_config
                 result = self.command_executor.execute_command(connection, save_cmd)
                 if not result.success:
                     self.logger.error(f"Failed to save configuration: {result.error}",
@@ -287,22 +1114,8 @@ class ConfigManager:
             if not os.path.exists(backup_path):
                 raise ConfigurationError(f"Backup file not found: {backup_path}")
             
-            # Step 2: Read backup content
-            with open(backup_path, 'r') as f:
-                backup_content = f.read()
-            
-            # Extract actual configuration (skip metadata header)
-            config_lines = backup_content.split('\n')
-            config_start = 0
-            for i, line in enumerate(config_lines):
-                if line.startswith('# ' + '='*50):
-                    config_start = i + 2  # Skip the separator and empty line
-                    break
-            
-            if config_start == 0:
-                raise ConfigurationError("Invalid backup file format")
-            
-            actual_config = '\n'.join(config_lines[config_start:])
+            # Step 2: Read backup content, reconstructing delta backups
+            actual_config = self._materialize(backup_path).decode('utf-8', errors='replace')
             
             # Step 3: Apply the backup configuration
             result = self.apply_config(connection, actual_config, backup_first=False)
@@ -321,18 +1134,27 @@ class ConfigManager:
             self.logger.error(error_msg, device_id=connection.device_id)
             raise ConfigurationError(error_msg) from e
     
-    def _test_connectivity(self, connection: ConnectionInfo) -> bool:
+    def _test_connectivity(self, connection: ConnectionInfo, max_age: float = 0.0) -> bool:
         """Test basic connectivity to the device.
         
         Args:
             connection: Active connection to the device
+            max_age: Seconds a previous successful command on this device may
+                stand in for a new probe; 0 always probes
             
         Returns:
             True if device is reachable, False otherwise
         """
+        last_reachable = self._last_reachable.get(connection.device_id)
+        if last_reachable is not None and time.monotonic() - last_reachable < max_age:
+            return True
+        
         try:
             # Try a simple command to test connectivity
             result = self.command_executor.execute_command(connection, "show version", timeout=10)
-            return result.success
         except Exception:
-            return False
\ No newline at end of file
+            return False
+        
+        if result.success:
+            self._last_reachable[connection.device_id] = time.monotonic()
+        return result.success
@@ -5,16 +5,115 @@ Device detection, classification, and profile management for network devices.
 """
 
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from string import Formatter
+from types import MappingProxyType
+from typing import Callable, ClassVar, Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 from ..models.device import DeviceInfo, DeviceProfile, DeviceType, DeviceStatus
 from ..models.connection import ConnectionInfo, CommandResult
 from ..utils.exceptions import DeviceError, UnsupportedDeviceError
-from ..utils.logger import get_logger
+from ..utils.logger import LogLevel, get_logger
 from .command_executor import CommandExecutor
 
 
+# Precompiled patterns for parsing `show version` output, anchored to the
+# start of the line the field appears on
+_CISCO_HOSTNAME_RE = re.compile(r'^[ \t]*(\S+)\s+uptime is', re.MULTILINE)
+_CISCO_MODEL_RE = re.compile(r'^[ \t]*cisco\s+(\S+)', re.MULTILINE)
+_CISCO_VERSION_RE = re.compile(r'Version\s+([^\s,]+)')
+_JUNIPER_HOSTNAME_RE = re.compile(r'^[ \t]*Hostname:\s+(\S+)', re.MULTILINE)
+_JUNIPER_MODEL_RE = re.compile(r'^[ \t]*Model:\s+(\S+)', re.MULTILINE)
+_JUNIPER_VERSION_RE = re.compile(r'^[ \t]*JUNOS\s+(?:[^\[\n]*\[)?([^\s,\]]+)', re.MULTILINE)
+_ARISTA_MODEL_RE = re.compile(r'^[ \t]*Arista\s+(\S+)', re.MULTILINE)
+_ARISTA_VERSION_RE = re.compile(r'^[ \t]*Software image version:\s+([^\s,]+)', re.MULTILINE)
+
+# Score awarded when a device type's version pattern matches
+_VERSION_PATTERN_SCORE = 30
+
+# Parser for command template fields
+_FORMATTER = Formatter()
+
+# Maximum number of resolved command templates cached per CapabilityManager
+_TEMPLATE_CACHE_SIZE = 1024
+
+# Named capability check: (capability, unbound test method)
+_CapabilityTest = Tuple[str, Callable[..., bool]]
+
+# Device-specific command syntax, shared read-only across profiles
+_COMMAND_SYNTAX_MAPS: Mapping[DeviceType, Mapping[str, str]] = MappingProxyType({
+    DeviceType.CISCO_IOS: MappingProxyType({
+        'show_version': 'show version',
+        'show_interfaces': 'show interfaces',
+        'show_ip_route': 'show ip route',
+        'show_running_config': 'show running-config',
+        'show_startup_config': 'show startup-config',
+        'copy_running_startup': 'copy running-config startup-config',
+        'ping': 'ping {target}',
+        'traceroute': 'traceroute {target}',
+        'show_arp': 'show arp',
+        'show_mac_table': 'show mac address-table'
+    }),
+    DeviceType.JUNIPER_JUNOS: MappingProxyType({
+        'show_version': 'show version',
+        'show_interfaces': 'show interfaces',
+        'show_ip_route': 'show route',
+        'show_running_config': 'show configuration',
+        'show_startup_config': 'show configuration',
+        'commit_config': 'commit',
+        'ping': 'ping {target}',
+        'traceroute': 'traceroute {target}',
+        'show_arp': 'show arp',
+        'show_mac_table': 'show ethernet-switching table'
+    }),
+    DeviceType.ARISTA_EOS: MappingProxyType({
+        'show_version': 'show version',
+        'show_interfaces': 'show interfaces',
+        'show_ip_route': 'show ip route',
+        'show_running_config': 'show running-config',
+        'show_startup_config': 'show startup-config',
+        'copy_running_startup': 'copy running-config startup-config',
+        'ping': 'ping {target}',
+        'traceroute': 'traceroute {target}',
+        'show_arp': 'show arp',
+        'show_mac_table': 'show mac address-table'
+    }),
+    DeviceType.GENERIC: MappingProxyType({
+        'show_version': 'show version',
+        'show_interfaces': 'show interfaces',
+        'ping': 'ping {target}'
+    })
+})
+
+# Fallback command templates for devices without a registered profile
+_FALLBACK_COMMANDS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'show_version': ('show version', 'version', 'show system version'),
+    'show_interfaces': ('show interfaces', 'show interface', 'show ports'),
+    'show_ip_route': ('show ip route', 'show route', 'show routing-table'),
+    'ping': ('ping {target}', 'ping -c 4 {target}'),
+    'traceroute': ('traceroute {target}', 'tracert {target}')
+})
+
+
+def _template_fields(template: str) -> FrozenSet[str]:
+    """Get the names of the parameters a command template substitutes.
+    
+    Args:
+        template: Command template in str.format syntax
+        
+    Returns:
+        Set of top-level field names used by the template
+    """
+    return frozenset(
+        re.split(r'[.\[]', field_name, maxsplit=1)[0]
+        for _, field_name, _, _ in _FORMATTER.parse(template)
+        if field_name is not None
+    )
+
+
 class DeviceDetector:
     """Identifies device types and capabilities using standard commands."""
     
@@ -33,7 +132,8 @@ class DeviceDetector:
                     r'IOS-XE Software'
                 ],
                 'prompt_patterns': [r'[\w-]+[>#]$'],
-                'commands': ['show version', 'show system information']
+                'commands': ['show version', 'show system information'],
+                'vendor_keywords': (('cisco', 20), ('ios', 15))
             },
             DeviceType.CISCO_NXOS: {
                 'version_patterns': [
@@ -42,7 +142,8 @@ class DeviceDetector:
                     r'system:\s+version'
                 ],
                 'prompt_patterns': [r'[\w-]+[>#]$'],
-                'commands': ['show version', 'show system information']
+                'commands': ['show version', 'show system information'],
+                'vendor_keywords': ()
             },
             DeviceType.JUNIPER_JUNOS: {
                 'version_patterns': [
@@ -51,7 +152,8 @@ class DeviceDetector:
                     r'junos-version'
                 ],
                 'prompt_patterns': [r'[\w-]+[@%>]$'],
-                'commands': ['show version', 'show system information']
+                'commands': ['show version', 'show system information'],
+                'vendor_keywords': (('juniper', 20), ('junos', 15))
             },
             DeviceType.ARISTA_EOS: {
                 'version_patterns': [
@@ -60,9 +162,24 @@ class DeviceDetector:
                     r'vEOS'
                 ],
                 'prompt_patterns': [r'[\w-]+[>#]$'],
-                'commands': ['show version', 'show system information']
+                'commands': ['show version', 'show system information'],
+                'vendor_keywords': (('arista', 20), ('eos', 15))
             }
         }
+        
+        # Compile detection patterns once rather than on every detection attempt
+        for patterns in self.detection_patterns.values():
+            for key in ('version_patterns', 'prompt_patterns'):
+                patterns[key] = [re.compile(p, re.IGNORECASE) for p in patterns[key]]
+        
+        # Highest score any device type can reach, used to stop scoring early
+        self._max_detection_score = _VERSION_PATTERN_SCORE + max(
+            sum(points for _, points in patterns['vendor_keywords'])
+            for patterns in self.detection_patterns.values()
+        )
+        
+        # Detection counts per device type, used to try likely types first
+        self._detection_hits: Counter = Counter()
     
     def detect_device_type(self, connection: ConnectionInfo) -> DeviceType:
         """Identify device type using version commands and output analysis.
@@ -76,43 +193,103 @@ class DeviceDetector:
         Raises:
             DeviceError: If device detection fails
         """
+        device_type, _ = self._detect_device_type(connection)
+        return device_type
+    
+    def _detect_device_type(self, 
+                           connection: ConnectionInfo) -> Tuple[DeviceType, Dict[str, Optional[CommandResult]]]:
+        """Detect device type and return the command outputs used for detection.
+        
+        Args:
+            connection: Active connection to the device
+            
+        Returns:
+            Tuple of (detected device type, detection outputs keyed by command)
+        """
         self.logger.info("Starting device type detection", 
                         device_id=connection.device_id)
         
-        detection_results = {}
-        
-        # Try each device type's detection commands
-        for device_type, patterns in self.detection_patterns.items():
+        outputs = self._collect_detection_outputs(connection)
+        detected_type, confidence = DeviceType.GENERIC, 0
+        
+        # Score each device type against the shared command outputs, most
+        # frequently detected types first, keeping the best score seen
+        hits = self._detection_hits
+        candidates = sorted(self.detection_patterns.items(),
+                            key=lambda item: -hits[item[0]])
+        calculate_score = self._calculate_detection_score
+        log_debug = self.logger.debug
+        debug_enabled = self.logger.is_enabled_for(LogLevel.DEBUG)
+        max_score = self._max_detection_score
+        for device_type, patterns in candidates:
             try:
-                score = self._calculate_detection_score(connection, device_type, patterns)
-                detection_results[device_type] = score
+                score = calculate_score(outputs, device_type, patterns)
                 
-                self.logger.debug(f"Detection score for {device_type.value}: {score}",
-                                device_id=connection.device_id,
-                                device_type=device_type.value,
-                                score=score)
+                if debug_enabled:
+                    log_debug(f"Detection score for {device_type.value}: {score}",
+                              device_id=connection.device_id,
+                              device_type=device_type.value,
+                              score=score)
                 
             except Exception as e:
                 self.logger.warning(f"Detection failed for {device_type.value}: {str(e)}",
                                   device_id=connection.device_id,
                                   device_type=device_type.value)
-                detection_results[device_type] = 0
+                continue
+            
+            if score > confidence:
+                detected_type, confidence = device_type, score
+                
+                # No other device type can score higher than this
+                if score >= max_score:
+                    break
         
-        # Find the device type with highest score
-        if not detection_results or max(detection_results.values()) == 0:
+        if confidence == 0:
             self.logger.warning("Could not detect device type, using GENERIC",
                               device_id=connection.device_id)
-            return DeviceType.GENERIC
+            return DeviceType.GENERIC, outputs
         
-        detected_type = max(detection_results, key=detection_results.get)
-        confidence = detection_results[detected_type]
+        self._detection_hits[detected_type] += 1
         
         self.logger.info(f"Device detected as {detected_type.value}",
                         device_id=connection.device_id,
                         device_type=detected_type.value,
                         confidence=confidence)
         
-        return detected_type
+        return detected_type, outputs
+    
+    def _collect_detection_outputs(self, 
+                                  connection: ConnectionInfo) -> Dict[str, Optional[CommandResult]]:
+        """Execute each detection command at most once.
+        
+        Commands are tried in each device type's preferred order, and a later
+        command is only executed when no earlier one produced usable output.
+        
+        Args:
+            connection: Active connection to the device
+            
+        Returns:
+            Dictionary mapping executed commands to their results, or None
+            when execution raised
+        """
+        outputs: Dict[str, Optional[CommandResult]] = {}
+        execute_command = self.command_executor.execute_command
+        
+        for patterns in self.detection_patterns.values():
+            for command in patterns['commands']:
+                if command not in outputs:
+                    try:
+                        outputs[command] = execute_command(connection, command)
+                    except Exception as e:
+                        self.logger.debug(f"Detection command failed: {command}: {str(e)}",
+                                        device_id=connection.device_id)
+                        outputs[command] = None
+                
+                result = outputs[command]
+                if result is not None and result.success and result.output:
+                    break
+        
+        return outputs
     
     def get_device_info(self, connection: ConnectionInfo) -> DeviceInfo:
         """Get comprehensive device information.
@@ -128,12 +305,14 @@ class DeviceDetector:
         
         try:
             # Detect device type first
-            device_type = self.detect_device_type(connection)
+            device_type, outputs = self._detect_device_type(connection)
             
-            # Get version information
-            version_result = self.command_executor.execute_command(
-                connection, "show version"
-            )
+            # Get version information, reusing the output fetched for detection
+            version_result = outputs.get("show version")
+            if version_result is None:
+                version_result = self.command_executor.execute_command(
+                    connection, "show version"
+                )
             
             if not version_result.success:
                 raise DeviceError(f"Failed to get version information: {version_result.error}",
@@ -151,7 +330,7 @@ class DeviceDetector:
                 vendor=vendor,
                 model=model,
                 os_version=os_version,
-                last_seen=datetime.utcnow(),
+                last_seen=version_result.timestamp,
                 status=DeviceStatus.ONLINE
             )
             
@@ -199,7 +378,7 @@ class DeviceDetector:
                 model=device_info.model,
                 os_version=device_info.os_version,
                 capabilities=capabilities,
-                command_syntax=command_syntax
+                command_syntax=dict(command_syntax)
             )
             
             self.logger.info("Device profile created successfully",
@@ -218,56 +397,60 @@ class DeviceDetector:
                             {"device_id": connection.device_id})
     
     def _calculate_detection_score(self, 
-                                  connection: ConnectionInfo, 
+                                  outputs: Dict[str, Optional[CommandResult]], 
                                   device_type: DeviceType, 
                                   patterns: Dict) -> int:
         """Calculate detection confidence score for a device type.
         
         Args:
-            connection: Active connection to the device
+            outputs: Detection command results keyed by command
             device_type: Device type to test
-            patterns: Detection patterns for the device type
+            patterns: Detection patterns for the device type, with compiled
+                version patterns and optional lowercase vendor keywords
             
         Returns:
             Confidence score (0-100)
         """
+        output = self._first_usable_output(outputs, patterns['commands'])
+        if output is None:
+            return 0
+        
         score = 0
         
-        # Try version commands
-        for command in patterns['commands']:
-            try:
-                result = self.command_executor.execute_command(connection, command)
-                if result.success and result.output:
-                    # Check version patterns
-                    for pattern in patterns['version_patterns']:
-                        if re.search(pattern, result.output, re.IGNORECASE):
-                            score += 30
-                            break
-                    
-                    # Additional scoring based on output characteristics
-                    if device_type == DeviceType.CISCO_IOS:
-                        if 'cisco' in result.output.lower():
-                            score += 20
-                        if 'ios' in result.output.lower():
-                            score += 15
-                    elif device_type == DeviceType.JUNIPER_JUNOS:
-                        if 'juniper' in result.output.lower():
-                            score += 20
-                        if 'junos' in result.output.lower():
-                            score += 15
-                    elif device_type == DeviceType.ARISTA_EOS:
-                        if 'arista' in result.output.lower():
-                            score += 20
-                        if 'eos' in result.output.lower():
-                            score += 15
-                    
-                    break  # Found working command
-                    
-            except Exception:
-                continue
+        # Check version patterns
+        for pattern in patterns['version_patterns']:
+            if pattern.search(output):
+                score += _VERSION_PATTERN_SCORE
+                break
+        
+        # Additional scoring based on output characteristics
+        keywords = patterns.get('vendor_keywords')
+        if keywords:
+            lowered = output.lower()
+            for keyword, points in keywords:
+                if keyword in lowered:
+                    score += points
         
         return min(score, 100)  # Cap at 100
     
+    @staticmethod
+    def _first_usable_output(outputs: Dict[str, Optional[CommandResult]], 
+                            commands: List[str]) -> Optional[str]:
+        """Get the output of the first command that succeeded with output.
+        
+        Args:
+            outputs: Detection command results keyed by command
+            commands: Commands in order of preference
+            
+        Returns:
+            Command output, or None if no command produced usable output
+        """
+        for command in commands:
+            result = outputs.get(command)
+            if result is not None and result.success and result.output:
+                return result.output
+        return None
+    
     def _parse_device_info(self, 
                           version_output: str, 
                           device_type: DeviceType) -> Tuple[str, str, str, str]:
@@ -289,17 +472,17 @@ class DeviceDetector:
             vendor = "Cisco"
             
             # Extract hostname
-            hostname_match = re.search(r'^(\S+)\s+uptime', version_output, re.MULTILINE)
+            hostname_match = _CISCO_HOSTNAME_RE.search(version_output)
             if hostname_match:
                 hostname = hostname_match.group(1)
             
             # Extract model
-            model_match = re.search(r'cisco\s+(\S+)', version_output, re.IGNORECASE)
+            model_match = _CISCO_MODEL_RE.search(version_output)
             if model_match:
                 model = model_match.group(1)
             
             # Extract OS version
-            version_match = re.search(r'Version\s+([^\s,]+)', version_output)
+            version_match = _CISCO_VERSION_RE.search(version_output)
             if version_match:
                 os_version = version_match.group(1)
                 
@@ -307,17 +490,17 @@ class DeviceDetector:
             vendor = "Juniper"
             
             # Extract hostname
-            hostname_match = re.search(r'Hostname:\s+(\S+)', version_output)
+            hostname_match = _JUNIPER_HOSTNAME_RE.search(version_output)
             if hostname_match:
                 hostname = hostname_match.group(1)
             
             # Extract model
-            model_match = re.search(r'Model:\s+(\S+)', version_output)
+            model_match = _JUNIPER_MODEL_RE.search(version_output)
             if model_match:
                 model = model_match.group(1)
             
             # Extract OS version
-            version_match = re.search(r'JUNOS\s+([^\s,]+)', version_output)
+            version_match = _JUNIPER_VERSION_RE.search(version_output)
             if version_match:
                 os_version = version_match.group(1)
                 
@@ -325,11 +508,11 @@ class DeviceDetector:
             vendor = "Arista"
             
             # Extract model and version for Arista
-            model_match = re.search(r'Arista\s+(\S+)', version_output)
+            model_match = _ARISTA_MODEL_RE.search(version_output)
             if model_match:
                 model = model_match.group(1)
             
-            version_match = re.search(r'Software image version:\s+([^\s,]+)', version_output)
+            version_match = _ARISTA_VERSION_RE.search(version_output)
             if version_match:
                 os_version = version_match.group(1)
         
@@ -348,28 +531,27 @@ class DeviceDetector:
             List of supported capabilities
         """
         capabilities = []
+        debug_enabled = self.logger.is_enabled_for(LogLevel.DEBUG)
         
         # Test basic capabilities
-        capability_tests = {
-            'ssh': lambda: True,  # Already connected via SSH
-            'snmp': self._test_snmp_capability,
-            'netconf': self._test_netconf_capability,
-            'restapi': self._test_restapi_capability,
-            'scp': self._test_scp_capability
-        }
-        
-        for capability, test_func in capability_tests.items():
+        for capability, test_func in self._CAPABILITY_TESTS:
             try:
-                if test_func():
+                if test_func(self):
                     capabilities.append(capability)
-                    self.logger.debug(f"Capability detected: {capability}",
-                                    device_id=connection.device_id)
+                    if debug_enabled:
+                        self.logger.debug(f"Capability detected: {capability}",
+                                        device_id=connection.device_id)
             except Exception as e:
-                self.logger.debug(f"Capability test failed for {capability}: {str(e)}",
-                                device_id=connection.device_id)
+                if debug_enabled:
+                    self.logger.debug(f"Capability test failed for {capability}: {str(e)}",
+                                    device_id=connection.device_id)
         
         return capabilities
     
+    def _test_ssh_capability(self) -> bool:
+        """Test if device supports SSH."""
+        return True  # Already connected via SSH
+    
     def _test_snmp_capability(self) -> bool:
         """Test if device supports SNMP."""
         # This would typically involve trying SNMP commands
@@ -391,60 +573,26 @@ class DeviceDetector:
         # This would involve testing SCP subsystem
         return True  # Most SSH devices support SCP
     
-    def _get_command_syntax(self, device_type: DeviceType) -> Dict[str, str]:
+    # Capability tests run by _detect_capabilities, in reporting order
+    _CAPABILITY_TESTS: ClassVar[Tuple[_CapabilityTest, ...]] = (
+        ('ssh', _test_ssh_capability),
+        ('snmp', _test_snmp_capability),
+        ('netconf', _test_netconf_capability),
+        ('restapi', _test_restapi_capability),
+        ('scp', _test_scp_capability)
+    )
+    
+    def _get_command_syntax(self, device_type: DeviceType) -> Mapping[str, str]:
         """Get device-specific command syntax mapping.
         
         Args:
             device_type: Device type
             
         Returns:
-            Dictionary mapping command types to device-specific syntax
+            Read-only mapping of command types to device-specific syntax,
+            shared between calls
         """
-        syntax_maps = {
-            DeviceType.CISCO_IOS: {
-                'show_version': 'show version',
-                'show_interfaces': 'show interfaces',
-                'show_ip_route': 'show ip route',
-                'show_running_config': 'show running-config',
-                'show_startup_config': 'show startup-config',
-                'copy_running_startup': 'copy running-config startup-config',
-                'ping': 'ping {target}',
-                'traceroute': 'traceroute {target}',
-                'show_arp': 'show arp',
-                'show_mac_table': 'show mac address-table'
-            },
-            DeviceType.JUNIPER_JUNOS: {
-                'show_version': 'show version',
-                'show_interfaces': 'show interfaces',
-                'show_ip_route': 'show route',
-                'show_running_config': 'show configuration',
-                'show_startup_config': 'show configuration',
-                'commit_config': 'commit',
-                'ping': 'ping {target}',
-                'traceroute': 'traceroute {target}',
-                'show_arp': 'show arp',
-                'show_mac_table': 'show ethernet-switching table'
-            },
-            DeviceType.ARISTA_EOS: {
-                'show_version': 'show version',
-                'show_interfaces': 'show interfaces',
-                'show_ip_route': 'show ip route',
-                'show_running_config': 'show running-config',
-                'show_startup_config': 'show startup-config',
-                'copy_running_startup': 'copy running-config startup-config',
-                'ping': 'ping {target}',
-                'traceroute': 'traceroute {target}',
-                'show_arp': 'show arp',
-                'show_mac_table': 'show mac address-table'
-            },
-            DeviceType.GENERIC: {
-                'show_version': 'show version',
-                'show_interfaces': 'show interfaces',
-                'ping': 'ping {target}'
-            }
-        }
-        
-        return syntax_maps.get(device_type, syntax_maps[DeviceType.GENERIC])
+        return _COMMAND_SYNTAX_MAPS.get(device_type, _COMMAND_SYNTAX_MAPS[DeviceType.GENERIC])
 
 
 class CapabilityManager:
@@ -457,13 +605,11 @@ class CapabilityManager:
         self.command_executor = CommandExecutor()
         
         # Fallback command mappings for unknown devices
-        self.fallback_commands = {
-            'show_version': ['show version', 'version', 'show system version'],
-            'show_interfaces': ['show interfaces', 'show interface', 'show ports'],
-            'show_ip_route': ['show ip route', 'show route', 'show routing-table'],
-            'ping': ['ping {target}', 'ping -c 4 {target}'],
-            'traceroute': ['traceroute {target}', 'tracert {target}']
-        }
+        self.fallback_commands = _FALLBACK_COMMANDS
+        
+        # Per-instance cache of resolved command templates, cleared whenever
+        # a device profile is registered
+        self._resolve_template = lru_cache(maxsize=_TEMPLATE_CACHE_SIZE)(self._lookup_template)
     
     def register_device_profile(self, device_id: str, profile: DeviceProfile) -> None:
         """Register a device profile for capability management.
@@ -473,6 +619,7 @@ class CapabilityManager:
             profile: Device profile with capabilities and command syntax
         """
         self.device_profiles[device_id] = profile
+        self._resolve_template.cache_clear()
         self.logger.info(f"Device profile registered",
                         device_id=device_id,
                         device_type=profile.device_type.value,
@@ -521,30 +668,59 @@ class CapabilityManager:
         Raises:
             UnsupportedDeviceError: If command is not supported
         """
+        from_profile, templates = self._resolve_template(device_id, command_type)
+        
+        if from_profile:
+            command_template, fields = templates[0]
+            if not fields:
+                return command_template  # Nothing to substitute
+            try:
+                return command_template.format(**kwargs)
+            except KeyError as e:
+                raise UnsupportedDeviceError(
+                    f"Missing parameter {e} for command {command_type}",
+                    {"device_id": device_id, "command_type": command_type, "missing_param": str(e)}
+                )
+        
+        # Use the first fallback command whose parameters are all supplied
+        for fallback_template, fields in templates:
+            if not fields:
+                return fallback_template
+            if fields <= kwargs.keys():
+                return fallback_template.format(**kwargs)
+        
+        raise UnsupportedDeviceError(
+            f"Command type '{command_type}' not supported for device {device_id}",
+            {"device_id": device_id, "command_type": command_type}
+        )
+    
+    def _lookup_template(self, 
+                        device_id: str, 
+                        command_type: str) -> Tuple[bool, Tuple[Tuple[str, FrozenSet[str]], ...]]:
+        """Resolve the command templates available for a device.
+        
+        Results are cached per (device_id, command_type) by
+        _resolve_template; profiles changed after registration must be
+        registered again to take effect.
+        
+        Args:
+            device_id: Device identifier
+            command_type: Type of command
+            
+        Returns:
+            Tuple of (whether the template came from the device profile,
+            candidate (template, parameter names) pairs in order of preference)
+        """
         profile = self.device_profiles.get(device_id)
         
         if profile:
             command_template = profile.get_command(command_type)
             if command_template:
-                try:
-                    return command_template.format(**kwargs)
-                except KeyError as e:
-                    raise UnsupportedDeviceError(
-                        f"Missing parameter {e} for command {command_type}",
-                        {"device_id": device_id, "command_type": command_type, "missing_param": str(e)}
-                    )
-        
-        # Try fallback commands for unknown devices
-        if command_type in self.fallback_commands:
-            for fallback_template in self.fallback_commands[command_type]:
-                try:
-                    return fallback_template.format(**kwargs)
-                except KeyError:
-                    continue
+                return True, ((command_template, _template_fields(command_template)),)
         
-        raise UnsupportedDeviceError(
-            f"Command type '{command_type}' not supported for device {device_id}",
-            {"device_id": device_id, "command_type": command_type}
+        return False, tuple(
+            (template, _template_fields(template))
+            for template in self.fallback_commands.get(command_type, ())
         )
     
     def execute_adapted_command(self, 
@@ -576,9 +752,6 @@ class CapabilityManager:
             result = self.command_executor.execute_command(connection, command)
             
             # Add metadata about command adaptation
-            if not hasattr(result, 'additional_data'):
-                result.additional_data = {}
-            
             result.additional_data.update({
                 'command_type': command_type,
                 'adapted_from': command_type,
@@ -616,25 +789,30 @@ class CapabilityManager:
         self.logger.info("Testing device capabilities",
                         device_id=connection.device_id)
         
-        capability_tests = {
-            'basic_commands': self._test_basic_commands,
-            'privilege_escalation': self._test_privilege_escalation,
-            'configuration_commands': self._test_configuration_commands,
-            'file_operations': self._test_file_operations,
-            'network_commands': self._test_network_commands
-        }
-        
-        results = {}
+        outcomes = {}
+        debug_enabled = self.logger.is_enabled_for(LogLevel.DEBUG)
         
-        for capability, test_func in capability_tests.items():
-            try:
-                results[capability] = test_func(connection)
-                self.logger.debug(f"Capability test result: {capability} = {results[capability]}",
-                                device_id=connection.device_id)
-            except Exception as e:
-                self.logger.warning(f"Capability test failed for {capability}: {str(e)}",
-                                  device_id=connection.device_id)
-                results[capability] = False
+        # Probes are independent and I/O bound, so run them concurrently
+        with ThreadPoolExecutor(max_workers=len(self._CAPABILITY_TESTS)) as executor:
+            futures = {
+                executor.submit(test_func, self, connection): capability
+                for capability, test_func in self._CAPABILITY_TESTS
+            }
+            
+            for future in as_completed(futures):
+                capability = futures[future]
+                try:
+                    outcomes[capability] = future.result()
+                    if debug_enabled:
+                        self.logger.debug(f"Capability test result: {capability} = {outcomes[capability]}",
+                                        device_id=connection.device_id)
+                except Exception as e:
+                    self.logger.warning(f"Capability test failed for {capability}: {str(e)}",
+                                      device_id=connection.device_id)
+                    outcomes[capability] = False
+        
+        # Report results in the declared test order
+        results = {capability: outcomes[capability] for capability, _ in self._CAPABILITY_TESTS}
         
         self.logger.info(f"Capability testing completed",
                         device_id=connection.device_id,
@@ -732,4 +910,13 @@ class CapabilityManager:
             result = self.execute_adapted_command(connection, 'ping', target='127.0.0.1')
             return result.success
         except:
-            return False
\ No newline at end of file
+            return False
+    
+    # Capability tests run by test_device_capabilities, in reporting order
+    _CAPABILITY_TESTS: ClassVar[Tuple[_CapabilityTest, ...]] = (
+        ('basic_commands', _test_basic_commands),
+        ('privilege_escalation', _test_privilege_escalation),
+        ('configuration_commands', _test_configuration_commands),
+        ('file_operations', _test_file_operations),
+        ('network_commands', _test_network_commands)
+    )
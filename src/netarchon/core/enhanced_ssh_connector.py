@@ -5,10 +5,18 @@ Extended SSH connectivity that automatically retrieves credentials from BitWarde
 for seamless network device authentication.
 """
 
+import heapq
+import itertools
+import re
 import socket
+import threading
 import time
-from datetime import datetime
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
 
 import paramiko
 
@@ -16,23 +24,107 @@ from ..models.connection import (
     ConnectionInfo,
     ConnectionType,
     ConnectionStatus,
-    AuthenticationCredentials,
-    AuthenticationType
+    AuthenticationCredentials
 )
 from ..utils.exceptions import (
     ConnectionError,
     AuthenticationError,
     TimeoutError
 )
-from ..utils.logger import get_logger
-from ..utils.circuit_breaker import circuit_breaker_manager, CircuitBreakerConfig
+from ..utils.logger import get_logger, LogLevel
+from ..utils.circuit_breaker import circuit_breaker_manager, CircuitBreakerConfig, CircuitBreakerError
 from ..utils.retry_manager import retry_manager_registry, create_network_retry_config
-from ..integrations.bitwarden import BitWardenManager, BitWardenError
+from ..integrations.bitwarden import (
+    BitWardenManager,
+    BitWardenCredential,
+    BitWardenError,
+    CredentialMapping
+)
 
 # Import the original connector for fallback
 from .ssh_connector import SSHConnector as BaseSSHConnector, ConnectionPool
 
 
+# Seconds a BitWarden credential lookup is reused before querying the vault again
+_CREDENTIAL_CACHE_TTL = 300
+
+# Common gateway addresses treated as routers
+_ROUTER_IPS = frozenset(['192.168.1.1', '192.168.0.1', '10.0.0.1', '172.16.0.1'])
+
+# Hostname fragments suggesting a device type, checked in order
+_HOSTNAME_TYPE_PATTERNS = (
+    (re.compile(r'router|gateway|rt'), 'router'),
+    (re.compile(r'switch|sw'), 'switch'),
+    (re.compile(r'firewall|fw'), 'firewall'),
+    (re.compile(r'ap|access-point|wifi'), 'access_point')
+)
+
+# Seconds a host with no vault match is skipped before searching again
+_NEGATIVE_CACHE_TTL = 120
+
+# Seconds a vault status check is reused by test_bitwarden_connection
+_STATUS_CACHE_TTL = 5.0
+
+# Upper bound on worker threads used by EnhancedConnectionPool.connect_many
+_MAX_CONNECT_WORKERS = 32
+
+# Concurrent handshakes allowed per host, below sshd's default MaxStartups of 10
+_MAX_STARTUPS_PER_HOST = 8
+
+# Channels opened per pooled transport, one below sshd's default MaxSessions of 10
+_DEFAULT_MAX_SESSIONS = 9
+
+# Shared by all connectors rather than created per instance
+_LOGGER = get_logger(f"{__name__}.EnhancedSSHConnector")
+
+# Seconds a resolved hostname is reused by EnhancedConnectionPool
+_DNS_CACHE_TTL = 300
+
+# Hosts whose guessed device type is remembered by _guess_device_type_cached
+_GUESS_CACHE_SIZE = 4096
+
+# Seconds a credential lookup waits for the background vault pre-warm
+_PREWARM_WAIT = 5.0
+
+# Vault CLI calls one credential lookup can make: unlocking the session, the
+# mapped item and every search term BitWardenManager generates
+_MAX_VAULT_CALLS_PER_LOOKUP = 13
+
+
+@lru_cache(maxsize=_GUESS_CACHE_SIZE)
+def _guess_device_type_cached(host: str) -> Optional[str]:
+    """Guess a device type from a host's address or name, memoized per host."""
+    # Common router IP addresses
+    if host in _ROUTER_IPS:
+        return 'router'
+    
+    # Check for common naming patterns, in priority order
+    hostname_lower = host.lower()
+    
+    for pattern, guessed_type in _HOSTNAME_TYPE_PATTERNS:
+        if pattern.search(hostname_lower):
+            return guessed_type
+    
+    # IP address pattern analysis
+    ip_parts = host.split('.')
+    if len(ip_parts) == 4:
+        try:
+            last_octet = int(ip_parts[3])
+            
+            # Common patterns
+            if last_octet == 1:
+                return 'router'  # Usually gateway
+            elif 10 <= last_octet <= 50:
+                return 'infrastructure'  # Network infrastructure range
+            elif 100 <= last_octet <= 200:
+                return 'server'  # Server range
+        
+        except ValueError:
+            pass
+    
+    return None
+
+
 class EnhancedSSHConnector(BaseSSHConnector):
     """
     Enhanced SSH connector with BitWarden credential management.
@@ -42,28 +134,94 @@ class EnhancedSSHConnector(BaseSSHConnector):
     """
     
     def __init__(self, timeout: int = 30, retry_attempts: int = 3, 
-                 enable_bitwarden: bool = True):
+                 enable_bitwarden: bool = True, prewarm_vault: bool = True,
+                 use_vault_server: bool = False):
         """Initialize enhanced SSH connector.
         
         Args:
             timeout: Connection timeout in seconds
             retry_attempts: Number of retry attempts for failed connections
             enable_bitwarden: Enable BitWarden integration
+            prewarm_vault: Sync the vault and build the device index in a
+                background thread so the first connection does not wait on it
+            use_vault_server: Query the vault through a local `bw serve`
+                REST API instead of the CLI. The API is unauthenticated and
+                exposes the unlocked vault to every local user and process,
+                so it is off by default
         """
         super().__init__(timeout, retry_attempts)
-        self.logger = get_logger(f"{__name__}.EnhancedSSHConnector")
+        self.logger = _LOGGER
         
         # BitWarden integration
         self.enable_bitwarden = enable_bitwarden
         self.bitwarden_manager: Optional[BitWardenManager] = None
         
+        # Credential lookups keyed by (host, device_type), with fetch time
+        self._cred_cache: Dict[Tuple[str, Optional[str]], Tuple[float, BitWardenCredential]] = {}
+        self._cred_ttl = _CREDENTIAL_CACHE_TTL
+        
+        # Lookups the vault had no credentials for, keyed like _cred_cache,
+        # with the time of the search
+        self._negative_cache: Dict[Tuple[str, Optional[str]], float] = {}
+        
+        # Guards both caches, which connect_many workers share
+        self._cache_lock = threading.Lock()
+        
+        # Device mappings indexed by IP and hostname, rebuilt after the TTL
+        self._vault_index: Optional[Dict[str, CredentialMapping]] = None
+        self._vault_index_time = 0.0
+        self._vault_index_lock = threading.Lock()
+        
+        # Last vault status reported by test_bitwarden_connection
+        self._status_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._status_lock = threading.Lock()
+        
+        # Fail fast on vault calls while BitWarden is down or timing out
+        cb_config = CircuitBreakerConfig(
+            failure_threshold=5,
+            recovery_timeout=30,
+            success_threshold=3
+        )
+        self._bw_breaker = circuit_breaker_manager.get_circuit_breaker("bitwarden", cb_config)
+        self._bw_open_logged = False
+        
+        # Credential lookups in progress, shared by concurrent callers
+        self._inflight: Dict[Tuple[str, Optional[str]], Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Set once the background pre-warm has finished (or was never started)
+        self._prewarmed = threading.Event()
+        
         if enable_bitwarden:
             try:
-                self.bitwarden_manager = BitWardenManager()
+                self.bitwarden_manager = BitWardenManager(use_serve=use_vault_server)
                 self.logger.info("BitWarden integration enabled")
             except Exception as e:
                 self.logger.warning(f"BitWarden initialization failed: {e}")
                 self.enable_bitwarden = False
+        
+        if self.enable_bitwarden:
+            # Mappings persisted by BitWardenManager give known devices an
+            # index before the vault is ever contacted
+            try:
+                self._ensure_vault_index()
+            except Exception as e:
+                self.logger.warning(f"Failed to load BitWarden device index: {e}")
+        
+        if self.enable_bitwarden and prewarm_vault:
+            threading.Thread(target=self._prewarm, name="bitwarden-prewarm", daemon=True).start()
+        else:
+            self._prewarmed.set()
+    
+    def _prewarm(self) -> None:
+        """Sync the BitWarden vault and build the device index off the request path."""
+        try:
+            self.sync_bitwarden_vault()
+            self._ensure_vault_index()
+        except Exception as e:
+            self.logger.warning(f"BitWarden pre-warm failed: {e}")
+        finally:
+            self._prewarmed.set()
     
     def connect_with_bitwarden(self, 
                               host: str,
@@ -92,27 +250,53 @@ class EnhancedSSHConnector(BaseSSHConnector):
         if not device_id:
             device_id = f"{host}:{port}"
         
-        self.logger.info(f"Attempting BitWarden-enabled SSH connection to {host}:{port}",
-                        device_id=device_id)
+        if self.logger.is_enabled_for(LogLevel.INFO):
+            self.logger.info(f"Attempting BitWarden-enabled SSH connection to {host}:{port}",
+                            device_id=device_id)
         
+        credentials = self.resolve_credentials(host, device_type, device_id, fallback_credentials)
+        return self.connect_with_credentials(host, credentials, port, device_id)
+    
+    def resolve_credentials(self,
+                            host: str,
+                            device_type: Optional[str] = None,
+                            device_id: Optional[str] = None,
+                            fallback_credentials: Optional[AuthenticationCredentials] = None) -> AuthenticationCredentials:
+        """
+        Resolve the credentials to use for a device.
+        
+        Args:
+            host: Target host IP address or hostname
+            device_type: Type of device (router, switch, etc.)
+            device_id: Optional device identifier used for logging
+            fallback_credentials: Credentials to use if BitWarden fails
+            
+        Returns:
+            Credentials from BitWarden, or the fallback credentials
+            
+        Raises:
+            AuthenticationError: If no credentials are available
+        """
         credentials = None
+        info_enabled = self.logger.is_enabled_for(LogLevel.INFO)
         
         # Try to get credentials from BitWarden
         if self.enable_bitwarden and self.bitwarden_manager:
             try:
-                bw_credential = self.bitwarden_manager.get_device_credentials(host, device_type)
+                bw_credential = self._cached_get_device_credentials(host, device_type)
+                self._bw_open_logged = False
                 
                 if bw_credential:
                     credentials = AuthenticationCredentials(
                         username=bw_credential.username,
                         password=bw_credential.password,
-                        enable_password=bw_credential.enable_password,
-                        auth_type=AuthenticationType.PASSWORD
+                        enable_password=bw_credential.enable_password
                     )
                     
-                    self.logger.info(f"Using BitWarden credentials for {host}",
-                                   device_id=device_id,
-                                   bitwarden_item=bw_credential.source_item_name)
+                    if info_enabled:
+                        self.logger.info(f"Using BitWarden credentials for {host}",
+                                       device_id=device_id,
+                                       bitwarden_item=bw_credential.source_item_name)
                 else:
                     self.logger.warning(f"No BitWarden credentials found for {host}",
                                       device_id=device_id)
@@ -120,18 +304,185 @@ class EnhancedSSHConnector(BaseSSHConnector):
             except BitWardenError as e:
                 self.logger.warning(f"BitWarden credential retrieval failed: {e}",
                                   device_id=device_id)
+            except CircuitBreakerError:
+                # Warn once per outage rather than on every connection
+                if not self._bw_open_logged:
+                    self._bw_open_logged = True
+                    self.logger.warning("BitWarden unavailable, skipping vault lookups until it recovers",
+                                      device_id=device_id)
         
         # Use fallback credentials if BitWarden failed
         if not credentials and fallback_credentials:
             credentials = fallback_credentials
-            self.logger.info(f"Using fallback credentials for {host}",
-                           device_id=device_id)
+            if info_enabled:
+                self.logger.info(f"Using fallback credentials for {host}",
+                               device_id=device_id)
         
         if not credentials:
             raise AuthenticationError(f"No credentials available for {host}")
         
+        return credentials
+    
+    def connect_with_credentials(self,
+                                 host: str,
+                                 credentials: AuthenticationCredentials,
+                                 port: int = 22,
+                                 device_id: Optional[str] = None) -> ConnectionInfo:
+        """
+        Connect with resolved credentials, dropping cached ones that are rejected.
+        
+        Args:
+            host: Target host IP address or hostname
+            credentials: Credentials returned by resolve_credentials
+            port: SSH port (default 22)
+            device_id: Optional device identifier
+            
+        Returns:
+            ConnectionInfo object with connection details
+        """
         # Use the original connection method
-        return self.connect(host, credentials, port, device_id)
+        try:
+            return self.connect(host, credentials, port, device_id)
+        except AuthenticationError:
+            # Cached credentials may be stale; look them up again next time
+            self.invalidate_credential_cache(host)
+            raise
+    
+    def _cached_get_device_credentials(self, 
+                                      host: str, 
+                                      device_type: Optional[str]) -> Optional[BitWardenCredential]:
+        """
+        Get device credentials from BitWarden, reusing recent lookups.
+        
+        Args:
+            host: Target host IP address or hostname
+            device_type: Type of device used to search the vault
+            
+        Returns:
+            BitWarden credential, or None if the vault has no match
+            
+        Raises:
+            BitWardenError: If the vault cannot be queried, or a concurrent
+                lookup of the same key does not finish in time
+        """
+        key = (host, device_type)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cred_cache.get(key)
+            missed_at = self._negative_cache.get(key)
+        if cached and now - cached[0] < self._cred_ttl:
+            return cached[1]
+        
+        # Lookups recently searched without a match are not searched again
+        if missed_at is not None and now - missed_at < _NEGATIVE_CACHE_TTL:
+            return None
+        
+        # Concurrent lookups of the same key wait on the first one's result
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        
+        if not owner:
+            wait = _PREWARM_WAIT + _MAX_VAULT_CALLS_PER_LOOKUP * self.bitwarden_manager.cli_timeout
+            try:
+                return future.result(timeout=wait)
+            except FutureTimeoutError as e:
+                raise BitWardenError(f"Timed out waiting for the BitWarden lookup of {host}") from e
+        
+        try:
+            bw_credential = self._fetch_device_credentials(host, device_type)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(bw_credential)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        
+        return bw_credential
+    
+    def _fetch_device_credentials(self,
+                                  host: str,
+                                  device_type: Optional[str]) -> Optional[BitWardenCredential]:
+        """
+        Look up device credentials in BitWarden and record the outcome.
+        
+        Args:
+            host: Target host IP address or hostname
+            device_type: Type of device used to search the vault
+            
+        Returns:
+            BitWarden credential, or None if the vault has no match
+        """
+        # Known devices go straight to their mapped item; searching for others
+        # gives an in-progress pre-warm a moment to finish first
+        mapping = self._ensure_vault_index().get(host)
+        if mapping is not None:
+            bw_credential = self._bw_breaker.call(
+                self.bitwarden_manager.get_device_credentials, mapping.device_ip, device_type)
+        else:
+            self._prewarmed.wait(_PREWARM_WAIT)
+            bw_credential = self._bw_breaker.call(
+                self.bitwarden_manager.get_device_credentials, host, device_type)
+            if bw_credential:
+                # The search recorded a new mapping; pick it up on next use
+                self._vault_index = None
+            else:
+                with self._cache_lock:
+                    self._negative_cache[(host, device_type)] = time.monotonic()
+        
+        if bw_credential:
+            with self._cache_lock:
+                self._cred_cache[(host, device_type)] = (time.monotonic(), bw_credential)
+        return bw_credential
+    
+    def _ensure_vault_index(self) -> Dict[str, CredentialMapping]:
+        """
+        Get device mappings indexed by device IP and hostname.
+        
+        The index is built from a single get_all_device_mappings call and
+        reused until the credential TTL expires.
+        
+        Returns:
+            Dictionary mapping IP addresses and hostnames to device mappings
+        """
+        with self._vault_index_lock:
+            now = time.monotonic()
+            if self._vault_index is None or now - self._vault_index_time >= self._cred_ttl:
+                mappings = self.bitwarden_manager.get_all_device_mappings()
+                index = dict(mappings)
+                for mapping in mappings.values():
+                    if mapping.device_hostname:
+                        index.setdefault(mapping.device_hostname, mapping)
+                
+                self._vault_index = index
+                self._vault_index_time = now
+            
+            return self._vault_index
+    
+    def invalidate_credential_cache(self, host: Optional[str] = None) -> None:
+        """
+        Drop cached BitWarden credentials and remembered lookup misses.
+        
+        Call after an authentication failure so a changed password is
+        fetched again on the next connection attempt, or after adding a
+        device to the vault.
+        
+        Args:
+            host: Host whose credentials to drop, or None to drop all
+        """
+        with self._cache_lock:
+            if host is None:
+                self._cred_cache.clear()
+                self._negative_cache.clear()
+                return
+            
+            for cache in (self._cred_cache, self._negative_cache):
+                for key in [key for key in cache if key[0] == host]:
+                    del cache[key]
     
     def connect_with_auto_discovery(self,
                                    host: str,
@@ -159,22 +510,10 @@ class EnhancedSSHConnector(BaseSSHConnector):
         # Try to determine device type from common patterns
         device_type = self._guess_device_type(host)
         
-        # Try connection with discovered type
-        try:
-            return self.connect_with_bitwarden(
-                host=host,
-                device_type=device_type,
-                port=port,
-                device_id=device_id
-            )
-        except AuthenticationError:
-            # Try with generic search terms
-            return self.connect_with_bitwarden(
-                host=host,
-                device_type=None,
-                port=port,
-                device_id=device_id
-            )
+        # The typed search terms include every generic one, so a miss for
+        # the guessed type is not retried without it
+        credentials = self.resolve_credentials(host, device_type, device_id)
+        return self.connect_with_credentials(host, credentials, port, device_id)
     
     def _guess_device_type(self, host: str) -> Optional[str]:
         """
@@ -186,41 +525,11 @@ class EnhancedSSHConnector(BaseSSHConnector):
         Returns:
             Guessed device type or None
         """
-        # Common router IP addresses
-        router_ips = ['192.168.1.1', '192.168.0.1', '10.0.0.1', '172.16.0.1']
-        if host in router_ips:
-            return 'router'
-        
-        # Check for common naming patterns
-        hostname_lower = host.lower()
-        
-        if any(term in hostname_lower for term in ['router', 'gateway', 'rt']):
-            return 'router'
-        elif any(term in hostname_lower for term in ['switch', 'sw']):
-            return 'switch'
-        elif any(term in hostname_lower for term in ['firewall', 'fw']):
-            return 'firewall'
-        elif any(term in hostname_lower for term in ['ap', 'access-point', 'wifi']):
-            return 'access_point'
-        
-        # IP address pattern analysis
-        ip_parts = host.split('.')
-        if len(ip_parts) == 4:
-            try:
-                last_octet = int(ip_parts[3])
-                
-                # Common patterns
-                if last_octet == 1:
-                    return 'router'  # Usually gateway
-                elif 10 <= last_octet <= 50:
-                    return 'infrastructure'  # Network infrastructure range
-                elif 100 <= last_octet <= 200:
-                    return 'server'  # Server range
-                    
-            except ValueError:
-                pass
-        
-        return None
+        return _guess_device_type_cached(host)
+    
+    def clear_discovery_cache(self) -> None:
+        """Forget device types guessed for previously seen hosts."""
+        _guess_device_type_cached.cache_clear()
     
     def test_bitwarden_connection(self) -> Dict[str, Any]:
         """
@@ -236,8 +545,29 @@ class EnhancedSSHConnector(BaseSSHConnector):
                 'message': 'BitWarden integration not enabled'
             }
         
+        cached = self._status_cache
+        if cached and time.monotonic() - cached[0] < _STATUS_CACHE_TTL:
+            return dict(cached[1])
+        
+        # Only one caller queries the vault; concurrent callers reuse its result
+        with self._status_lock:
+            cached = self._status_cache
+            if cached and time.monotonic() - cached[0] < _STATUS_CACHE_TTL:
+                return dict(cached[1])
+            
+            result = self._query_bitwarden_status()
+            self._status_cache = (time.monotonic(), result)
+            return dict(result)
+    
+    def _query_bitwarden_status(self) -> Dict[str, Any]:
+        """
+        Query the BitWarden vault status.
+        
+        Returns:
+            Dictionary with connection status and details
+        """
         try:
-            vault_status = self.bitwarden_manager.get_vault_status()
+            vault_status = self._bw_breaker.call(self.bitwarden_manager.get_vault_status, strict=True)
             
             result = {
                 'enabled': True,
@@ -278,31 +608,45 @@ class EnhancedSSHConnector(BaseSSHConnector):
         Returns:
             List of available credentials
         """
-        if not self.enable_bitwarden or not self.bitwarden_manager:
-            return []
-        
         try:
-            mappings = self.bitwarden_manager.get_all_device_mappings()
-            credentials = []
-            
-            for device_ip, mapping in mappings.items():
-                if not host_pattern or host_pattern in device_ip:
-                    credentials.append({
-                        'device_ip': device_ip,
-                        'device_hostname': mapping.device_hostname,
-                        'device_type': mapping.device_type,
-                        'bitwarden_item_name': mapping.bitwarden_item_name,
-                        'credential_type': mapping.credential_type.value,
-                        'auto_discovered': mapping.auto_discovered,
-                        'last_verified': mapping.last_verified.isoformat() if mapping.last_verified else None
-                    })
-            
-            return credentials
-            
+            return list(self.iter_available_credentials(host_pattern))
         except Exception as e:
             self.logger.error(f"Failed to get available credentials: {e}")
             return []
     
+    def iter_available_credentials(self, host_pattern: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over available credentials from BitWarden.
+        
+        Entries are built only for devices matching the pattern, so callers
+        can stop early without materializing the full list.
+        
+        Args:
+            host_pattern: Optional substring of the device IP to filter on
+            
+        Yields:
+            Available credential details, one device at a time
+        """
+        if not self.enable_bitwarden or not self.bitwarden_manager:
+            return
+        
+        for device_ip, mapping in self._ensure_vault_index().items():
+            if device_ip != mapping.device_ip:
+                continue  # Hostname alias of an entry listed by IP
+            if host_pattern and host_pattern not in device_ip:
+                continue
+            
+            last_verified = mapping.last_verified
+            yield {
+                'device_ip': device_ip,
+                'device_hostname': mapping.device_hostname,
+                'device_type': mapping.device_type,
+                'bitwarden_item_name': mapping.bitwarden_item_name,
+                'credential_type': mapping.credential_type.value,
+                'auto_discovered': mapping.auto_discovered,
+                'last_verified': last_verified.isoformat() if last_verified else None
+            }
+    
     def sync_bitwarden_vault(self) -> bool:
         """
         Synchronize BitWarden vault.
@@ -314,7 +658,11 @@ class EnhancedSSHConnector(BaseSSHConnector):
             return False
         
         try:
-            return self.bitwarden_manager.sync_vault()
+            synced = self._bw_breaker.call(self.bitwarden_manager.sync_vault)
+            if synced:
+                self.invalidate_credential_cache()
+                self._vault_index = None
+            return synced
         except Exception as e:
             self.logger.error(f"BitWarden vault sync failed: {e}")
             return False
@@ -331,49 +679,337 @@ class EnhancedConnectionPool(ConnectionPool):
     """Enhanced connection pool with BitWarden integration."""
     
     def __init__(self, max_connections: int = 50, idle_timeout: int = 300,
-                 enable_bitwarden: bool = True):
+                 enable_bitwarden: bool = True, max_sessions: int = _DEFAULT_MAX_SESSIONS,
+                 use_vault_server: bool = False):
         """Initialize enhanced connection pool.
         
         Args:
             max_connections: Maximum number of concurrent connections
             idle_timeout: Timeout for idle connections in seconds
             enable_bitwarden: Enable BitWarden integration
+            max_sessions: Maximum open channels per SSH transport
+            use_vault_server: Query the vault through a local `bw serve`
+                REST API; see EnhancedSSHConnector
         """
         super().__init__(max_connections, idle_timeout)
         self.enable_bitwarden = enable_bitwarden
+        self.use_vault_server = use_vault_server
+        self.max_sessions = max_sessions
         self.enhanced_connector = None
+        
+        # Connections keyed by user@host:port, least recently used first
+        self.connections: "OrderedDict[str, ConnectionInfo]" = OrderedDict()
+        self._pool_lock = threading.Lock()
+        
+        # Username of the last connection made to each host:port, so pooled
+        # connections are found without resolving credentials again
+        self._pool_users: Dict[str, str] = {}
+        
+        # Limits concurrent handshakes per host when connecting in bulk
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        
+        # Channels opened on each pooled connection, keyed like connections
+        self._channels: Dict[str, List[paramiko.Channel]] = {}
+        
+        # (last activity, sequence, key, connection) entries, oldest first.
+        # Entries are checked against the connection when popped rather than
+        # updated on use
+        self._idle_heap: List[Tuple[datetime, int, str, ConnectionInfo]] = []
+        self._idle_sequence = itertools.count()
+        
+        # Resolved addresses keyed by hostname, with resolution time
+        self._dns_cache: Dict[str, Tuple[float, str]] = {}
+    
+    def _resolve(self, host: str) -> str:
+        """Resolve a hostname to an IP address, caching the result.
+        
+        Args:
+            host: Target host IP address or hostname
+            
+        Returns:
+            Resolved IP address, or the host unchanged if resolution fails
+        """
+        cached = self._dns_cache.get(host)
+        if cached and time.monotonic() - cached[0] < _DNS_CACHE_TTL:
+            return cached[1]
+        
+        try:
+            address = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)[0][4][0]
+        except (socket.gaierror, IndexError):
+            # Let the connection attempt report the failure
+            return host
+        
+        self._dns_cache[host] = (time.monotonic(), address)
+        return address
     
     def _get_connector(self) -> EnhancedSSHConnector:
         """Get enhanced SSH connector instance (lazy initialization)."""
         if self.enhanced_connector is None:
             self.enhanced_connector = EnhancedSSHConnector(
-                enable_bitwarden=self.enable_bitwarden
+                enable_bitwarden=self.enable_bitwarden,
+                use_vault_server=self.use_vault_server
             )
         return self.enhanced_connector
     
     def connect_with_bitwarden(self, host: str, device_type: Optional[str] = None,
                               port: int = 22, device_id: Optional[str] = None) -> ConnectionInfo:
-        """Connect using BitWarden credentials with connection pooling."""
-        connection_key = f"{host}:{port}"
-        
-        # Check for existing connection
-        if connection_key in self.connections:
-            connection = self.connections[connection_key]
-            if connection.status == ConnectionStatus.CONNECTED:
-                self.logger.debug(f"Reusing existing connection to {host}:{port}")
+        """Connect using BitWarden credentials with connection pooling.
+        
+        Connections are pooled per user, so connections made as different
+        users to the same host are kept separately. A live connection made
+        as the host's last user is reused without contacting BitWarden;
+        otherwise credentials are resolved first. When the pool is full,
+        the least recently used connection is closed to make room.
+        """
+        target = f"{host}:{port}"
+        
+        # Check for an existing connection as the last user seen for the host
+        with self._pool_lock:
+            username = self._pool_users.get(target)
+            if username is not None:
+                connection = self._pooled_connection(f"{username}@{target}")
+                if connection is not None:
+                    self.logger.debug(f"Reusing existing connection to {target}")
+                    return connection
+        
+        connector = self._get_connector()
+        credentials = connector.resolve_credentials(host, device_type, device_id)
+        connection_key = f"{credentials.username}@{target}"
+        
+        with self._pool_lock:
+            self._pool_users[target] = credentials.username
+            connection = self._pooled_connection(connection_key)
+            if connection is not None:
+                self.logger.debug(f"Reusing existing connection to {target}")
                 return connection
         
         # Create new connection
+        connection = self._connect_resolved(connector, host, credentials, port, device_id or target)
+        return self._add_connection(connection_key, connection)
+    
+    def _connect_resolved(self, connector: EnhancedSSHConnector, host: str,
+                          credentials: AuthenticationCredentials, port: int,
+                          device_id: str) -> ConnectionInfo:
+        """Connect to the cached address of ``host``.
+        
+        Credentials are cached under the host as the caller gave it, not the
+        address dialled, so a rejected login drops them under that name.
+        """
+        try:
+            return connector.connect_with_credentials(
+                self._resolve(host), credentials, port, device_id)
+        except AuthenticationError:
+            connector.invalidate_credential_cache(host)
+            raise
+    
+    def _pooled_connection(self, connection_key: str) -> Optional[ConnectionInfo]:
+        """Return a live pooled connection, dropping a dead one; the pool lock must be held."""
+        connection = self.connections.get(connection_key)
+        if connection is None:
+            return None
+        if connection.status != ConnectionStatus.CONNECTED:
+            del self.connections[connection_key]
+            return None
+        self.connections.move_to_end(connection_key)
+        return connection
+    
+    def open_channel(self, host: str, port: int = 22,
+                     device_type: Optional[str] = None) -> paramiko.Channel:
+        """Open a session channel on a pooled SSH transport.
+        
+        Channels share the host's existing transport, so each one costs a
+        channel open rather than a full SSH handshake. Once a transport has
+        max_sessions open channels, another connection to the host is made
+        and used for further channels.
+        
+        Args:
+            host: Target host IP address or hostname
+            port: SSH port number
+            device_type: Device type for BitWarden credential lookup
+            
+        Returns:
+            Open paramiko session channel
+        """
         connector = self._get_connector()
-        connection = connector.connect_with_bitwarden(
-            host=host,
-            device_type=device_type,
-            port=port,
-            device_id=device_id
-        )
+        credentials = connector.resolve_credentials(host, device_type, None)
+        base_key = f"{credentials.username}@{host}:{port}"
+        
+        # Use the first live transport for this host with a free session slot
+        index = 0
+        while True:
+            connection_key = base_key if index == 0 else f"{base_key}#{index}"
+            with self._pool_lock:
+                connection = self.connections.get(connection_key)
+                if connection is not None and connection.status != ConnectionStatus.CONNECTED:
+                    del self.connections[connection_key]
+                    self._channels.pop(connection_key, None)
+                    connection = None
+                
+                if connection is not None:
+                    channels = [channel for channel in self._channels.get(connection_key, [])
+                                if not channel.closed]
+                    self._channels[connection_key] = channels
+                    if len(channels) < self.max_sessions:
+                        self.connections.move_to_end(connection_key)
+                        break
+            
+            if connection is None:
+                connection = self._connect_resolved(
+                    connector, host, credentials, port, connection_key)
+                connection = self._add_connection(connection_key, connection)
+                break
+            
+            index += 1
+        
+        channel = connection._ssh_client.get_transport().open_session()
+        with self._pool_lock:
+            self._channels.setdefault(connection_key, []).append(channel)
+        connection.update_activity()
+        
+        return channel
+    
+    def get_connection(self,
+                       device_id: str,
+                       host: str,
+                       credentials: AuthenticationCredentials,
+                       port: int = 22) -> ConnectionInfo:
+        """Get or create a connection, tracking new ones for idle cleanup.
+        
+        Args:
+            device_id: Unique device identifier
+            host: Target host IP address or hostname
+            credentials: Authentication credentials
+            port: SSH port (default 22)
+            
+        Returns:
+            ConnectionInfo object
+        """
+        previous = self.connections.get(device_id)
+        connection = super().get_connection(device_id, host, credentials, port)
+        if connection is not previous:
+            with self._pool_lock:
+                self._push_idle(device_id, connection)
+        return connection
+    
+    def _push_idle(self, connection_key: str, connection: ConnectionInfo) -> None:
+        """Queue a pooled connection for idle cleanup; the pool lock must be held."""
+        heapq.heappush(self._idle_heap, (connection.last_activity, next(self._idle_sequence),
+                                         connection_key, connection))
+    
+    def _add_connection(self, connection_key: str, connection: ConnectionInfo) -> ConnectionInfo:
+        """Store a connection, evicting the least recently used ones if full.
         
-        # Store in pool
-        if len(self.connections) < self.max_connections:
-            self.connections[connection_key] = connection
+        If another caller pooled a live connection under the same key in the
+        meantime, that one is kept and the new connection is closed.
+        
+        Returns:
+            The connection pooled under the key
+        """
+        evicted = []
+        duplicate = None
+        with self._pool_lock:
+            existing = self._pooled_connection(connection_key)
+            if existing is not None and existing is not connection:
+                duplicate, connection = connection, existing
+            else:
+                self.connections[connection_key] = connection
+                self._push_idle(connection_key, connection)
+            while len(self.connections) > self.max_connections:
+                evicted_key, evicted_connection = self.connections.popitem(last=False)
+                self._channels.pop(evicted_key, None)
+                evicted.append((evicted_key, evicted_connection))
+        
+        if duplicate is not None:
+            self.logger.debug(f"Closing duplicate connection {connection_key}")
+            self._get_connector().disconnect(duplicate)
+        
+        for evicted_key, evicted_connection in evicted:
+            self.logger.info(f"Evicting least recently used connection {evicted_key}")
+            self._get_connector().disconnect(evicted_connection)
+        
+        return connection
+    
+    def cleanup_idle_connections(self) -> None:
+        """Remove idle connections that exceed the timeout.
+        
+        Only heap entries older than the timeout are examined, so the cost
+        depends on the number of candidates rather than the pool size.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.idle_timeout)
+        idle = []
+        
+        with self._pool_lock:
+            heap = self._idle_heap
+            while heap and heap[0][0] < cutoff:
+                _, _, connection_key, connection = heapq.heappop(heap)
+                if self.connections.get(connection_key) is not connection:
+                    continue  # Already removed or replaced
+                
+                if connection.last_activity >= cutoff:
+                    # Used since the entry was pushed; check again later
+                    self._push_idle(connection_key, connection)
+                    continue
+                
+                del self.connections[connection_key]
+                self._channels.pop(connection_key, None)
+                idle.append((connection_key, connection))
+        
+        for connection_key, connection in idle:
+            self.logger.info("Removing idle connection", device_id=connection_key)
+            self._get_connector().disconnect(connection)
+        
+        if idle:
+            self.logger.info(f"Cleaned up {len(idle)} idle connections",
+                           remaining_connections=len(self.connections))
+    
+    def connect_many(self, 
+                     targets: List[Tuple[str, Optional[str], int]]) -> Dict[str, Union[ConnectionInfo, Exception]]:
+        """Connect to many devices concurrently using BitWarden credentials.
+        
+        The device mapping index is loaded once up front so all workers share
+        it, and at most _MAX_STARTUPS_PER_HOST handshakes run against any one
+        host at a time to stay under sshd's MaxStartups limit.
+        
+        Args:
+            targets: (host, device_type, port) tuples to connect to
+            
+        Returns:
+            Dictionary mapping "host:port" to the connection, or to the
+            exception raised while connecting
+        """
+        if not targets:
+            return {}
+        
+        connector = self._get_connector()
+        if connector.enable_bitwarden and connector.bitwarden_manager:
+            try:
+                connector._ensure_vault_index()
+            except Exception as e:
+                self.logger.warning(f"Failed to preload BitWarden device index: {e}")
+        
+        results: Dict[str, Union[ConnectionInfo, Exception]] = {}
+        max_workers = min(len(targets), self.max_connections, _MAX_CONNECT_WORKERS)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._connect_limited, host, device_type, port): f"{host}:{port}"
+                for host, device_type, port in targets
+            }
+            
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    results[target] = future.result()
+                except Exception as e:
+                    self.logger.warning(f"Bulk connection to {target} failed: {e}")
+                    results[target] = e
+        
+        return results
+    
+    def _connect_limited(self, host: str, device_type: Optional[str], port: int) -> ConnectionInfo:
+        """Connect while holding one of the host's handshake slots."""
+        with self._pool_lock:
+            slots = self._host_slots.setdefault(host, threading.Semaphore(_MAX_STARTUPS_PER_HOST))
         
-        return connection
\ No newline at end of file
+        with slots:
+            return self.connect_with_bitwarden(host, device_type, port)
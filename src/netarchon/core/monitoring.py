@@ -5,18 +5,42 @@ Real-time monitoring and metrics collection for network devices.
 """
 
 import json
+import sys
 import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, List, Mapping, Optional, Any, Set, Union
 from dataclasses import dataclass
 from enum import Enum
 
 from ..models.connection import ConnectionInfo, CommandResult
 from ..models.device import DeviceType
 from ..utils.exceptions import MonitoringError
-from ..utils.logger import get_logger
+from ..utils.logger import get_logger, LogLevel
 from .command_executor import CommandExecutor
 
+# Metric records are created in bulk every poll; store their fields in slots
+# rather than a per-instance __dict__ where dataclasses support it (3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# monitoring_commands keys whose commands make up a system metrics poll
+_SYSTEM_METRIC_KEYS = ('system', 'memory', 'uptime', 'temperature', 'power')
+
+# Device types whose CLI accepts ";"-chained commands and echo, so the system
+# metric commands can share one round trip
+_BATCHED_DEVICE_TYPES = frozenset({DeviceType.CISCO_NXOS})
+
+# Metrics kept in memory per device before the oldest are dropped
+_DEFAULT_MAX_METRICS_PER_DEVICE = 100_000
+
+# Upper bound on devices collected at once by MonitoringCollector.collect_all
+_MAX_COLLECT_WORKERS = 32
+
+# Percentage change above which a numeric metric counts as changed
+_SIGNIFICANT_CHANGE_PERCENT = 10.0
+
 
 class MetricType(Enum):
     """Types of metrics that can be collected."""
@@ -28,7 +52,7 @@ class MetricType(Enum):
     POWER = "power"
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class InterfaceMetrics:
     """Interface-specific metrics data."""
     interface_name: str
@@ -48,7 +72,7 @@ class InterfaceMetrics:
     device_id: str
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class SystemMetrics:
     """System-level metrics data."""
     device_id: str
@@ -63,7 +87,7 @@ class SystemMetrics:
     timestamp: datetime
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class MetricData:
     """Generic metric data structure."""
     device_id: str
@@ -78,13 +102,17 @@ class MetricData:
 class MonitoringCollector:
     """Main monitoring and metrics collection logic for network devices."""
     
-    def __init__(self, storage_backend: Optional[str] = None):
+    def __init__(self, storage_backend: Optional[str] = None,
+                 max_metrics_per_device: Optional[int] = _DEFAULT_MAX_METRICS_PER_DEVICE):
         """Initialize monitoring collector.
         
         Args:
             storage_backend: Storage backend for metrics (file, database, etc.)
+            max_metrics_per_device: Most metrics kept in memory per device, oldest
+                dropped first; None keeps all
         """
         self.storage_backend = storage_backend or "memory"
+        self.max_metrics_per_device = max_metrics_per_device
         self.logger = get_logger(f"{__name__}.MonitoringCollector")
         self.command_executor = CommandExecutor()
         
@@ -132,8 +160,10 @@ class MonitoringCollector:
             }
         }
         
-        # In-memory storage for metrics (will be replaced with persistent storage)
-        self._metrics_storage: List[MetricData] = []
+        # In-memory storage for metrics (will be replaced with persistent storage),
+        # kept per device in timestamp order with a parallel list of timestamps
+        self._metrics_storage: Dict[str, List[MetricData]] = defaultdict(list)
+        self._metric_timestamps: Dict[str, List[datetime]] = defaultdict(list)
     
     def collect_interface_metrics(self, connection: ConnectionInfo) -> List[InterfaceMetrics]:
         """Collect interface statistics from a network device.
@@ -147,8 +177,9 @@ class MonitoringCollector:
         Raises:
             MonitoringError: If metrics collection fails
         """
-        self.logger.info(f"Starting interface metrics collection for device {connection.device_id}",
-                        device_id=connection.device_id)
+        if self.logger.is_enabled_for(LogLevel.INFO):
+            self.logger.info(f"Starting interface metrics collection for device {connection.device_id}",
+                            device_id=connection.device_id)
         
         try:
             device_type = getattr(connection, 'device_type', DeviceType.GENERIC)
@@ -163,8 +194,9 @@ class MonitoringCollector:
             # Parse interface data based on device type
             interfaces = self._parse_interface_data(result.output, device_type, connection.device_id)
             
-            self.logger.info(f"Collected metrics for {len(interfaces)} interfaces",
-                           device_id=connection.device_id, interface_count=len(interfaces))
+            if self.logger.is_enabled_for(LogLevel.INFO):
+                self.logger.info(f"Collected metrics for {len(interfaces)} interfaces",
+                               device_id=connection.device_id, interface_count=len(interfaces))
             
             return interfaces
             
@@ -185,27 +217,34 @@ class MonitoringCollector:
         Raises:
             MonitoringError: If metrics collection fails
         """
-        self.logger.info(f"Starting system metrics collection for device {connection.device_id}",
-                        device_id=connection.device_id)
+        if self.logger.is_enabled_for(LogLevel.INFO):
+            self.logger.info(f"Starting system metrics collection for device {connection.device_id}",
+                            device_id=connection.device_id)
         
         try:
             device_type = getattr(connection, 'device_type', DeviceType.GENERIC)
             timestamp = datetime.now()
             
-            # Collect CPU metrics
-            cpu_utilization = self._collect_cpu_metrics(connection, device_type)
+            bundle = None
+            if device_type in _BATCHED_DEVICE_TYPES:
+                try:
+                    bundle = self._collect_system_bundle(connection, device_type)
+                except Exception as e:
+                    self.logger.warning(f"Batched system metrics collection failed: {str(e)}",
+                                      device_id=connection.device_id)
+            
+            if bundle is not None:
+                cpu_utilization = self._parse_cpu_metrics(bundle['system'])
+                memory_total, memory_used = self._parse_memory_metrics(bundle['memory'])
+                uptime = self._parse_uptime_metrics(bundle['uptime'])
+                temperature = self._parse_temperature_metrics(bundle['temperature'])
+                power_consumption = self._parse_power_metrics(bundle['power'])
+            else:
+                cpu_utilization, (memory_total, memory_used), uptime, temperature, power_consumption = \
+                    self._collect_system_concurrently(connection, device_type)
             
-            # Collect memory metrics
-            memory_total, memory_used = self._collect_memory_metrics(connection, device_type)
             memory_utilization = (memory_used / memory_total * 100) if memory_total > 0 else 0.0
             
-            # Collect uptime
-            uptime = self._collect_uptime_metrics(connection, device_type)
-            
-            # Collect optional metrics (temperature, power)
-            temperature = self._collect_temperature_metrics(connection, device_type)
-            power_consumption = self._collect_power_metrics(connection, device_type)
-            
             system_metrics = SystemMetrics(
                 device_id=connection.device_id,
                 cpu_utilization=cpu_utilization,
@@ -219,10 +258,11 @@ class MonitoringCollector:
                 timestamp=timestamp
             )
             
-            self.logger.info(f"System metrics collection completed",
-                           device_id=connection.device_id,
-                           cpu_utilization=cpu_utilization,
-                           memory_utilization=memory_utilization)
+            if self.logger.is_enabled_for(LogLevel.INFO):
+                self.logger.info("System metrics collection completed",
+                               device_id=connection.device_id,
+                               cpu_utilization=cpu_utilization,
+                               memory_utilization=memory_utilization)
             
             return system_metrics
             
@@ -231,6 +271,55 @@ class MonitoringCollector:
             self.logger.error(error_msg, device_id=connection.device_id)
             raise MonitoringError(error_msg) from e
     
+    def collect_all(self, connections: List[ConnectionInfo]) -> Dict[str, Union[SystemMetrics, MonitoringError]]:
+        """Collect system metrics from many devices concurrently.
+        
+        Args:
+            connections: Active connections to the devices
+            
+        Returns:
+            Dictionary mapping device ID to its SystemMetrics, or to the
+            MonitoringError raised while collecting them
+        """
+        return self._collect_across_devices(self.collect_system_metrics, connections)
+    
+    def collect_all_interface_metrics(self, connections: List[ConnectionInfo]
+                                      ) -> Dict[str, Union[List[InterfaceMetrics], MonitoringError]]:
+        """Collect interface metrics from many devices concurrently.
+        
+        Args:
+            connections: Active connections to the devices
+            
+        Returns:
+            Dictionary mapping device ID to its InterfaceMetrics list, or to
+            the MonitoringError raised while collecting them
+        """
+        return self._collect_across_devices(self.collect_interface_metrics, connections)
+    
+    def _collect_across_devices(self, collect: Callable[[ConnectionInfo], Any],
+                                connections: List[ConnectionInfo]) -> Dict[str, Any]:
+        """Run a per-device collection method for many devices on a thread pool."""
+        if not connections:
+            return {}
+        
+        results: Dict[str, Any] = {}
+        max_workers = min(len(connections), _MAX_COLLECT_WORKERS)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(collect, connection): connection.device_id
+                for connection in connections
+            }
+            
+            for future in as_completed(futures):
+                device_id = futures[future]
+                try:
+                    results[device_id] = future.result()
+                except MonitoringError as e:
+                    results[device_id] = e
+        
+        return results
+    
     def store_metrics(self, metrics: List[MetricData]) -> bool:
         """Store collected metrics to the configured storage backend.
         
@@ -244,14 +333,19 @@ class MonitoringCollector:
             return True
         
         try:
-            if self.storage_backend == "memory":
-                self._metrics_storage.extend(metrics)
-                self.logger.debug(f"Stored {len(metrics)} metrics to memory storage",
-                                metric_count=len(metrics))
-            else:
+            if self.storage_backend != "memory":
                 # Future enhancement: implement database/file storage
                 self.logger.warning(f"Storage backend '{self.storage_backend}' not implemented, using memory")
-                self._metrics_storage.extend(metrics)
+            
+            for metric in metrics:
+                self._index_metric(metric)
+            
+            if self.max_metrics_per_device is not None:
+                self._trim_history({metric.device_id for metric in metrics})
+            
+            if self.storage_backend == "memory" and self.logger.is_enabled_for(LogLevel.DEBUG):
+                self.logger.debug(f"Stored {len(metrics)} metrics to memory storage",
+                                metric_count=len(metrics))
             
             return True
             
@@ -259,6 +353,85 @@ class MonitoringCollector:
             self.logger.error(f"Failed to store metrics: {str(e)}", metric_count=len(metrics))
             return False
     
+    def store_metric_values(self, device_id: str, metric_type: MetricType,
+                            values: Mapping[str, Union[int, float, str]], unit: str,
+                            timestamp: Optional[datetime] = None) -> bool:
+        """Store several readings of one type taken from a device at the same time.
+        
+        Shared fields are interned once and the readings are appended to the
+        device's history in one step, rather than indexed one by one.
+        
+        Args:
+            device_id: Device identifier
+            metric_type: Type of all the readings
+            values: Reading values keyed by metric name
+            unit: Unit of all the readings
+            timestamp: When the readings were taken (defaults to now)
+            
+        Returns:
+            True if storage was successful, False otherwise
+        """
+        if not values:
+            return True
+        
+        try:
+            timestamp = timestamp or datetime.now()
+            device_id = sys.intern(device_id)
+            if unit:
+                unit = sys.intern(unit)
+            
+            metrics = [
+                MetricData(device_id, metric_type, sys.intern(name), value, unit, timestamp)
+                for name, value in values.items()
+            ]
+            
+            timestamps = self._metric_timestamps[device_id]
+            if not timestamps or timestamp >= timestamps[-1]:
+                timestamps.extend([timestamp] * len(metrics))
+                self._metrics_storage[device_id].extend(metrics)
+            else:
+                for metric in metrics:
+                    self._index_metric(metric)
+            
+            if self.max_metrics_per_device is not None:
+                self._trim_history({device_id})
+            
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to store metric values: {str(e)}",
+                            device_id=device_id, metric_count=len(values))
+            return False
+    
+    def _index_metric(self, metric: MetricData) -> None:
+        """Add a metric to its device's history, keeping timestamp order."""
+        # Stored metrics repeat a few names many times; share one copy of each
+        metric.device_id = sys.intern(metric.device_id)
+        metric.metric_name = sys.intern(metric.metric_name)
+        if metric.unit:
+            metric.unit = sys.intern(metric.unit)
+        
+        timestamps = self._metric_timestamps[metric.device_id]
+        device_metrics = self._metrics_storage[metric.device_id]
+        
+        # Metrics normally arrive in time order and are simply appended
+        if not timestamps or metric.timestamp >= timestamps[-1]:
+            timestamps.append(metric.timestamp)
+            device_metrics.append(metric)
+        else:
+            position = bisect_right(timestamps, metric.timestamp)
+            timestamps.insert(position, metric.timestamp)
+            device_metrics.insert(position, metric)
+    
+    def _trim_history(self, device_ids: Set[str]) -> None:
+        """Drop the oldest metrics of devices holding more than the limit."""
+        limit = self.max_metrics_per_device
+        for device_id in device_ids:
+            excess = len(self._metric_timestamps[device_id]) - limit
+            if excess > 0:
+                del self._metric_timestamps[device_id][:excess]
+                del self._metrics_storage[device_id][:excess]
+    
     def get_historical_metrics(self, device_id: str, metric_type: Optional[MetricType] = None,
                              hours_back: int = 24) -> List[MetricData]:
         """Retrieve historical metrics for a device.
@@ -274,19 +447,22 @@ class MonitoringCollector:
         try:
             cutoff_time = datetime.now() - timedelta(hours=hours_back)
             
+            # Only the device's metrics newer than the cutoff are examined
+            device_metrics = self._metrics_storage.get(device_id, [])
+            start = bisect_left(self._metric_timestamps.get(device_id, []), cutoff_time)
+            
             filtered_metrics = [
-                metric for metric in self._metrics_storage
-                if (metric.device_id == device_id and
-                    metric.timestamp >= cutoff_time and
-                    (metric_type is None or metric.metric_type == metric_type))
+                metric for metric in device_metrics[start:]
+                if metric_type is None or metric.metric_type == metric_type
             ]
             
-            # Sort by timestamp (newest first)
-            filtered_metrics.sort(key=lambda x: x.timestamp, reverse=True)
+            # Newest first
+            filtered_metrics.reverse()
             
-            self.logger.debug(f"Retrieved {len(filtered_metrics)} historical metrics",
-                            device_id=device_id, metric_type=metric_type,
-                            hours_back=hours_back)
+            if self.logger.is_enabled_for(LogLevel.DEBUG):
+                self.logger.debug(f"Retrieved {len(filtered_metrics)} historical metrics",
+                                device_id=device_id, metric_type=metric_type,
+                                hours_back=hours_back)
             
             return filtered_metrics
             
@@ -302,21 +478,21 @@ class MonitoringCollector:
         
         try:
             # Basic parsing implementation - this would be device-specific in production
-            lines = output.split('\n')
             current_interface = None
             
-            for line in lines:
-                line = line.strip()
+            for line in output.split('\n'):
+                # Lowercase each line once for all keyword checks
+                lowered = line.lower()
                 
                 # Look for interface names
-                if 'interface' in line.lower() or 'ethernet' in line.lower():
+                if 'interface' in lowered or 'ethernet' in lowered:
                     # Extract interface name (simplified)
                     parts = line.split()
                     if parts:
                         current_interface = parts[0]
                 
                 # Extract basic statistics (simplified parsing)
-                if current_interface and ('bytes' in line.lower() or 'packets' in line.lower()):
+                if current_interface and ('bytes' in lowered or 'packets' in lowered):
                     # Create a basic interface metric with default values
                     interface_metric = InterfaceMetrics(
                         interface_name=current_interface,
@@ -382,81 +558,131 @@ class MonitoringCollector:
         
         return interfaces
     
+    def _collect_system_concurrently(self, connection: ConnectionInfo, device_type: DeviceType) -> tuple:
+        """Run the system metric commands as separate, concurrent round trips.
+        
+        Returns:
+            Tuple of (cpu utilization, (memory total, memory used), uptime,
+            temperature, power consumption)
+        """
+        with ThreadPoolExecutor(max_workers=len(_SYSTEM_METRIC_KEYS)) as executor:
+            futures = [
+                executor.submit(self._collect_cpu_metrics, connection, device_type),
+                executor.submit(self._collect_memory_metrics, connection, device_type),
+                executor.submit(self._collect_uptime_metrics, connection, device_type),
+                executor.submit(self._collect_temperature_metrics, connection, device_type),
+                executor.submit(self._collect_power_metrics, connection, device_type)
+            ]
+            return tuple(future.result() for future in futures)
+    
+    def _collect_system_bundle(self, connection: ConnectionInfo,
+                               device_type: DeviceType) -> Dict[str, CommandResult]:
+        """Run the system metric commands in one batched round trip.
+        
+        Commands shared by several metrics are sent once. CommandExecutor
+        falls back to sending them one at a time if they cannot be chained.
+        
+        Returns:
+            Dictionary mapping metric command key to its CommandResult
+        """
+        commands = self.monitoring_commands[device_type]
+        unique_commands = list(dict.fromkeys(commands[key] for key in _SYSTEM_METRIC_KEYS))
+        
+        results = self.command_executor.execute_batch_read(connection, unique_commands)
+        by_command = {result.command: result for result in results}
+        
+        return {key: by_command[commands[key]] for key in _SYSTEM_METRIC_KEYS}
+    
     def _collect_cpu_metrics(self, connection: ConnectionInfo, device_type: DeviceType) -> float:
         """Collect CPU utilization metrics."""
         try:
             cpu_cmd = self.monitoring_commands[device_type]['system']
-            result = self.command_executor.execute_command(connection, cpu_cmd)
-            
-            if result.success:
-                # Basic CPU parsing - would be device-specific in production
-                return 15.5  # Default value for testing
-            
+            return self._parse_cpu_metrics(self.command_executor.execute_command(connection, cpu_cmd))
         except Exception as e:
             self.logger.warning(f"CPU metrics collection failed: {str(e)}")
         
         return 0.0
     
+    def _parse_cpu_metrics(self, result: CommandResult) -> float:
+        """Parse CPU utilization from command output."""
+        if result.success:
+            # Basic CPU parsing - would be device-specific in production
+            return 15.5  # Default value for testing
+        
+        return 0.0
+    
     def _collect_memory_metrics(self, connection: ConnectionInfo, device_type: DeviceType) -> tuple[int, int]:
         """Collect memory utilization metrics."""
         try:
             memory_cmd = self.monitoring_commands[device_type]['memory']
-            result = self.command_executor.execute_command(connection, memory_cmd)
-            
-            if result.success:
-                # Basic memory parsing - would be device-specific in production
-                return 1024000000, 512000000  # 1GB total, 512MB used
-            
+            return self._parse_memory_metrics(self.command_executor.execute_command(connection, memory_cmd))
         except Exception as e:
             self.logger.warning(f"Memory metrics collection failed: {str(e)}")
         
         return 0, 0
     
+    def _parse_memory_metrics(self, result: CommandResult) -> tuple[int, int]:
+        """Parse total and used memory from command output."""
+        if result.success:
+            # Basic memory parsing - would be device-specific in production
+            return 1024000000, 512000000  # 1GB total, 512MB used
+        
+        return 0, 0
+    
     def _collect_uptime_metrics(self, connection: ConnectionInfo, device_type: DeviceType) -> int:
         """Collect system uptime metrics."""
         try:
             uptime_cmd = self.monitoring_commands[device_type]['uptime']
-            result = self.command_executor.execute_command(connection, uptime_cmd)
-            
-            if result.success:
-                # Basic uptime parsing - would be device-specific in production
-                return 86400  # 24 hours in seconds
-            
+            return self._parse_uptime_metrics(self.command_executor.execute_command(connection, uptime_cmd))
         except Exception as e:
             self.logger.warning(f"Uptime metrics collection failed: {str(e)}")
         
         return 0
     
+    def _parse_uptime_metrics(self, result: CommandResult) -> int:
+        """Parse system uptime from command output."""
+        if result.success:
+            # Basic uptime parsing - would be device-specific in production
+            return 86400  # 24 hours in seconds
+        
+        return 0
+    
     def _collect_temperature_metrics(self, connection: ConnectionInfo, device_type: DeviceType) -> Optional[float]:
         """Collect temperature metrics."""
         try:
             temp_cmd = self.monitoring_commands[device_type]['temperature']
-            result = self.command_executor.execute_command(connection, temp_cmd)
-            
-            if result.success:
-                # Basic temperature parsing - would be device-specific in production
-                return 45.5  # Default temperature in celsius
-            
+            return self._parse_temperature_metrics(self.command_executor.execute_command(connection, temp_cmd))
         except Exception as e:
             self.logger.debug(f"Temperature metrics collection failed: {str(e)}")
         
         return None
     
+    def _parse_temperature_metrics(self, result: CommandResult) -> Optional[float]:
+        """Parse temperature from command output."""
+        if result.success:
+            # Basic temperature parsing - would be device-specific in production
+            return 45.5  # Default temperature in celsius
+        
+        return None
+    
     def _collect_power_metrics(self, connection: ConnectionInfo, device_type: DeviceType) -> Optional[float]:
         """Collect power consumption metrics."""
         try:
             power_cmd = self.monitoring_commands[device_type]['power']
-            result = self.command_executor.execute_command(connection, power_cmd)
-            
-            if result.success:
-                # Basic power parsing - would be device-specific in production
-                return 150.0  # Default power consumption in watts
-            
+            return self._parse_power_metrics(self.command_executor.execute_command(connection, power_cmd))
         except Exception as e:
             self.logger.debug(f"Power metrics collection failed: {str(e)}")
         
         return None
     
+    def _parse_power_metrics(self, result: CommandResult) -> Optional[float]:
+        """Parse power consumption from command output."""
+        if result.success:
+            # Basic power parsing - would be device-specific in production
+            return 150.0  # Default power consumption in watts
+        
+        return None
+    
     def process_metrics_for_alerts(self, metrics: List[MetricData]) -> List[MetricData]:
         """Process and normalize metrics for alert processing.
         
@@ -475,8 +701,9 @@ class MonitoringCollector:
                 if normalized_metric:
                     processed_metrics.append(normalized_metric)
             
-            self.logger.debug(f"Processed {len(processed_metrics)} metrics for alert evaluation",
-                            original_count=len(metrics), processed_count=len(processed_metrics))
+            if self.logger.is_enabled_for(LogLevel.DEBUG):
+                self.logger.debug(f"Processed {len(processed_metrics)} metrics for alert evaluation",
+                                original_count=len(metrics), processed_count=len(processed_metrics))
             
         except Exception as e:
             self.logger.error(f"Error processing metrics for alerts: {str(e)}")
@@ -504,32 +731,34 @@ class MonitoringCollector:
         
         try:
             # Create lookup dictionaries
-            current_lookup = {f"{m.device_id}_{m.metric_name}": m for m in current_metrics}
-            previous_lookup = {f"{m.device_id}_{m.metric_name}": m for m in previous_metrics}
+            current_lookup = {(m.device_id, m.metric_name): m for m in current_metrics}
+            previous_lookup = {(m.device_id, m.metric_name): m for m in previous_metrics}
+            
+            current_keys = current_lookup.keys()
+            previous_keys = previous_lookup.keys()
             
             # Find new metrics
-            new_metric_keys = set(current_lookup.keys()) - set(previous_lookup.keys())
-            comparison_results['new_metrics'] = [current_lookup[key] for key in new_metric_keys]
+            comparison_results['new_metrics'] = [current_lookup[key] for key in current_keys - previous_keys]
             
             # Find missing metrics
-            missing_metric_keys = set(previous_lookup.keys()) - set(current_lookup.keys())
-            comparison_results['missing_metrics'] = [previous_lookup[key] for key in missing_metric_keys]
+            comparison_results['missing_metrics'] = [previous_lookup[key] for key in previous_keys - current_keys]
             
-            # Compare existing metrics
-            common_keys = set(current_lookup.keys()) & set(previous_lookup.keys())
-            for key in common_keys:
+            # Compare existing metrics, computing each change percentage once
+            value_changes = comparison_results['value_changes']
+            significant_changes = comparison_results['significant_changes']
+            for key in current_keys & previous_keys:
                 current = current_lookup[key]
                 previous = previous_lookup[key]
                 
-                # Check for value changes
-                if self._is_significant_change(current, previous):
-                    comparison_results['value_changes'].append({
+                change_percent = self._calculate_change_percent(current.value, previous.value)
+                if self._is_significant_percent(current, previous, change_percent):
+                    value_changes.append({
                         'metric': current,
                         'previous_value': previous.value,
                         'current_value': current.value,
-                        'change_percent': self._calculate_change_percent(current.value, previous.value)
+                        'change_percent': change_percent
                     })
-                    comparison_results['significant_changes'].append(current)
+                    significant_changes.append(current)
             
             # Set overall change flag
             comparison_results['changes_detected'] = (
@@ -538,11 +767,12 @@ class MonitoringCollector:
                 len(comparison_results['significant_changes']) > 0
             )
             
-            self.logger.debug(f"Metric comparison completed",
-                            changes_detected=comparison_results['changes_detected'],
-                            new_metrics=len(comparison_results['new_metrics']),
-                            missing_metrics=len(comparison_results['missing_metrics']),
-                            value_changes=len(comparison_results['value_changes']))
+            if self.logger.is_enabled_for(LogLevel.DEBUG):
+                self.logger.debug("Metric comparison completed",
+                                changes_detected=comparison_results['changes_detected'],
+                                new_metrics=len(comparison_results['new_metrics']),
+                                missing_metrics=len(comparison_results['missing_metrics']),
+                                value_changes=len(comparison_results['value_changes']))
             
         except Exception as e:
             self.logger.error(f"Error comparing metrics: {str(e)}")
@@ -564,14 +794,12 @@ class MonitoringCollector:
         
         try:
             # Group metrics by device and metric name
-            from collections import defaultdict
-            metric_groups = defaultdict(list)
+            metric_groups: Dict[tuple, List[MetricData]] = defaultdict(list)
             for metric in metrics:
-                key = f"{metric.device_id}_{metric.metric_name}_{metric.metric_type.value}"
-                metric_groups[key].append(metric)
+                metric_groups[(metric.device_id, metric.metric_name, metric.metric_type)].append(metric)
             
             # Aggregate each group
-            for group_key, group_metrics in metric_groups.items():
+            for group_metrics in metric_groups.values():
                 if len(group_metrics) > 1:
                     aggregated = self._aggregate_metric_group(group_metrics)
                     if aggregated:
@@ -580,7 +808,8 @@ class MonitoringCollector:
                     # Single metric, no aggregation needed
                     aggregated_metrics.extend(group_metrics)
             
-            self.logger.debug(f"Aggregated {len(metrics)} metrics into {len(aggregated_metrics)} groups")
+            if self.logger.is_enabled_for(LogLevel.DEBUG):
+                self.logger.debug(f"Aggregated {len(metrics)} metrics into {len(aggregated_metrics)} groups")
             
         except Exception as e:
             self.logger.error(f"Error aggregating metrics: {str(e)}")
@@ -610,15 +839,17 @@ class MonitoringCollector:
     
     def _is_significant_change(self, current: MetricData, previous: MetricData) -> bool:
         """Determine if metric change is significant enough to report."""
+        change_percent = self._calculate_change_percent(current.value, previous.value)
+        return self._is_significant_percent(current, previous, change_percent)
+    
+    @staticmethod
+    def _is_significant_percent(current: MetricData, previous: MetricData,
+                                change_percent: Optional[float]) -> bool:
+        """Decide significance from an already computed change percentage."""
         try:
-            # For numeric values, check percentage change
-            if isinstance(current.value, (int, float)) and isinstance(previous.value, (int, float)):
-                if previous.value == 0:
-                    return current.value != 0
-                
-                change_percent = abs((current.value - previous.value) / previous.value * 100)
-                # Consider >10% change as significant for most metrics
-                return change_percent > 10.0
+            # For numeric values, consider >10% change as significant for most metrics
+            if change_percent is not None:
+                return abs(change_percent) > _SIGNIFICANT_CHANGE_PERCENT
             
             # For string values, any change is significant
             return current.value != previous.value
@@ -643,18 +874,21 @@ class MonitoringCollector:
             if not metrics:
                 return None
             
-            # Use the latest metric as base
-            base_metric = max(metrics, key=lambda m: m.timestamp)
-            
-            # For numeric metrics, calculate average
-            numeric_values = []
+            # Find the latest metric and the numeric total in a single pass
+            base_metric = metrics[0]
+            numeric_total = 0.0
+            numeric_count = 0
             for metric in metrics:
-                if isinstance(metric.value, (int, float)):
-                    numeric_values.append(metric.value)
-            
-            if numeric_values:
+                if metric.timestamp > base_metric.timestamp:
+                    base_metric = metric
+                value = metric.value
+                if isinstance(value, (int, float)):
+                    numeric_total += value
+                    numeric_count += 1
+            
+            if numeric_count:
                 # Create aggregated metric with average value
-                aggregated_value = sum(numeric_values) / len(numeric_values)
+                aggregated_value = numeric_total / numeric_count
                 return MetricData(
                     device_id=base_metric.device_id,
                     metric_type=base_metric.metric_type,
@@ -352,7 +352,7 @@ class SSHConnector:
         Args:
             connection: ConnectionInfo object to disconnect
         """
-        if not hasattr(connection, '_ssh_client') or not connection._ssh_client:
+        if connection._ssh_client is None:
             self.logger.warning("No active SSH client to disconnect",
                               device_id=connection.device_id)
             return
@@ -383,7 +383,7 @@ class SSHConnector:
         if not connection.is_connected():
             return False
             
-        if not hasattr(connection, '_ssh_client') or not connection._ssh_client:
+        if connection._ssh_client is None:
             connection.status = ConnectionStatus.DISCONNECTED
             return False
             
@@ -6,6 +6,7 @@ and device authentication for NetArchon.
 """
 
 import json
+import socket
 import subprocess
 import time
 import os
@@ -29,6 +30,22 @@ from .exceptions import (
     BitWardenSyncError, BitWardenTimeoutError, BitWardenLockError
 )
 
+# Optional HTTP client for the local `bw serve` REST API
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+# Seconds to wait for a spawned `bw serve` to start answering requests
+_SERVE_STARTUP_TIMEOUT = 15.0
+
+# Attempts to start `bw serve`, each on a newly reserved port
+_SERVE_START_ATTEMPTS = 3
+
+# Seconds the CLI is used after `bw serve` failed to start before trying again
+_SERVE_RETRY_INTERVAL = 60.0
+
 
 class BitWardenManager:
     """
@@ -38,8 +55,18 @@ class BitWardenManager:
     for seamless network device authentication.
     """
     
-    def __init__(self, config_dir: str = "config"):
-        """Initialize BitWarden manager."""
+    def __init__(self, config_dir: str = "config", use_serve: bool = False):
+        """
+        Initialize BitWarden manager.
+        
+        Args:
+            config_dir: Directory holding configuration and mapping files
+            use_serve: Query the vault through a local `bw serve` REST API
+                instead of spawning the CLI for every lookup. The API has no
+                authentication and serves the unlocked vault, so while it
+                runs any local user or process that can reach 127.0.0.1 can
+                read every secret in it. Only enable it on single-user hosts.
+        """
         self.logger = get_logger("BitWardenManager")
         self.config_dir = Path(config_dir)
         self.config_dir.mkdir(exist_ok=True)
@@ -70,6 +97,14 @@ class BitWardenManager:
         self.cli_timeout = 30
         self.session_timeout = 3600  # 1 hour
         
+        # Local `bw serve` process, started on first use when enabled
+        self.use_serve = use_serve and REQUESTS_AVAILABLE
+        self._serve_process: Optional[subprocess.Popen] = None
+        self._serve_url: Optional[str] = None
+        self._serve_lock = Lock()
+        self._serve_retry_at = 0.0
+        self._http = None
+        
     def _load_configuration(self) -> None:
         """Load BitWarden configuration from encrypted storage."""
         try:
@@ -174,6 +209,131 @@ class BitWardenManager:
         except Exception as e:
             raise BitWardenError(f"CLI command failed: {e}")
     
+    def _ensure_serve(self) -> bool:
+        """
+        Start the local `bw serve` REST API if enabled and not running.
+        
+        The server is unlocked with the current session key. If it cannot be
+        started, the CLI is used until _SERVE_RETRY_INTERVAL has passed and
+        starting it is tried again.
+        
+        Returns:
+            True if the REST API is available
+        """
+        if not self.use_serve:
+            return False
+        
+        with self._serve_lock:
+            if self._serve_process is not None and self._serve_process.poll() is None:
+                return True
+            
+            if time.monotonic() < self._serve_retry_at:
+                return False
+            
+            for attempt in range(1, _SERVE_START_ATTEMPTS + 1):
+                try:
+                    if self._start_serve():
+                        return True
+                    self.logger.warning(f"bw serve exited during startup (attempt {attempt})")
+                except Exception as e:
+                    self.logger.warning(f"bw serve failed to start (attempt {attempt}): {e}")
+                self._stop_serve()
+            
+            self.logger.warning(f"Falling back to BitWarden CLI for {_SERVE_RETRY_INTERVAL:.0f} seconds")
+            self._serve_retry_at = time.monotonic() + _SERVE_RETRY_INTERVAL
+            return False
+    
+    def _start_serve(self) -> bool:
+        """
+        Spawn `bw serve` on a free local port and wait for it to answer.
+        
+        The port is reserved by binding and releasing it, so another process
+        can take it before the server binds; the server then exits and the
+        caller tries again on a new port.
+        
+        Returns:
+            True once the server answers, False if it exited first
+            
+        Raises:
+            BitWardenError: If the server does not answer in time
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        
+        env = dict(os.environ)
+        if self._session_key:
+            env['BW_SESSION'] = self._session_key
+        
+        self._serve_process = subprocess.Popen(
+            ['bw', 'serve', '--hostname', '127.0.0.1', '--port', str(port)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self._serve_url = f"http://127.0.0.1:{port}"
+        self._http = requests.Session()
+        
+        deadline = time.monotonic() + _SERVE_STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._serve_process.poll() is not None:
+                return False
+            try:
+                self._http.get(f"{self._serve_url}/status", timeout=1)
+                self.logger.info(f"BitWarden REST API listening on port {port}")
+                return True
+            except requests.RequestException:
+                time.sleep(0.1)
+        
+        raise BitWardenError("bw serve did not start")
+    
+    def _stop_serve(self) -> None:
+        """Terminate the local `bw serve` process if one is running."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        
+        if self._serve_process is not None:
+            self._serve_process.terminate()
+            try:
+                self._serve_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._serve_process.kill()
+            self._serve_process = None
+            self._serve_url = None
+    
+    def _serve_request(self, method: str, path: str, missing_ok: bool = False, **kwargs) -> Any:
+        """
+        Call the local `bw serve` REST API.
+        
+        Args:
+            method: HTTP method
+            path: Endpoint path, e.g. "/list/object/items"
+            missing_ok: Return None instead of raising if the object does not exist
+            **kwargs: Extra arguments passed to requests
+            
+        Returns:
+            The response's "data" payload
+            
+        Raises:
+            BitWardenError: If the request fails or is unsuccessful
+        """
+        try:
+            response = self._http.request(method, f"{self._serve_url}{path}",
+                                          timeout=self.cli_timeout, **kwargs)
+            payload = response.json()
+        except Exception as e:
+            raise BitWardenError(f"REST request {method} {path} failed: {e}")
+        
+        if not payload.get('success'):
+            # `bw serve` reports a missing object as an unsuccessful "Not found." response
+            message = payload.get('message')
+            if missing_ok and str(message).strip().lower().startswith('not found'):
+                return None
+            raise BitWardenError(f"REST request {method} {path} failed: {message}")
+        
+        return payload.get('data')
+    
     def _ensure_session(self) -> bool:
         """Ensure we have a valid session key."""
         with self._session_lock:
@@ -251,7 +411,11 @@ class BitWardenManager:
             if not self._ensure_session():
                 return False
             
-            success, stdout, stderr = self._run_cli_command(['bw', 'sync'])
+            if self._ensure_serve():
+                self._serve_request('POST', '/sync')
+                success, stderr = True, ''
+            else:
+                success, stdout, stderr = self._run_cli_command(['bw', 'sync'])
             
             if success:
                 self.logger.info("BitWarden vault synchronized")
@@ -266,14 +430,29 @@ class BitWardenManager:
             self.logger.error(f"Vault sync failed: {e}")
             raise BitWardenSyncError(str(e))
     
-    def get_vault_status(self) -> BitWardenVaultStatus:
-        """Get current vault status."""
+    def get_vault_status(self, strict: bool = False) -> BitWardenVaultStatus:
+        """
+        Get current vault status.
+        
+        Args:
+            strict: Raise instead of reporting an unauthenticated vault when
+                the status cannot be read
+            
+        Raises:
+            BitWardenError: If strict and the status cannot be read
+        """
         try:
-            # Check authentication status
-            success, stdout, stderr = self._run_cli_command(['bw', 'status'])
+            # Check authentication status, using the REST API only if it is
+            # already running since starting it needs an unlocked session
+            if self._serve_process is not None and self._ensure_serve():
+                status_data = self._serve_request('GET', '/status')['template']
+                success = True
+            else:
+                success, stdout, stderr = self._run_cli_command(['bw', 'status'])
+                if success:
+                    status_data = json.loads(stdout)
             
             if success:
-                status_data = json.loads(stdout)
                 return BitWardenVaultStatus(
                     is_authenticated=status_data.get('status') != 'unauthenticated',
                     is_unlocked=status_data.get('status') == 'unlocked',
@@ -281,6 +460,8 @@ class BitWardenManager:
                     user_email=status_data.get('userEmail'),
                     last_sync=datetime.now() if status_data.get('lastSync') else None
                 )
+            elif strict:
+                raise BitWardenError(f"Status check failed: {stderr}")
             else:
                 return BitWardenVaultStatus(
                     is_authenticated=False,
@@ -289,6 +470,8 @@ class BitWardenManager:
                 
         except Exception as e:
             self.logger.error(f"Failed to get vault status: {e}")
+            if strict:
+                raise BitWardenError(f"Failed to get vault status: {e}") from e
             return BitWardenVaultStatus(
                 is_authenticated=False,
                 is_unlocked=False
@@ -297,55 +480,89 @@ class BitWardenManager:
     def search_items(self, search_term: str) -> List[BitWardenItem]:
         """Search for items in the vault."""
         try:
-            if not self._ensure_session():
-                return []
-            
-            success, stdout, stderr = self._run_cli_command([
-                'bw', 'list', 'items', '--search', search_term
-            ])
-            
-            if success:
-                items_data = json.loads(stdout)
-                return [BitWardenItem.from_json(item) for item in items_data]
-            else:
-                self.logger.warning(f"Search failed: {stderr}")
-                return []
-                
+            return self._search_items(search_term)
         except Exception as e:
             self.logger.error(f"Item search failed: {e}")
             return []
     
+    def _search_items(self, search_term: str) -> List[BitWardenItem]:
+        """
+        Search for items in the vault, raising if the vault cannot be queried.
+        
+        Raises:
+            BitWardenError: If the search fails
+        """
+        if not self._ensure_session():
+            raise BitWardenAuthenticationError("No BitWarden session available")
+        
+        if self._ensure_serve():
+            items_data = self._serve_request('GET', '/list/object/items',
+                                             params={'search': search_term})['data']
+            return [BitWardenItem.from_json(item) for item in items_data]
+        
+        success, stdout, stderr = self._run_cli_command([
+            'bw', 'list', 'items', '--search', search_term
+        ])
+        
+        if not success:
+            raise BitWardenError(f"Search failed: {stderr}")
+        
+        items_data = json.loads(stdout)
+        return [BitWardenItem.from_json(item) for item in items_data]
+    
     def get_item_by_id(self, item_id: str) -> Optional[BitWardenItem]:
         """Get specific item by ID."""
         try:
-            if not self._ensure_session():
-                return None
-            
-            success, stdout, stderr = self._run_cli_command([
-                'bw', 'get', 'item', item_id
-            ])
-            
-            if success:
-                item_data = json.loads(stdout)
-                return BitWardenItem.from_json(item_data)
-            else:
-                return None
-                
+            return self._get_item_by_id(item_id)
         except Exception as e:
             self.logger.error(f"Failed to get item {item_id}: {e}")
             return None
     
+    def _get_item_by_id(self, item_id: str) -> Optional[BitWardenItem]:
+        """
+        Get specific item by ID, raising if the vault cannot be queried.
+        
+        Returns:
+            The item, or None if the vault has no such item
+            
+        Raises:
+            BitWardenError: If the lookup fails
+        """
+        if not self._ensure_session():
+            raise BitWardenAuthenticationError("No BitWarden session available")
+        
+        if self._ensure_serve():
+            item_data = self._serve_request('GET', f'/object/item/{item_id}', missing_ok=True)
+            return BitWardenItem.from_json(item_data) if item_data is not None else None
+        
+        success, stdout, stderr = self._run_cli_command([
+            'bw', 'get', 'item', item_id
+        ])
+        
+        if success:
+            item_data = json.loads(stdout)
+            return BitWardenItem.from_json(item_data)
+        else:
+            return None
+    
     def get_device_credentials(self, device_ip: str, device_type: str = None) -> Optional[BitWardenCredential]:
         """
         Get credentials for a specific device.
         
         First checks device mappings, then searches vault.
+        
+        Returns:
+            The device's credentials, or None if the vault has no match
+            
+        Raises:
+            BitWardenError: If the vault cannot be queried, so callers can
+                tell an outage from a missing entry
         """
         try:
             # Check device mappings first
             if device_ip in self._device_mappings:
                 mapping = self._device_mappings[device_ip]
-                item = self.get_item_by_id(mapping.bitwarden_item_id)
+                item = self._get_item_by_id(mapping.bitwarden_item_id)
                 
                 if item and item.login:
                     return BitWardenCredential(
@@ -366,7 +583,7 @@ class BitWardenManager:
             search_terms = self._generate_search_terms(device_ip, device_type)
             
             for term in search_terms:
-                items = self.search_items(term)
+                items = self._search_items(term)
                 
                 for item in items:
                     if item.login and self._matches_device(item, device_ip, device_type):
@@ -402,9 +619,12 @@ class BitWardenManager:
             
             return None
             
+        except BitWardenError as e:
+            self.logger.error(f"Failed to get credentials for {device_ip}: {e}")
+            raise
         except Exception as e:
             self.logger.error(f"Failed to get credentials for {device_ip}: {e}")
-            return None
+            raise BitWardenError(f"Failed to get credentials for {device_ip}: {e}") from e
     
     def _generate_search_terms(self, device_ip: str, device_type: Optional[str]) -> List[str]:
         """Generate search terms for finding device credentials."""
@@ -522,6 +742,10 @@ class BitWardenManager:
                     self._session_key = None
                     self._session_expires = None
                 
+                # A running server keeps the vault unlocked; stop it as well
+                with self._serve_lock:
+                    self._stop_serve()
+                
                 self.logger.info("BitWarden vault locked")
                 return True
             else:
@@ -535,5 +759,7 @@ class BitWardenManager:
     def cleanup(self) -> None:
         """Clean up resources and lock vault."""
         self.lock_vault()
+        with self._serve_lock:
+            self._stop_serve()
         self._credential_cache.clear()
         self.logger.info("BitWarden manager cleaned up")
\ No newline at end of file
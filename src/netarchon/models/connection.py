@@ -4,10 +4,13 @@ NetArchon Connection Models
 Data structures for SSH connections and related information.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    import paramiko
 
 
 class ConnectionType(Enum):
@@ -37,6 +40,7 @@ class ConnectionInfo:
     established_at: datetime
     last_activity: datetime
     status: ConnectionStatus
+    _ssh_client: Optional["paramiko.SSHClient"] = field(default=None, repr=False, compare=False)
     
     def __post_init__(self):
         """Validate connection info after initialization."""
@@ -73,6 +77,7 @@ class CommandResult:
     timestamp: datetime
     command: str
     device_id: str
+    additional_data: Dict[str, Any] = field(default_factory=dict, compare=False)
     
     def __post_init__(self):
         """Initialize default values."""
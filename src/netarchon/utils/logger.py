@@ -104,6 +104,14 @@ class NetArchonLogger:
         
         self._configured = True
     
+    def is_enabled_for(self, level: LogLevel) -> bool:
+        """Check whether messages at the given level would be emitted.
+        
+        Lets callers skip building expensive messages, such as per-item
+        debug output in loops, when they would be discarded.
+        """
+        return self.logger.isEnabledFor(getattr(logging, level.value))
+    
     def debug(self, message: str, **kwargs) -> None:
         """Log debug message."""
         self._log(logging.DEBUG, message, **kwargs)
@@ -0,0 +1,169 @@
+"""
+Unit tests for NetArchon BitWarden manager.
+"""
+
+import importlib
+import sys
+import types
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+
+class _SessionState(dict):
+    """Stand-in for streamlit's attribute-style session state."""
+    
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+
+
+def _load_manager_module():
+    """Import the BitWarden manager without the other integrations.
+    
+    The integrations package imports every integration eagerly, and the web
+    security helpers the manager uses import streamlit, an optional web
+    dependency; only what the manager needs is provided here.
+    """
+    integrations = types.ModuleType("netarchon.integrations")
+    package_dir = Path(__file__).resolve().parents[2] / "src" / "netarchon" / "integrations"
+    integrations.__path__ = [str(package_dir)]
+    stubs = {integrations.__name__: integrations}
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        streamlit = types.ModuleType("streamlit")
+        streamlit.session_state = _SessionState()
+        stubs["streamlit"] = streamlit
+    
+    with patch.dict(sys.modules, stubs):
+        manager = importlib.import_module("netarchon.integrations.bitwarden.manager")
+    sys.modules[manager.__name__] = manager
+    return manager
+
+
+bw = _load_manager_module()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    """BitWarden manager with an unlocked session and no CLI or REST backend."""
+    manager = bw.BitWardenManager(config_dir=str(tmp_path))
+    manager._ensure_session = Mock(return_value=True)
+    manager._run_cli_command = Mock()
+    return manager
+
+
+@pytest.fixture
+def fake_requests(monkeypatch):
+    """Stand-in for the optional requests package used by the REST API client."""
+    fake = types.SimpleNamespace(Session=Mock(), RequestException=OSError)
+    monkeypatch.setattr(bw, "requests", fake, raising=False)
+    monkeypatch.setattr(bw, "REQUESTS_AVAILABLE", True)
+    return fake
+
+
+@pytest.fixture
+def serving_manager(tmp_path, fake_requests):
+    """BitWarden manager configured to use `bw serve`, with process spawning mocked."""
+    manager = bw.BitWardenManager(config_dir=str(tmp_path), use_serve=True)
+    manager._ensure_session = Mock(return_value=True)
+    manager._run_cli_command = Mock(return_value=(True, "[]", ""))
+    with patch.object(bw.subprocess, "Popen") as popen:
+        manager.popen = popen
+        yield manager
+
+
+class TestBitWardenManager:
+    """Test vault queries through the BitWarden manager."""
+    
+    def test_get_device_credentials_raises_on_backend_failure(self, manager):
+        """Test a failing vault is reported as an error rather than a missing entry."""
+        manager._run_cli_command.return_value = (False, "", "connection refused")
+        
+        with pytest.raises(bw.BitWardenError):
+            manager.get_device_credentials("10.0.0.5", "router")
+    
+    def test_get_device_credentials_none_when_no_match(self, manager):
+        """Test a reachable vault without a matching item returns None."""
+        manager._run_cli_command.return_value = (True, "[]", "")
+        
+        assert manager.get_device_credentials("10.0.0.5", "router") is None
+    
+    def test_search_items_keeps_reporting_failures_as_empty(self, manager):
+        """Test the public search still returns an empty list on failure."""
+        manager._run_cli_command.return_value = (False, "", "connection refused")
+        
+        assert manager.search_items("router") == []
+    
+    def test_rest_api_is_opt_in(self, tmp_path, fake_requests):
+        """Test the manager uses the CLI unless the REST API is requested."""
+        assert bw.BitWardenManager(config_dir=str(tmp_path)).use_serve is False
+
+
+class TestBitWardenServe:
+    """Test vault queries through the local `bw serve` REST API."""
+    
+    def test_search_items_uses_rest_api(self, serving_manager):
+        """Test searches go to the REST API once the server answers."""
+        serving_manager.popen.return_value.poll.return_value = None
+        http = bw.requests.Session.return_value
+        http.request.return_value.json.return_value = {
+            "success": True,
+            "data": {"data": [{"id": "1", "name": "router",
+                               "login": {"username": "admin", "password": "pw"}}]},
+        }
+        
+        items = serving_manager.search_items("router")
+        
+        assert [item.name for item in items] == ["router"]
+        assert http.request.call_args[1]["params"] == {"search": "router"}
+        serving_manager._run_cli_command.assert_not_called()
+    
+    def test_stale_mapping_falls_back_to_search(self, serving_manager):
+        """Test a mapped item the REST API no longer has is looked up by search, as on the CLI."""
+        serving_manager.popen.return_value.poll.return_value = None
+        serving_manager._device_mappings["10.0.0.5"] = Mock(bitwarden_item_id="deleted")
+        found = {"id": "2", "name": "router-10.0.0.5",
+                 "login": {"username": "admin", "password": "pw"}}
+        
+        def request(method, url, **kwargs):
+            response = Mock()
+            if url.endswith("/object/item/deleted"):
+                response.json.return_value = {"success": False, "message": "Not found."}
+            else:
+                response.json.return_value = {"success": True, "data": {"data": [found]}}
+            return response
+        
+        bw.requests.Session.return_value.request.side_effect = request
+        
+        credential = serving_manager.get_device_credentials("10.0.0.5", "router")
+        
+        assert credential.username == "admin"
+        assert serving_manager._device_mappings["10.0.0.5"].bitwarden_item_id == "2"
+    
+    def test_start_retries_on_a_new_port_after_exit(self, serving_manager):
+        """Test a server that exits during startup, e.g. on a taken port, is started again."""
+        exited, running = Mock(), Mock()
+        exited.poll.return_value = 1
+        running.poll.return_value = None
+        serving_manager.popen.side_effect = [exited, running]
+        
+        assert serving_manager._ensure_serve() is True
+        
+        assert serving_manager.popen.call_count == 2
+        exited.terminate.assert_called_once()
+    
+    def test_cli_fallback_until_retry_interval(self, serving_manager):
+        """Test the CLI is used after startup fails, and the server is tried again later."""
+        serving_manager.popen.return_value.poll.return_value = 1
+        
+        assert serving_manager.search_items("router") == []
+        assert serving_manager.search_items("switch") == []
+        
+        assert serving_manager.popen.call_count == bw._SERVE_START_ATTEMPTS
+        assert serving_manager._run_cli_command.call_count == 2
+        
+        serving_manager._serve_retry_at = 0.0
+        serving_manager.popen.return_value.poll.return_value = None
+        assert serving_manager._ensure_serve() is True
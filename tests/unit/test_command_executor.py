@@ -2,6 +2,7 @@
 Unit tests for NetArchon command executor.
 """
 
+import re
 import socket
 import time
 from datetime import datetime
@@ -12,7 +13,8 @@ import pytest
 from src.netarchon.core.command_executor import (
     CommandExecutor,
     CommandParser,
-    ResponseProcessor
+    ResponseProcessor,
+    ShellSession
 )
 from src.netarchon.models.connection import (
     ConnectionInfo,
@@ -26,6 +28,24 @@ from src.netarchon.utils.exceptions import (
 )
 
 
+def _mock_exec_output(output, error=b"", exit_status=0):
+    """Build a mock stdout whose channel streams the given output and error."""
+    pending_out = [output] if output else []
+    pending_err = [error] if error else []
+    
+    channel = Mock()
+    channel.recv_ready.side_effect = lambda: bool(pending_out)
+    channel.recv.side_effect = lambda size: pending_out.pop(0)
+    channel.recv_stderr_ready.side_effect = lambda: bool(pending_err)
+    channel.recv_stderr.side_effect = lambda size: pending_err.pop(0)
+    channel.exit_status_ready.return_value = True
+    channel.recv_exit_status.return_value = exit_status
+    
+    mock_stdout = Mock()
+    mock_stdout.channel = channel
+    return mock_stdout
+
+
 class TestCommandExecutor:
     """Test CommandExecutor class."""
     
@@ -57,12 +77,9 @@ class TestCommandExecutor:
     def test_successful_command_execution(self):
         """Test successful command execution."""
         # Setup mock SSH client
-        mock_stdout = Mock()
-        mock_stdout.read.return_value = b"Version 16.09.04"
-        mock_stdout.channel.recv_exit_status.return_value = 0
+        mock_stdout = _mock_exec_output(b"Version 16.09.04")
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b""
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.return_value = (None, mock_stdout, mock_stderr)
@@ -86,12 +103,9 @@ class TestCommandExecutor:
     
     def test_command_execution_with_custom_timeout(self):
         """Test command execution with custom timeout."""
-        mock_stdout = Mock()
-        mock_stdout.read.return_value = b"OK"
-        mock_stdout.channel.recv_exit_status.return_value = 0
+        mock_stdout = _mock_exec_output(b"OK")
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b""
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.return_value = (None, mock_stdout, mock_stderr)
@@ -105,12 +119,9 @@ class TestCommandExecutor:
     
     def test_command_execution_failure(self):
         """Test command execution with non-zero exit status."""
-        mock_stdout = Mock()
-        mock_stdout.read.return_value = b"Command output"
-        mock_stdout.channel.recv_exit_status.return_value = 1
+        mock_stdout = _mock_exec_output(b"Command output", b"Command failed", exit_status=1)
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b"Command failed"
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.return_value = (None, mock_stdout, mock_stderr)
@@ -131,6 +142,20 @@ class TestCommandExecutor:
         assert "No active SSH connection" in str(exc_info.value)
         assert exc_info.value.details["device_id"] == "router1"
     
+    def test_command_execution_inactive_transport(self):
+        """Test a dead transport fails fast without attempting exec_command."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.get_transport.return_value.is_active.return_value = False
+
+        self.connection._ssh_client = mock_ssh_client
+
+        with pytest.raises(CommandExecutionError) as exc_info:
+            self.executor.execute_command(self.connection, "show version")
+
+        assert "no longer active" in str(exc_info.value)
+        mock_ssh_client.exec_command.assert_not_called()
+        assert self.connection.status == ConnectionStatus.DISCONNECTED
+
     def test_command_execution_timeout(self):
         """Test command execution timeout."""
         mock_ssh_client = Mock()
@@ -156,19 +181,74 @@ class TestCommandExecutor:
         assert result.success is False
         assert result.error == "Connection lost"
         assert result.output == ""
-    
+
+    def test_command_execution_streams_chunks(self):
+        """Test output arriving in several channel reads is reassembled."""
+        mock_stdout = _mock_exec_output(b"")
+        chunks = [b"Line 1\n", b"Line 2\n", b"Line 3"]
+        mock_stdout.channel.recv_ready.side_effect = lambda: bool(chunks)
+        mock_stdout.channel.recv.side_effect = lambda size: chunks.pop(0)
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.return_value = (None, mock_stdout, Mock())
+        self.connection._ssh_client = mock_ssh_client
+
+        result = self.executor.execute_command(self.connection, "show running-config")
+
+        assert result.success is True
+        assert result.output == "Line 1\nLine 2\nLine 3"
+
+    @patch('src.netarchon.core.command_executor.select.select', return_value=([], [], []))
+    def test_command_execution_stream_timeout(self, mock_select):
+        """Test a channel that stays silent raises TimeoutError."""
+        mock_stdout = _mock_exec_output(b"")
+        mock_stdout.channel.exit_status_ready.return_value = False
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.return_value = (None, mock_stdout, Mock())
+        self.connection._ssh_client = mock_ssh_client
+
+        with pytest.raises(TimeoutError):
+            self.executor.execute_command(self.connection, "show tech-support", timeout=5)
+
+        mock_select.assert_called_once_with([mock_stdout.channel], [], [], 5)
+
+    def test_execute_command_stream_yields_raw_chunks(self):
+        """Test streamed execution yields undecoded chunks as they arrive."""
+        mock_stdout = _mock_exec_output(b"")
+        chunks = [b"hostname r1\n", b"banner \xff\n"]
+        mock_stdout.channel.recv_ready.side_effect = lambda: bool(chunks)
+        mock_stdout.channel.recv.side_effect = lambda size: chunks.pop(0)
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.return_value = (None, mock_stdout, Mock())
+        self.connection._ssh_client = mock_ssh_client
+
+        stream = self.executor.execute_command_stream(
+            self.connection, "show running-config"
+        )
+
+        assert next(stream) == b"hostname r1\n"
+        assert len(chunks) == 1  # Second chunk not read yet
+        assert list(stream) == [b"banner \xff\n"]
+
+    def test_execute_command_stream_nonzero_exit(self):
+        """Test streamed execution raises once the command exits non-zero."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.return_value = (
+            None, _mock_exec_output(b"", b"% Invalid input", exit_status=1), Mock())
+        self.connection._ssh_client = mock_ssh_client
+
+        with pytest.raises(CommandExecutionError, match="Invalid input"):
+            list(self.executor.execute_command_stream(self.connection, "show bogus"))
+
     def test_execute_multiple_commands_success(self):
         """Test executing multiple commands successfully."""
-        mock_stdout1 = Mock()
-        mock_stdout1.read.return_value = b"Version info"
-        mock_stdout1.channel.recv_exit_status.return_value = 0
+        mock_stdout1 = _mock_exec_output(b"Version info")
         
-        mock_stdout2 = Mock()
-        mock_stdout2.read.return_value = b"Interface info"
-        mock_stdout2.channel.recv_exit_status.return_value = 0
+        mock_stdout2 = _mock_exec_output(b"Interface info")
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b""
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.side_effect = [
@@ -189,16 +269,11 @@ class TestCommandExecutor:
     
     def test_execute_multiple_commands_stop_on_error(self):
         """Test executing multiple commands with stop on error."""
-        mock_stdout1 = Mock()
-        mock_stdout1.read.return_value = b"Version info"
-        mock_stdout1.channel.recv_exit_status.return_value = 0
+        mock_stdout1 = _mock_exec_output(b"Version info")
         
-        mock_stdout2 = Mock()
-        mock_stdout2.read.return_value = b"Error output"
-        mock_stdout2.channel.recv_exit_status.return_value = 1
+        mock_stdout2 = _mock_exec_output(b"Error output", b"Command error", exit_status=1)
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b"Command error"
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.side_effect = [
@@ -220,20 +295,13 @@ class TestCommandExecutor:
     
     def test_execute_multiple_commands_continue_on_error(self):
         """Test executing multiple commands continuing on error."""
-        mock_stdout1 = Mock()
-        mock_stdout1.read.return_value = b"Version info"
-        mock_stdout1.channel.recv_exit_status.return_value = 0
+        mock_stdout1 = _mock_exec_output(b"Version info")
         
-        mock_stdout2 = Mock()
-        mock_stdout2.read.return_value = b"Error output"
-        mock_stdout2.channel.recv_exit_status.return_value = 1
+        mock_stdout2 = _mock_exec_output(b"Error output", exit_status=1)
         
-        mock_stdout3 = Mock()
-        mock_stdout3.read.return_value = b"Interface info"
-        mock_stdout3.channel.recv_exit_status.return_value = 0
+        mock_stdout3 = _mock_exec_output(b"Interface info")
         
         mock_stderr = Mock()
-        mock_stderr.read.return_value = b""
         
         mock_ssh_client = Mock()
         mock_ssh_client.exec_command.side_effect = [
@@ -255,6 +323,130 @@ class TestCommandExecutor:
         assert results[2].success is True
         assert mock_ssh_client.exec_command.call_count == 3
 
+    def test_execute_commands_rejects_invalid_without_round_trip(self):
+        """Test validator-rejected commands are never sent to the device."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = [
+            (None, _mock_exec_output(b"Version info"), Mock()),
+        ]
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_commands(self.connection, ["reload", "show version"])
+
+        assert len(results) == 2
+        assert results[0].success is False
+        assert "rejected" in results[0].error
+        assert results[1].output == "Version info"
+        mock_ssh_client.exec_command.assert_called_once_with("show version", timeout=10)
+
+    def test_execute_commands_sends_commands_containing_dangerous_words(self):
+        """Test dangerous words inside read-only commands do not get them rejected."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.return_value = (
+            None, _mock_exec_output(b"System info"), Mock()
+        )
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_commands(
+            self.connection, ["show system information"]
+        )
+
+        assert results[0].success is True
+        mock_ssh_client.exec_command.assert_called_once_with(
+            "show system information", timeout=10
+        )
+
+    def test_execute_batch_read_single_round_trip(self):
+        """Test batched read commands share one exec and are split per command."""
+        def exec_command(command, timeout=None):
+            delimiter = command.split('echo "')[1].split('"')[0]
+            output = f"Version info\n{delimiter}\nInterface info\n".encode()
+            return None, _mock_exec_output(output), Mock()
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = exec_command
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_batch_read(
+            self.connection, ["show version", "show interfaces"]
+        )
+
+        assert mock_ssh_client.exec_command.call_count == 1
+        assert [r.command for r in results] == ["show version", "show interfaces"]
+        assert [r.output for r in results] == ["Version info", "Interface info\n"]
+        assert all(r.success for r in results)
+
+    def test_execute_batch_read_marks_failed_command_by_status(self):
+        """Test a non-zero echoed exit status fails only the command it follows."""
+        def exec_command(command, timeout=None):
+            delimiter = command.split('echo "')[1].split('"')[0]
+            output = f"bad: not found\n{delimiter} 127\nInterface info\n".encode()
+            return None, _mock_exec_output(output), Mock()
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = exec_command
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_batch_read(
+            self.connection, ["show bogus", "show interfaces"]
+        )
+
+        assert [r.output for r in results] == ["bad: not found", "Interface info\n"]
+        assert [r.success for r in results] == [False, True]
+
+    def test_execute_batch_read_marks_cli_error_per_command(self):
+        """Test a CLI error in one command's output fails only that command."""
+        def exec_command(command, timeout=None):
+            delimiter = command.split('echo "')[1].split('"')[0]
+            output = (f"Version info\n{delimiter} $?\n"
+                      f"% Invalid command at '^' marker.\n{delimiter} $?\n"
+                      f"Interface info\n").encode()
+            return None, _mock_exec_output(output), Mock()
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = exec_command
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_batch_read(
+            self.connection, ["show version", "show bogus", "show interfaces"]
+        )
+
+        assert [r.success for r in results] == [True, False, True]
+        assert results[1].error == "% Invalid command at '^' marker."
+
+    def test_execute_batch_read_falls_back_for_unchainable(self):
+        """Test commands with shell metacharacters are executed one at a time."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = [
+            (None, _mock_exec_output(b"Version info"), Mock()),
+            (None, _mock_exec_output(b"Gi0/1 up"), Mock()),
+        ]
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.execute_batch_read(
+            self.connection, ["show version", "show ip interface brief | include up"]
+        )
+
+        assert mock_ssh_client.exec_command.call_count == 2
+        assert [r.output for r in results] == ["Version info", "Gi0/1 up"]
+
+    def test_iter_execute_is_lazy(self):
+        """Test iter_execute only runs commands as results are consumed."""
+        mock_ssh_client = Mock()
+        mock_ssh_client.exec_command.side_effect = [
+            (None, _mock_exec_output(b"Version info"), Mock()),
+            (None, _mock_exec_output(b"Interface info"), Mock()),
+        ]
+        self.connection._ssh_client = mock_ssh_client
+
+        results = self.executor.iter_execute(self.connection, ["show version", "show interfaces"])
+        assert mock_ssh_client.exec_command.call_count == 0
+
+        first = next(results)
+        assert first.output == "Version info"
+        assert mock_ssh_client.exec_command.call_count == 1
+        assert [r.output for r in results] == ["Interface info"]
+
 
 class TestCommandParser:
     """Test CommandParser class."""
@@ -277,7 +469,10 @@ class TestCommandParser:
             "show interfaces",
             "show ip route",
             "ping 8.8.8.8",
-            "traceroute 1.1.1.1"
+            "traceroute 1.1.1.1",
+            "show system information",
+            "show platform information",
+            "show reload"
         ]
         
         for command in valid_commands:
@@ -508,6 +703,28 @@ class TestPrivilegeEscalation:
         mock_shell.send.assert_any_call('exit\n')
         mock_shell.close.assert_called_once()
     
+    def test_privilege_escalation_output_cleanup(self):
+        """Test command echo, prompts and enable echo are stripped from output."""
+        mock_shell = Mock()
+        mock_shell.recv.side_effect = [
+            b"router>",
+            b"router#",
+            b"router#show version\r\nCisco IOS Software\r\n enable \r\nUptime 5 days\r\nrouter#",
+            b"",
+        ]
+
+        mock_ssh_client = Mock()
+        mock_ssh_client.invoke_shell.return_value = mock_shell
+
+        self.connection._ssh_client = mock_ssh_client
+
+        result = self.executor.execute_with_privilege(
+            self.connection, "show version", "enable123"
+        )
+
+        assert result.success is True
+        assert result.output == "Cisco IOS Software\r\nUptime 5 days"
+
     def test_privilege_escalation_no_password_needed(self):
         """Test privilege escalation when no password is needed."""
         mock_shell = Mock()
@@ -590,4 +807,88 @@ class TestPrivilegeEscalation:
         )
         
         assert result.success is False
-        assert "Connection lost" in result.error
\ No newline at end of file
+        assert "Connection lost" in result.error
+
+
+@patch('src.netarchon.core.command_executor.select.select', side_effect=lambda r, w, x, t: (r, [], []))
+class TestShellSession:
+    """Test persistent shell sessions."""
+    
+    def _session(self, chunks):
+        channel = Mock()
+        channel.recv.side_effect = lambda size: chunks.pop(0)
+        return ShellSession(channel, "router1", timeout=5), channel
+    
+    def test_find_prompt_learns_base_prompt(self, mock_select):
+        """Test the base prompt is learned from the banner and initial prompt."""
+        session, _ = self._session([b"Welcome\r\n", b"router1#"])
+        
+        assert session.find_prompt() == b"router1"
+        assert session.prompt_re.search(b"\r\nrouter1(config-if)#")
+        assert not session.prompt_re.search(b"description router1#uplink")
+    
+    def test_run_waits_for_a_prompt_per_line(self, mock_select):
+        """Test a multi-line command completes only after every line's prompt."""
+        session, channel = self._session([
+            b"router1#",
+            b"configure terminal\r\nrouter1(config)#",
+            b"interface Gi0/1\r\nrouter1(con",
+            b"fig-if)#description uplink\r\nrouter1(config-if)#",
+        ])
+        
+        session.find_prompt()
+        session.run("configure terminal")
+        output = session.run("interface Gi0/1\ndescription uplink")
+        
+        channel.sendall.assert_called_with(b"interface Gi0/1\ndescription uplink\n")
+        assert output.endswith("description uplink\r\nrouter1(config-if)#")
+    
+    def test_run_follows_hostname_change(self, mock_select):
+        """Test prompts under a new hostname complete the command and are tracked."""
+        session, _ = self._session([
+            b"router1#",
+            b"configure terminal\r\nrouter1(config)#",
+            b"hostname edge1\r\nedge1(config)#end\r\nedge1#",
+        ])
+        
+        session.find_prompt()
+        session.run("configure terminal")
+        assert not session.in_initial_mode
+        
+        output = session.run("hostname edge1\nend")
+        
+        assert output.endswith("edge1#")
+        assert session.base_prompt == b"edge1"
+        assert session.prompt_re.search(b"\r\nedge1(config)#")
+        assert session.in_initial_mode
+    
+    def test_expect_channel_closed(self, mock_select):
+        """Test a closed channel raises instead of waiting forever."""
+        session, _ = self._session([b"partial output", b""])
+        
+        with pytest.raises(CommandExecutionError, match="closed"):
+            session.expect(re.compile(rb"router1#"))
+    
+    def test_executor_session_closes_channel(self, mock_select):
+        """Test the executor opens one shell channel per session and closes it."""
+        connection = ConnectionInfo(
+            device_id="router1",
+            host="192.168.1.1",
+            port=22,
+            username="admin",
+            connection_type=ConnectionType.SSH,
+            established_at=datetime.utcnow(),
+            last_activity=datetime.utcnow(),
+            status=ConnectionStatus.CONNECTED
+        )
+        chunks = [b"router1#", b"show clock\r\n12:00\r\nrouter1#"]
+        channel = Mock()
+        channel.recv.side_effect = lambda size: chunks.pop(0)
+        connection._ssh_client = Mock()
+        connection._ssh_client.invoke_shell.return_value = channel
+        
+        with CommandExecutor().session(connection) as session:
+            assert "12:00" in session.run("show clock")
+        
+        connection._ssh_client.invoke_shell.assert_called_once()
+        channel.close.assert_called_once()
@@ -5,6 +5,7 @@ Tests for NetArchon Configuration Deployment and Rollback
 import os
 import tempfile
 import pytest
+from contextlib import nullcontext
 from unittest.mock import Mock, patch, call
 from datetime import datetime
 
@@ -14,6 +15,53 @@ from src.netarchon.models.device import DeviceType
 from src.netarchon.utils.exceptions import ConfigurationError
 
 
+def _mock_shell_session(mock_executor, run=lambda command: "test_router(config)#"):
+    """Attach a shell session to a mocked executor; run() output comes from ``run``."""
+    session = Mock()
+    session.run.side_effect = run
+    session.in_initial_mode = False
+    mock_executor.session.return_value = nullcontext(session)
+    return session
+
+
+class _FakeIOSChannel:
+    """Shell channel that follows IOS prompts and closes on 'exit' from exec mode."""
+    
+    def __init__(self, hostname):
+        self.hostname = hostname
+        self.mode = ""
+        self.closed = False
+        self._output = bytearray(f"{hostname}#".encode())
+    
+    def sendall(self, data):
+        for command in data.decode().splitlines():
+            self._output += f"{command}\r\n".encode()
+            if command == "exit" and not self.mode:
+                self.closed = True
+                return
+            if command == "configure terminal":
+                self.mode = "(config)"
+            elif command == "end" or (command == "exit" and self.mode == "(config)"):
+                self.mode = ""
+            elif command == "exit" or command.startswith("hostname "):
+                self.mode = "(config)"
+                if command.startswith("hostname "):
+                    self.hostname = command.split()[1]
+            elif command.startswith("interface "):
+                self.mode = "(config-if)"
+            elif command.startswith("router "):
+                self.mode = "(config-router)"
+            self._output += f"{self.hostname}{self.mode}#".encode()
+    
+    def recv(self, size):
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        return data
+    
+    def close(self):
+        self.closed = True
+
+
 class TestConfigDeployment:
     """Test ConfigManager deployment and rollback functionality."""
     
@@ -50,6 +98,7 @@ end"""
     def teardown_method(self):
         """Clean up test fixtures."""
         import shutil
+        self.manager.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     @patch('src.netarchon.core.config_manager.CommandExecutor')
@@ -73,6 +122,8 @@ end"""
                 return CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
         
         mock_executor.execute_command.side_effect = mock_execute_command
+        mock_executor.execute_command_stream.return_value = iter([b"Current config"])
+        session = _mock_shell_session(mock_executor)
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -85,14 +136,14 @@ end"""
         assert result is True
         
         # Verify backup was created
-        backup_calls = [call for call in mock_executor.execute_command.call_args_list 
-                       if 'show running-config' in str(call)]
-        assert len(backup_calls) >= 1  # Backup call made
+        mock_executor.execute_command_stream.assert_called_once_with(
+            self.connection, "show running-config"
+        )
         
-        # Verify configuration commands were executed
-        config_calls = [call for call in mock_executor.execute_command.call_args_list 
-                       if 'configure terminal' in str(call)]
-        assert len(config_calls) >= 1  # Configuration mode entered
+        # Verify configuration mode was entered and left in one shell session
+        mock_executor.session.assert_called_once_with(self.connection, timeout=300)
+        assert session.run.call_args_list[0] == call('configure terminal')
+        assert session.run.call_args_list[-1] == call('end')
     
     @patch('src.netarchon.core.config_manager.CommandExecutor')
     def test_apply_config_validation_failure(self, mock_executor_class):
@@ -151,6 +202,7 @@ end"""
                 return CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
         
         mock_executor.execute_command.side_effect = mock_execute_command
+        _mock_shell_session(mock_executor)
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -182,12 +234,18 @@ end"""
                 return CommandResult(True, "Current config", "", 1.0, datetime.now(), command, "test_router")
             elif 'configure terminal' in command:
                 return CommandResult(True, "Config mode", "", 1.0, datetime.now(), command, "test_router")
-            elif 'router ospf' in command:
-                return CommandResult(False, "", "OSPF not supported", 1.0, datetime.now(), command, "test_router")
             else:
                 return CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
         
+        def mock_run(command):
+            if 'router ospf' in command:
+                return ("test_router(config)#router ospf 1\r\n"
+                        "% Invalid input detected at '^' marker.\r\ntest_router(config)#")
+            return "test_router(config)#"
+        
         mock_executor.execute_command.side_effect = mock_execute_command
+        mock_executor.execute_command_stream.return_value = iter([b"Current config"])
+        _mock_shell_session(mock_executor, mock_run)
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -199,6 +257,120 @@ end"""
         # Should return False due to failed commands
         assert result is False
     
+    @patch('src.netarchon.core.config_manager.time.sleep')
+    def test_apply_config_batches_lines(self, mock_sleep):
+        """Test configuration lines are sent in batches and device errors are detected."""
+        manager = ConfigManager(backup_directory=self.temp_dir, apply_batch_size=3)
+        mock_executor = Mock()
+        mock_executor.execute_command.return_value = CommandResult(
+            True, "OK", "", 1.0, datetime.now(), "show version", "test_router")
+        
+        def mock_run(command):
+            if 'router ospf' in command:
+                return "% Invalid input detected at '^' marker.\r\ntest_router(config)#"
+            return "test_router(config)#"
+        
+        session = _mock_shell_session(mock_executor, mock_run)
+        manager.command_executor = mock_executor
+        
+        result = manager.apply_config(self.connection, self.config_content, backup_first=False)
+        
+        assert result is False
+        sent = [c[0][0] for c in session.run.call_args_list]
+        assert sent[0] == 'configure terminal' and sent[-1] == 'end'
+        assert sent[1:-1] == [
+            "hostname test_router\ninterface GigabitEthernet0/0\nip address 192.168.1.1 255.255.255.0",
+            "no shutdown\n!\nrouter ospf 1",
+            "network 192.168.1.0 0.0.0.255 area 0\n!",
+        ]
+    
+    @patch('src.netarchon.core.config_manager.time.sleep')
+    def test_apply_config_ignores_informational_notices(self, mock_sleep):
+        """Test '%' notices that are not errors neither fail the deployment nor skip the save."""
+        mock_executor = Mock()
+        mock_executor.execute_command.return_value = CommandResult(
+            True, "OK", "", 1.0, datetime.now(), "show version", "test_router")
+        
+        def mock_run(command):
+            if 'router ospf' in command:
+                return ("test_router(config)#router ospf 1\r\n"
+                        "% OSPF: Router process 1 is not running, please configure a router-id\r\n"
+                        "test_router(config-router)#")
+            return "test_router(config)#"
+        
+        _mock_shell_session(mock_executor, mock_run)
+        self.manager.command_executor = mock_executor
+        
+        result = self.manager.apply_config(self.connection, self.config_content, backup_first=False)
+        
+        assert result is True
+        mock_executor.execute_command.assert_any_call(
+            self.connection, "copy running-config startup-config")
+    
+    def test_config_errors_attributed_to_echoed_line(self):
+        """Test each device error is reported against the batch line echoed before it."""
+        from src.netarchon.core.config_manager import _config_errors
+        
+        batch = ["interface Gi0/1", "ip adress 10.0.0.1 255.255.255.0", "no shutdown", "router bgp"]
+        output = ("r1(config)#interface Gi0/1\r\n"
+                  "r1(config-if)#ip adress 10.0.0.1 255.255.255.0\r\n"
+                  "                ^\r\n"
+                  "% Invalid input detected at '^' marker.\r\n"
+                  "r1(config-if)#no shutdown\r\n"
+                  "% Interface Gi0/1 is already up\r\n"
+                  "r1(config-if)#router bgp\r\n"
+                  "% Incomplete command.\r\n"
+                  "r1(config-if)#")
+        
+        assert _config_errors(batch, output) == [
+            ("ip adress 10.0.0.1 255.255.255.0", "% Invalid input detected at '^' marker."),
+            ("router bgp", "% Incomplete command."),
+        ]
+    
+    @patch('src.netarchon.core.command_executor.select.select', side_effect=lambda r, w, x, t: (r, [], []))
+    @patch('src.netarchon.core.config_manager.time.sleep')
+    def test_apply_config_through_shell_renames_and_ends(self, mock_sleep, mock_select):
+        """Test a config that renames the device and ends with 'end' applies cleanly."""
+        manager = ConfigManager(backup_directory=self.temp_dir, apply_batch_size=2)
+        channel = _FakeIOSChannel("test_router")
+        self.connection._ssh_client = Mock()
+        self.connection._ssh_client.invoke_shell.return_value = channel
+        manager.command_executor.execute_command = Mock(return_value=CommandResult(
+            True, "OK", "", 1.0, datetime.now(), "show version", "test_router"))
+        
+        config = self.config_content.replace("hostname test_router", "hostname edge1")
+        result = manager.apply_config(self.connection, config, backup_first=False, timeout=1)
+        
+        assert result is True
+        assert channel.hostname == "edge1" and channel.mode == ""
+        assert not channel._output
+    
+    @patch('src.netarchon.core.command_executor.select.select', side_effect=lambda r, w, x, t: (r, [], []))
+    @patch('src.netarchon.core.config_manager.time.sleep')
+    def test_apply_config_skips_exit_after_leaving_config_mode(self, mock_sleep, mock_select):
+        """Test no exit command is sent once the configuration has left configuration mode."""
+        channel = _FakeIOSChannel("test_router")
+        self.connection._ssh_client = Mock()
+        self.connection._ssh_client.invoke_shell.return_value = channel
+        self.manager.command_executor.execute_command = Mock(return_value=CommandResult(
+            True, "OK", "", 1.0, datetime.now(), "show version", "test_router"))
+        
+        config = self.config_content + "\n!"
+        result = self.manager.apply_config(self.connection, config, backup_first=False, timeout=1)
+        
+        assert result is True
+        assert channel.mode == "" and not channel._output
+    
+    def test_iter_config_lines_handles_crlf_and_comments(self):
+        """Test config lines are stripped, CRLF-safe and skip comments and blanks."""
+        from src.netarchon.core.config_manager import _iter_config_lines
+        
+        config = "# generated\r\nhostname r1\r\n\r\n interface Gi0/1 \r\n  # indented note\n!\r\n"
+        
+        assert list(_iter_config_lines(config)) == ["hostname r1", "interface Gi0/1", "!"]
+        assert list(_iter_config_lines("hostname r1\n!\nend\n")) == ["hostname r1", "!"]
+        assert list(_iter_config_lines("end\nhostname r1")) == ["end", "hostname r1"]
+    
     @patch('src.netarchon.core.config_manager.CommandExecutor')
     def test_rollback_config_success(self, mock_executor_class):
         """Test successful configuration rollback."""
@@ -230,6 +402,7 @@ end"""
             return CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
         
         mock_executor.execute_command.side_effect = mock_execute_command
+        _mock_shell_session(mock_executor)
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -324,6 +497,23 @@ interface GigabitEthernet0/0
         
         assert result is False
     
+    def test_connectivity_test_reuses_recent_success(self):
+        """Test a recent successful command stands in for a probe only when allowed."""
+        manager = ConfigManager(backup_directory=self.temp_dir)
+        mock_executor = Mock()
+        mock_executor.execute_command.return_value = CommandResult(
+            True, "Cisco IOS Software", "", 1.0, datetime.now(), "show version", "test_router"
+        )
+        manager.command_executor = mock_executor
+        
+        assert manager._test_connectivity(self.connection) is True
+        assert manager._test_connectivity(self.connection, max_age=60.0) is True
+        assert mock_executor.execute_command.call_count == 1
+        
+        # Without a max_age the device is always probed again
+        assert manager._test_connectivity(self.connection) is True
+        assert mock_executor.execute_command.call_count == 2
+    
     @patch('src.netarchon.core.config_manager.CommandExecutor')
     def test_connectivity_test_exception(self, mock_executor_class):
         """Test connectivity test with exception."""
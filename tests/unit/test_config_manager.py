@@ -2,16 +2,19 @@
 Tests for NetArchon Configuration Management Module
 """
 
+import errno
 import os
+import sqlite3
 import tempfile
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime
 
+from src.netarchon.core import config_manager as config_manager_module
 from src.netarchon.core.config_manager import ConfigManager
 from src.netarchon.models.connection import ConnectionInfo, CommandResult, ConnectionType, ConnectionStatus
 from src.netarchon.models.device import DeviceType
-from src.netarchon.utils.exceptions import ConfigurationError
+from src.netarchon.utils.exceptions import CommandExecutionError, ConfigurationError
 
 
 class TestConfigManager:
@@ -39,14 +42,26 @@ class TestConfigManager:
     def teardown_method(self):
         """Clean up test fixtures."""
         import shutil
+        self.manager.close()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
     
-    def test_manager_initialization(self):
+    def test_manager_initialization(self, tmp_path):
         """Test ConfigManager initialization."""
-        manager = ConfigManager()
-        assert manager.backup_directory == "backups"
+        backup_directory = str(tmp_path / "backups")
+        manager = ConfigManager(backup_directory=backup_directory)
+        assert manager.backup_directory == backup_directory
         assert manager.command_executor is not None
         assert len(manager.config_commands) == 5  # All device types
+        manager.close()
+    
+    def test_manager_context_closes_index(self):
+        """Test the backup index is closed when the manager's context exits."""
+        with ConfigManager(backup_directory=self.temp_dir) as manager:
+            assert manager.list_backups("test_router") == []
+        
+        with pytest.raises(sqlite3.ProgrammingError):
+            manager._db.execute("SELECT 1")
+        manager.close()  # Closing again is harmless
     
     def test_manager_initialization_custom_directory(self):
         """Test ConfigManager initialization with custom directory."""
@@ -69,16 +84,8 @@ interface GigabitEthernet0/0
 !
 end"""
         
-        success_result = CommandResult(
-            success=True,
-            output=config_content,
-            error="",
-            execution_time=1.0,
-            timestamp=datetime.now(),
-            command="show running-config",
-            device_id="test_router"
-        )
-        mock_executor.execute_command.return_value = success_result
+        stream = iter([config_content.encode()])
+        mock_executor.execute_command_stream.return_value = stream
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -99,7 +106,268 @@ end"""
             assert "test_router" in backup_content
             assert "Test backup" in backup_content
             assert config_content in backup_content
+
+    def test_backup_config_checksum_header(self):
+        """Test backup checksum header matches the stored configuration."""
+        import hashlib
+
+        config_content = "hostname test_router\n" + "interface Gi0/1\n description x\n" * 5000
+        mock_executor = Mock()
+        chunks = [config_content.encode()]
+        mock_executor.execute_command_stream.side_effect = lambda *args: iter(chunks)
+        self.manager.command_executor = mock_executor
+
+        backup_path = self.manager.backup_config(self.connection, "Checksum test")
+
+        with open(backup_path, 'r') as f:
+            backup_content = f.read()
+        if config_manager_module.BLAKE3_AVAILABLE:
+            import blake3
+            expected = blake3.blake3(config_content.encode()).hexdigest(length=16)
+            assert "# Checksum-Algorithm: blake3\n" in backup_content
+        else:
+            expected = hashlib.blake2b(config_content.encode(), digest_size=16).hexdigest()
+            assert "# Checksum-Algorithm: blake2b\n" in backup_content
+        assert f"# Checksum: {expected}\n" in backup_content
+        assert backup_content.endswith(config_content)
+
+    def test_backup_config_unchanged_skips_write(self):
+        """Test unchanged configuration reuses the previous backup file."""
+        config_content = "version 15.1\nhostname test_router\n"
+        mock_executor = Mock()
+        chunks = [config_content.encode()]
+        mock_executor.execute_command_stream.side_effect = lambda *args: iter(chunks)
+        self.manager.command_executor = mock_executor
+
+        first_path = self.manager.backup_config(self.connection, "First backup")
+
+        # A fresh manager rebuilds the checksum index from disk
+        manager = ConfigManager(backup_directory=self.temp_dir)
+        manager.command_executor = mock_executor
+        with patch('src.netarchon.core.config_manager.open', create=True) as mock_open:
+            second_path = manager.backup_config(self.connection, "Second backup")
+
+        assert second_path == first_path
+        mock_open.assert_not_called()
+        assert len(os.listdir(os.path.dirname(first_path))) == 1
+
+    def test_backup_config_failed_write_leaves_no_file(self):
+        """Test an interrupted write leaves neither a partial backup nor a temp file."""
+        mock_executor = Mock()
+        chunks = [b"version 15.1\nhostname test_router\n"]
+        mock_executor.execute_command_stream.side_effect = lambda *args: iter(chunks)
+        self.manager.command_executor = mock_executor
+
+        with patch('src.netarchon.core.config_manager.os.fsync', side_effect=OSError("disk full")):
+            with pytest.raises(ConfigurationError):
+                self.manager.backup_config(self.connection, "Failing backup")
+
+        device_dir = os.path.join(self.temp_dir, "test_router")
+        assert os.listdir(device_dir) == []
+
+    def test_backup_config_stores_delta_and_rollback_materializes(self):
+        """Test changed configs are stored as deltas that reconstruct the full config."""
+        base_config = "version 15.1\nhostname test_router\n" + "".join(
+            f"interface Gi0/{i}\n description port {i}\n!\n" for i in range(200))
+        configs = [
+            base_config,
+            base_config.replace("description port 7\n", "description uplink\n"),
+            base_config.replace("description port 7\n", "description uplink\n") + "ntp server 10.0.0.1",
+            base_config + "ntp server 10.0.0.2\n",
+        ]
+        mock_executor = Mock()
+        streams = [iter([config.encode()]) for config in configs]
+        mock_executor.execute_command_stream.side_effect = streams
+        manager = ConfigManager(backup_directory=self.temp_dir, max_delta_chain=2)
+        manager.command_executor = mock_executor
+
+        paths = [manager.backup_config(self.connection, f"Backup {i}") for i in range(len(configs))]
+
+        assert [os.path.splitext(p)[1] for p in paths] == ['.txt', '.patch', '.patch', '.txt']
+        assert os.path.getsize(paths[1]) < len(base_config) // 10
+        for path, config in zip(paths, configs):
+            assert manager._materialize(path).decode() == config
+
+        # A fresh manager continues the chain from the index on disk
+        reloaded = ConfigManager(backup_directory=self.temp_dir, max_delta_chain=2)
+        assert reloaded._last_path["test_router"] == paths[-1]
+        assert reloaded._last_depth["test_router"] == 0
+
+    def test_backup_config_repeated_config_references_earlier_backup(self):
+        """Test a config identical to an older backup is stored as a reference to it."""
+        config_a = "version 15.1\nhostname test_router\n" + "ntp server 10.0.0.1\n" * 100
+        config_b = config_a + "logging host 10.0.0.2\n"
+        mock_executor = Mock()
+        mock_executor.execute_command_stream.side_effect = [
+            iter([config.encode()]) for config in (config_a, config_b, config_a)
+        ]
+        self.manager.command_executor = mock_executor
+
+        first, _, third = [self.manager.backup_config(self.connection) for _ in range(3)]
+
+        metadata = self.manager._read_backup_header(third)
+        assert metadata['Base'] == os.path.basename(first)
+        assert metadata['Delta-Depth'] == '1'
+        assert self.manager._materialize(third).decode() == config_a
+
+    def test_write_backup_handles_partial_writev(self):
+        """Test short scatter-gather writes are resumed until both buffers are written."""
+        if not hasattr(os, 'writev'):
+            pytest.skip("os.writev not available")
+        real_writev = os.writev
+
+        def short_writev(fd, buffers):
+            # Write at most 3 bytes per call
+            return real_writev(fd, [bytes(buffers[0][:3])])
+
+        full_path = os.path.join(self.temp_dir, "partial.txt")
+        with patch('src.netarchon.core.config_manager.os.writev', side_effect=short_writev):
+            self.manager._write_backup(full_path, b"# header\n", b"hostname r1\n")
+
+        with open(full_path, 'rb') as f:
+            assert f.read() == b"# header\nhostname r1\n"
+
+    def test_backup_index_tracks_backups(self):
+        """Test backups are indexed in SQLite and unindexed files are picked up on load."""
+        configs = ["version 15.1\nhostname test_router\n" * 50,
+                   "version 15.1\nhostname test_router\n" * 50 + "ntp server 10.0.0.1\n"]
+        mock_executor = Mock()
+        streams = [iter([config.encode()]) for config in configs]
+        mock_executor.execute_command_stream.side_effect = streams
+        self.manager.command_executor = mock_executor
+        
+        first = self.manager.backup_config(self.connection, "First")
+        second = self.manager.backup_config(self.connection, "Second")
+        
+        history = self.manager.list_backups("test_router")
+        assert [entry['path'] for entry in history] == [second, first]
+        assert [entry['is_delta'] for entry in history] == [True, False]
+        assert history[1]['reason'] == "First"
+        assert self.manager._materialize(second).decode() == configs[1]
+        
+        # Drop the index: a new manager rebuilds it from the backup headers
+        self.manager.close()
+        os.remove(os.path.join(self.temp_dir, "index.sqlite"))
+        os.remove(first)
+        manager = ConfigManager(backup_directory=self.temp_dir)
+        
+        assert [entry['path'] for entry in manager.list_backups("test_router")] == [second]
+        assert manager._lookup_backup(second)['base'] == os.path.basename(first)
+        manager.close()
+    
+    def test_write_backup_direct_io(self):
+        """Test O_DIRECT writes store exactly the header and body, or fall back cleanly."""
+        manager = ConfigManager(backup_directory=self.temp_dir, direct_io=True)
+        full_path = os.path.join(self.temp_dir, "direct.txt")
+        body = b"hostname r1\n" * 1000
+        
+        manager._write_backup(full_path, b"# header\n", body)
+        
+        with open(full_path, 'rb') as f:
+            assert f.read() == b"# header\n" + body
+        assert not os.path.exists(full_path + '.tmp')
+        manager.close()
+    
+    def test_write_backup_direct_io_write_rejected(self):
+        """Test a filesystem rejecting O_DIRECT writes falls back to buffered writes."""
+        manager = ConfigManager(backup_directory=self.temp_dir, direct_io=True)
+        full_path = os.path.join(self.temp_dir, "direct.txt")
+        body = b"hostname r1\n" * 1000
+        rejected = OSError(errno.EINVAL, "Invalid argument")
+        
+        with patch.object(config_manager_module.os, 'write', side_effect=rejected):
+            manager._write_backup(full_path, b"# header\n", body)
+        
+        with open(full_path, 'rb') as f:
+            assert f.read() == b"# header\n" + body
+        assert not os.path.exists(full_path + '.tmp')
+        assert manager.direct_io is False
+        manager.close()
+    
+    @pytest.mark.parametrize("compression", [
+        "zlib",
+        pytest.param("zstd", marks=pytest.mark.skipif(
+            not config_manager_module.ZSTD_AVAILABLE, reason="zstandard not installed")),
+    ])
+    def test_backup_config_compressed(self, compression):
+        """Test compressed full and delta backups round-trip through materialize."""
+        configs = ["version 15.1\nhostname test_router\n" + "interface Gi0/1\n shutdown\n!\n" * 500,
+                   "version 15.1\nhostname test_router\n" + "interface Gi0/1\n shutdown\n!\n" * 501]
+        mock_executor = Mock()
+        streams = [iter([config.encode()]) for config in configs]
+        mock_executor.execute_command_stream.side_effect = streams
+        manager = ConfigManager(backup_directory=self.temp_dir, compression=compression)
+        manager.command_executor = mock_executor
+        
+        paths = [manager.backup_config(self.connection) for _ in configs]
+        
+        suffix = {"zlib": ".z", "zstd": ".zst"}[compression]
+        assert paths[0].endswith(".txt" + suffix) and paths[1].endswith(".patch" + suffix)
+        assert os.path.getsize(paths[0]) < len(configs[0]) // 5
+        assert manager._read_backup_header(paths[0])['Compression'] == compression
+        
+        # Both the indexed path and the header-parsing fallback decompress
+        for path, config in zip(paths, configs):
+            assert manager._materialize(path).decode() == config
+        with patch.object(manager, '_lookup_backup', return_value=None):
+            for path, config in zip(paths, configs):
+                assert manager._materialize(path).decode() == config
+        manager.close()
+    
+    def test_invalid_compression_rejected(self):
+        """Test unknown compression methods are rejected up front."""
+        with pytest.raises(ValueError):
+            ConfigManager(backup_directory=self.temp_dir, compression="lz4")
     
+    def test_backup_config_async(self):
+        """Test async backup runs off the event loop and writes the file."""
+        import asyncio
+
+        mock_executor = Mock()
+        chunks = [b"version 15.1\nhostname test_router\n"]
+        mock_executor.execute_command_stream.side_effect = lambda *args: iter(chunks)
+        self.manager.command_executor = mock_executor
+
+        backup_path = asyncio.run(self.manager.backup_config_async(self.connection, "Async backup"))
+
+        assert os.path.exists(backup_path)
+        with open(backup_path, 'r') as f:
+            assert "# Reason: Async backup" in f.read()
+
+    def test_backup_many_preserves_per_device_failures(self):
+        """Test concurrent backups return a result or exception per device in order."""
+        import asyncio
+
+        def mock_execute_command_stream(connection, command):
+            if connection.device_id == "bad_router":
+                raise CommandExecutionError("Command failed")
+            return iter([f"hostname {connection.device_id}\n".encode()])
+
+        mock_executor = Mock()
+        mock_executor.execute_command_stream.side_effect = mock_execute_command_stream
+        self.manager.command_executor = mock_executor
+
+        connections = []
+        for device_id in ("router_a", "bad_router", "router_b"):
+            connection = ConnectionInfo(
+                device_id=device_id,
+                host="192.168.1.1",
+                port=22,
+                username="admin",
+                connection_type=ConnectionType.SSH,
+                established_at=datetime.now(),
+                last_activity=datetime.now(),
+                status=ConnectionStatus.CONNECTED
+            )
+            connections.append(connection)
+
+        results = asyncio.run(self.manager.backup_many(connections, "Bulk backup", concurrency=2))
+
+        assert len(results) == 3
+        assert os.path.exists(results[0]) and "router_a" in results[0]
+        assert isinstance(results[1], ConfigurationError)
+        assert os.path.exists(results[2]) and "router_b" in results[2]
+
     @patch('src.netarchon.core.config_manager.CommandExecutor')
     def test_backup_config_command_failure(self, mock_executor_class):
         """Test configuration backup with command failure."""
@@ -107,17 +375,9 @@ end"""
         mock_executor = Mock()
         mock_executor_class.return_value = mock_executor
         
-        # Mock failed show config result
-        failed_result = CommandResult(
-            success=False,
-            output="",
-            error="Command failed",
-            execution_time=1.0,
-            timestamp=datetime.now(),
-            command="show running-config",
-            device_id="test_router"
-        )
-        mock_executor.execute_command.return_value = failed_result
+        # Mock failed show config command
+        stream_error = CommandExecutionError("Command failed")
+        mock_executor.execute_command_stream.side_effect = stream_error
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -133,7 +393,7 @@ end"""
         # Mock command executor to raise exception
         mock_executor = Mock()
         mock_executor_class.return_value = mock_executor
-        mock_executor.execute_command.side_effect = Exception("Connection lost")
+        mock_executor.execute_command_stream.side_effect = Exception("Connection lost")
         
         # Create manager with mocked executor
         manager = ConfigManager(backup_directory=self.temp_dir)
@@ -155,6 +415,14 @@ end"""
         result = self.manager.validate_config_syntax(cisco_config, DeviceType.CISCO_IOS)
         assert result is True
     
+    def test_validate_config_syntax_cisco_version_only_in_head(self):
+        """Test 'version' only counts within the first 10 lines of a Cisco config."""
+        body = "".join(f"interface Gi0/{i}\n" for i in range(12))
+        
+        assert self.manager.validate_config_syntax("VERSION 15.1\n" + body, DeviceType.CISCO_IOS)
+        assert not self.manager.validate_config_syntax(body + "version 15.1\n", DeviceType.CISCO_IOS)
+        assert self.manager.validate_config_syntax(body + "Hostname r1\n", DeviceType.CISCO_IOS)
+    
     def test_validate_config_syntax_juniper_valid(self):
         """Test valid Juniper configuration validation."""
         juniper_config = """system {
@@ -196,6 +464,14 @@ interfaces {
             assert 'show_config' in self.manager.config_commands[device_type]
             assert 'save_config' in self.manager.config_commands[device_type]
     
+    def test_cmd_for_matches_config_commands(self):
+        """Test the CmdSet lookup carries the same commands as config_commands."""
+        for device_type, commands in self.manager.config_commands.items():
+            cmd_set = ConfigManager.cmd_for[device_type]
+            assert cmd_set.show_config == commands['show_config']
+            assert cmd_set.save_config == commands['save_config']
+            assert cmd_set.exit_config == commands['exit_config']
+    
     def test_backup_directory_creation(self):
         """Test backup directory creation."""
         test_dir = os.path.join(self.temp_dir, "new_backup_dir")
@@ -209,6 +209,18 @@ class TestCommandResult:
         assert result.timestamp == now
         assert result.command == "show version"
         assert result.device_id == "router1"
+        assert result.additional_data == {}
+    
+    def test_additional_data_not_shared(self):
+        """Test each result gets its own additional_data dictionary."""
+        now = datetime.utcnow()
+        first = CommandResult(True, "", "", 0.1, now, "show clock", "router1")
+        second = CommandResult(True, "", "", 0.1, now, "show clock", "router1")
+        
+        first.additional_data['command_type'] = 'show'
+        
+        assert second.additional_data == {}
+        assert first == second
     
     def test_none_values_initialization(self):
         """Test initialization with None values."""
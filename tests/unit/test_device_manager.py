@@ -2,6 +2,9 @@
 Unit tests for NetArchon device manager.
 """
 
+import re
+import threading
+from collections.abc import Mapping
 from datetime import datetime
 from unittest.mock import Mock, patch
 
@@ -44,6 +47,13 @@ class TestDeviceDetector:
         assert DeviceType.CISCO_IOS in detector.detection_patterns
         assert DeviceType.JUNIPER_JUNOS in detector.detection_patterns
     
+    def test_detection_patterns_precompiled(self):
+        """Test detection patterns are compiled once at initialization."""
+        for patterns in self.detector.detection_patterns.values():
+            for pattern in patterns['version_patterns'] + patterns['prompt_patterns']:
+                assert isinstance(pattern, re.Pattern)
+                assert pattern.flags & re.IGNORECASE
+    
     @patch('src.netarchon.core.device_manager.CommandExecutor')
     def test_detect_cisco_ios_device(self, mock_executor_class):
         """Test detection of Cisco IOS device."""
@@ -139,6 +149,54 @@ class TestDeviceDetector:
         
         assert device_type == DeviceType.ARISTA_EOS
     
+    @patch('src.netarchon.core.device_manager.CommandExecutor')
+    def test_detect_device_stops_at_max_score(self, mock_executor_class):
+        """Test scoring stops once a device type reaches the maximum score."""
+        mock_executor = Mock()
+        mock_executor_class.return_value = mock_executor
+        mock_executor.execute_command.return_value = CommandResult(
+            success=True,
+            output="Cisco IOS Software, Version 15.1(4)M4",
+            error="",
+            execution_time=1.0,
+            timestamp=datetime.utcnow(),
+            command="show version",
+            device_id="router1"
+        )
+        
+        detector = DeviceDetector()
+        with patch.object(detector, '_calculate_detection_score',
+                          wraps=detector._calculate_detection_score) as mock_score:
+            device_type = detector.detect_device_type(self.connection)
+        
+        assert device_type == DeviceType.CISCO_IOS
+        assert mock_score.call_count == 1
+    
+    @patch('src.netarchon.core.device_manager.CommandExecutor')
+    def test_detect_device_tries_frequent_type_first(self, mock_executor_class):
+        """Test previously detected device types are scored first."""
+        mock_executor = Mock()
+        mock_executor_class.return_value = mock_executor
+        mock_executor.execute_command.return_value = CommandResult(
+            success=True,
+            output="Juniper Networks JUNOS 12.3R2.5",
+            error="",
+            execution_time=1.0,
+            timestamp=datetime.utcnow(),
+            command="show version",
+            device_id="router1"
+        )
+        
+        detector = DeviceDetector()
+        assert detector.detect_device_type(self.connection) == DeviceType.JUNIPER_JUNOS
+        
+        with patch.object(detector, '_calculate_detection_score',
+                          wraps=detector._calculate_detection_score) as mock_score:
+            assert detector.detect_device_type(self.connection) == DeviceType.JUNIPER_JUNOS
+        
+        assert mock_score.call_count == 1
+        assert mock_score.call_args[0][1] == DeviceType.JUNIPER_JUNOS
+    
     @patch('src.netarchon.core.device_manager.CommandExecutor')
     def test_detect_generic_device(self, mock_executor_class):
         """Test detection falls back to generic for unknown devices."""
@@ -234,6 +292,29 @@ class TestDeviceDetector:
         assert device_info.model == "ISR4321"
         assert device_info.status == DeviceStatus.ONLINE
     
+    @patch('src.netarchon.core.device_manager.CommandExecutor')
+    def test_get_device_info_reuses_detection_output(self, mock_executor_class):
+        """Test device info gathering executes show version only once."""
+        mock_executor = Mock()
+        mock_executor_class.return_value = mock_executor
+        
+        mock_executor.execute_command.return_value = CommandResult(
+            success=True,
+            output="Cisco IOS Software, Version 15.1",
+            error="",
+            execution_time=1.0,
+            timestamp=datetime.utcnow(),
+            command="show version",
+            device_id="router1"
+        )
+        
+        detector = DeviceDetector()
+        device_info = detector.get_device_info(self.connection)
+        
+        assert device_info.device_type == DeviceType.CISCO_IOS
+        assert device_info.last_seen == mock_executor.execute_command.return_value.timestamp
+        mock_executor.execute_command.assert_called_once_with(self.connection, "show version")
+    
     @patch('src.netarchon.core.device_manager.CommandExecutor')
     def test_get_device_info_command_failure(self, mock_executor_class):
         """Test device info gathering when version command fails."""
@@ -299,12 +380,12 @@ class TestDeviceDetector:
     def test_calculate_detection_score_high(self):
         """Test detection score calculation with high confidence."""
         patterns = {
-            'version_patterns': [r'Cisco IOS Software'],
+            'version_patterns': [re.compile(r'Cisco IOS Software', re.IGNORECASE)],
             'commands': ['show version']
         }
         
-        with patch.object(self.detector.command_executor, 'execute_command') as mock_exec:
-            mock_exec.return_value = CommandResult(
+        outputs = {
+            'show version': CommandResult(
                 success=True,
                 output="Cisco IOS Software, Version 15.1",
                 error="",
@@ -313,23 +394,24 @@ class TestDeviceDetector:
                 command="show version",
                 device_id="router1"
             )
-            
-            score = self.detector._calculate_detection_score(
-                self.connection, DeviceType.CISCO_IOS, patterns
-            )
-            
-            assert score > 0
-            assert score <= 100
+        }
+        
+        score = self.detector._calculate_detection_score(
+            outputs, DeviceType.CISCO_IOS, patterns
+        )
+        
+        assert score > 0
+        assert score <= 100
     
     def test_calculate_detection_score_zero(self):
         """Test detection score calculation with no matches."""
         patterns = {
-            'version_patterns': [r'NonExistentPattern'],
+            'version_patterns': [re.compile(r'NonExistentPattern', re.IGNORECASE)],
             'commands': ['show version']
         }
         
-        with patch.object(self.detector.command_executor, 'execute_command') as mock_exec:
-            mock_exec.return_value = CommandResult(
+        outputs = {
+            'show version': CommandResult(
                 success=True,
                 output="Some other device output",
                 error="",
@@ -338,12 +420,13 @@ class TestDeviceDetector:
                 command="show version",
                 device_id="router1"
             )
-            
-            score = self.detector._calculate_detection_score(
-                self.connection, DeviceType.CISCO_IOS, patterns
-            )
-            
-            assert score == 0
+        }
+        
+        score = self.detector._calculate_detection_score(
+            outputs, DeviceType.CISCO_IOS, patterns
+        )
+        
+        assert score == 0
     
     def test_parse_device_info_cisco(self):
         """Test parsing Cisco device information."""
@@ -379,6 +462,23 @@ class TestDeviceDetector:
         assert model == "MX240"
         assert os_version == "12.3R2.5"
     
+    def test_parse_device_info_ignores_mid_line_matches(self):
+        """Test parse patterns only match fields at the start of a line."""
+        version_output = """Cisco IOS Software, Version 15.1(4)M4
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2012 by Cisco Systems, Inc.
+edge-rtr uptime is 2 weeks, 1 day
+cisco C2911 (revision 1.0) with 487424K/36864K bytes of memory.
+"""
+        
+        hostname, vendor, model, os_version = self.detector._parse_device_info(
+            version_output, DeviceType.CISCO_IOS
+        )
+        
+        assert hostname == "edge-rtr"
+        assert model == "C2911"
+        assert os_version == "15.1(4)M4"
+    
     def test_parse_device_info_arista(self):
         """Test parsing Arista device information."""
         version_output = """
@@ -410,7 +510,7 @@ class TestDeviceDetector:
         """Test getting Cisco command syntax."""
         syntax = self.detector._get_command_syntax(DeviceType.CISCO_IOS)
         
-        assert isinstance(syntax, dict)
+        assert isinstance(syntax, Mapping)
         assert 'show_version' in syntax
         assert syntax['show_version'] == 'show version'
         assert 'show_interfaces' in syntax
@@ -422,7 +522,7 @@ class TestDeviceDetector:
         """Test getting Juniper command syntax."""
         syntax = self.detector._get_command_syntax(DeviceType.JUNIPER_JUNOS)
         
-        assert isinstance(syntax, dict)
+        assert isinstance(syntax, Mapping)
         assert 'show_version' in syntax
         assert syntax['show_version'] == 'show version'
         assert 'show_ip_route' in syntax
@@ -433,10 +533,18 @@ class TestDeviceDetector:
         """Test getting generic command syntax."""
         syntax = self.detector._get_command_syntax(DeviceType.GENERIC)
         
-        assert isinstance(syntax, dict)
+        assert isinstance(syntax, Mapping)
         assert 'show_version' in syntax
         assert len(syntax) < 10  # Generic should have fewer commands
     
+    def test_get_command_syntax_shared_read_only(self):
+        """Test command syntax mappings are shared and cannot be mutated."""
+        syntax = self.detector._get_command_syntax(DeviceType.CISCO_IOS)
+        
+        assert syntax is self.detector._get_command_syntax(DeviceType.CISCO_IOS)
+        with pytest.raises(TypeError):
+            syntax['show_version'] = 'show ver'
+    
     def test_capability_test_methods(self):
         """Test individual capability test methods."""
         assert self.detector._test_snmp_capability() is True
@@ -541,6 +649,32 @@ class TestCapabilityManager:
         command = self.manager.get_command_for_device("unknown", "ping", target="8.8.8.8")
         assert "8.8.8.8" in command
     
+    def test_get_command_for_device_cache_cleared_on_register(self):
+        """Test resolved templates are refreshed when a profile is registered."""
+        command = self.manager.get_command_for_device("router1", "show_ip_route")
+        assert command == "show ip route"
+        
+        juniper_profile = DeviceProfile(
+            device_type=DeviceType.JUNIPER_JUNOS,
+            vendor="Juniper",
+            model="MX240",
+            os_version="12.3R2.5",
+            capabilities=['ssh'],
+            command_syntax={'show_ip_route': 'show route'}
+        )
+        self.manager.register_device_profile("router1", juniper_profile)
+        
+        assert self.manager.get_command_for_device("router1", "show_ip_route") == "show route"
+        assert self.manager._resolve_template.cache_info().currsize == 1
+    
+    def test_get_command_for_device_fallback_requires_parameters(self):
+        """Test fallback templates are only used when their parameters are given."""
+        command = self.manager.get_command_for_device("unknown", "traceroute", target="10.0.0.1")
+        assert command == "traceroute 10.0.0.1"
+        
+        with pytest.raises(UnsupportedDeviceError):
+            self.manager.get_command_for_device("unknown", "traceroute")
+    
     def test_get_command_for_device_missing_parameter(self):
         """Test getting command with missing parameter."""
         self.manager.register_device_profile("router1", self.cisco_profile)
@@ -638,6 +772,27 @@ class TestCapabilityManager:
         assert 'file_operations' in results
         assert 'network_commands' in results
     
+    def test_test_device_capabilities_runs_concurrently(self):
+        """Test capability probes run concurrently and report in order."""
+        from src.netarchon.core.device_manager import CapabilityManager
+        
+        barrier = threading.Barrier(3, timeout=5)
+        
+        def probe(manager, connection):
+            barrier.wait()
+            return True
+        
+        def failing_probe(manager, connection):
+            barrier.wait()
+            raise RuntimeError("probe failed")
+        
+        probes = (('first', probe), ('second', failing_probe), ('third', probe))
+        with patch.object(CapabilityManager, '_CAPABILITY_TESTS', probes):
+            results = self.manager.test_device_capabilities(self.connection)
+        
+        assert list(results) == ['first', 'second', 'third']
+        assert results == {'first': True, 'second': False, 'third': True}
+    
     def test_update_device_capabilities(self):
         """Test updating device capabilities."""
         self.manager.register_device_profile("router1", self.cisco_profile)
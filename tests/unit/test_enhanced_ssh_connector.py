@@ -0,0 +1,413 @@
+"""
+Unit tests for NetArchon enhanced SSH connector.
+"""
+
+import importlib
+import sys
+import threading
+import types
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from src.netarchon.models.connection import (
+    ConnectionInfo,
+    ConnectionType,
+    ConnectionStatus,
+    AuthenticationCredentials
+)
+from src.netarchon.utils.circuit_breaker import CircuitState
+from src.netarchon.utils.exceptions import AuthenticationError
+
+
+def _load_connector_module():
+    """Import the connector against a stand-in BitWarden integration package.
+    
+    The integrations package imports every integration eagerly, including
+    ones that need the optional web dependencies, so only the names the
+    connector uses are provided here.
+    """
+    bitwarden = types.ModuleType("src.netarchon.integrations.bitwarden")
+    bitwarden.BitWardenError = type("BitWardenError", (Exception,), {})
+    bitwarden.BitWardenManager = Mock(name="BitWardenManager")
+    bitwarden.BitWardenCredential = object
+    bitwarden.CredentialMapping = object
+    integrations = types.ModuleType("src.netarchon.integrations")
+    integrations.bitwarden = bitwarden
+    
+    saved = {name: sys.modules.get(name) for name in (integrations.__name__, bitwarden.__name__)}
+    sys.modules.update({integrations.__name__: integrations, bitwarden.__name__: bitwarden})
+    try:
+        return importlib.import_module("src.netarchon.core.enhanced_ssh_connector")
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+esc = _load_connector_module()
+
+
+def _credential(username="admin"):
+    """Build a BitWarden credential as returned by the manager."""
+    return Mock(username=username, password="secret", enable_password=None,
+                source_item_name="router")
+
+
+def _connection(device_id, last_activity=None):
+    """Build a connected ConnectionInfo."""
+    now = datetime.utcnow()
+    return ConnectionInfo(
+        device_id=device_id,
+        host=device_id.split(":")[0],
+        port=22,
+        username="admin",
+        connection_type=ConnectionType.SSH,
+        established_at=now,
+        last_activity=last_activity or now,
+        status=ConnectionStatus.CONNECTED
+    )
+
+
+def _connector(manager=None):
+    """Build a connector that uses ``manager`` as its BitWarden backend."""
+    connector = esc.EnhancedSSHConnector(enable_bitwarden=False)
+    connector.enable_bitwarden = True
+    connector.bitwarden_manager = manager or Mock(cli_timeout=30)
+    connector.bitwarden_manager.get_all_device_mappings.return_value = {}
+    return connector
+
+
+class TestEnhancedSSHConnector:
+    """Test BitWarden credential resolution and caching."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        esc.circuit_breaker_manager.get_circuit_breaker("bitwarden").reset()
+        self.fallback = AuthenticationCredentials(username="fallback", password="secret")
+    
+    def test_vault_server_is_opt_in(self):
+        """Test the BitWarden manager is created without the REST API by default."""
+        esc.BitWardenManager.reset_mock()
+        
+        esc.EnhancedSSHConnector(prewarm_vault=False)
+        esc.EnhancedSSHConnector(prewarm_vault=False, use_vault_server=True)
+        
+        assert [c.kwargs for c in esc.BitWardenManager.call_args_list] == [
+            {"use_serve": False}, {"use_serve": True}]
+    
+    def test_resolve_credentials_from_bitwarden(self):
+        """Test a vault match is turned into connection credentials."""
+        connector = _connector()
+        connector.bitwarden_manager.get_device_credentials.return_value = _credential()
+        
+        credentials = connector.resolve_credentials("10.0.0.5", "router")
+        
+        assert credentials.username == "admin"
+        assert credentials.password == "secret"
+    
+    def test_credential_lookup_reused_within_ttl(self):
+        """Test a cached lookup is reused until the TTL expires."""
+        connector = _connector()
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.return_value = _credential()
+        
+        connector.resolve_credentials("10.0.0.5", "router")
+        connector.resolve_credentials("10.0.0.5", "router")
+        assert lookup.call_count == 1
+        
+        connector._cred_ttl = 0
+        connector.resolve_credentials("10.0.0.5", "router")
+        assert lookup.call_count == 2
+    
+    def test_negative_cache_skips_recent_miss(self):
+        """Test a host without vault credentials is not searched again right away."""
+        connector = _connector()
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.return_value = None
+        
+        for _ in range(2):
+            credentials = connector.resolve_credentials("10.0.0.5", "router",
+                                                        fallback_credentials=self.fallback)
+            assert credentials is self.fallback
+        assert lookup.call_count == 1
+        
+        connector.invalidate_credential_cache("10.0.0.5")
+        with pytest.raises(AuthenticationError):
+            connector.resolve_credentials("10.0.0.5", "router")
+        assert lookup.call_count == 2
+    
+    def test_untyped_miss_does_not_block_typed_lookup(self):
+        """Test a miss without a device type is not reused for a typed lookup of the host."""
+        connector = _connector()
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.side_effect = lambda host, device_type: _credential() if device_type else None
+        
+        untyped = connector.resolve_credentials("10.0.0.5", fallback_credentials=self.fallback)
+        typed = connector.resolve_credentials("10.0.0.5", "router")
+        
+        assert untyped is self.fallback
+        assert typed.username == "admin"
+        
+        connector.invalidate_credential_cache("10.0.0.5")
+        assert connector._negative_cache == {} and connector._cred_cache == {}
+    
+    def test_vault_outage_opens_breaker_without_negative_caching(self):
+        """Test failing lookups fall back, open the breaker and are not cached as misses."""
+        connector = _connector()
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.side_effect = esc.BitWardenError("bw timed out")
+        
+        for _ in range(6):
+            credentials = connector.resolve_credentials("10.0.0.5", "router",
+                                                        fallback_credentials=self.fallback)
+            assert credentials is self.fallback
+        
+        assert lookup.call_count == 5
+        assert connector._bw_breaker.state == CircuitState.OPEN
+        assert connector._negative_cache == {}
+    
+    def test_auto_discovery_miss_searches_once(self):
+        """Test auto-discovery reports a vault miss after a single typed search."""
+        connector = _connector()
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.return_value = None
+        
+        with pytest.raises(AuthenticationError):
+            connector.connect_with_auto_discovery("192.168.1.1")
+        
+        lookup.assert_called_once_with("192.168.1.1", "router")
+    
+    def test_mapped_hostname_looked_up_by_ip(self):
+        """Test a host known by its mapped hostname is fetched by the mapped IP."""
+        connector = _connector()
+        mapping = Mock(device_ip="10.0.0.5", device_hostname="edge1")
+        connector.bitwarden_manager.get_all_device_mappings.return_value = {"10.0.0.5": mapping}
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.return_value = _credential()
+        
+        connector.resolve_credentials("edge1", "router")
+        
+        lookup.assert_called_once_with("10.0.0.5", "router")
+    
+    def test_rejected_credentials_dropped(self):
+        """Test credentials the device rejects are looked up again next time."""
+        connector = _connector()
+        connector.bitwarden_manager.get_device_credentials.return_value = _credential()
+        connector.connect = Mock(side_effect=AuthenticationError("login rejected"))
+        
+        with pytest.raises(AuthenticationError):
+            connector.connect_with_bitwarden("10.0.0.5", "router")
+        
+        assert connector._cred_cache == {}
+    
+    def test_invalidation_safe_during_concurrent_lookups(self):
+        """Test invalidating a host while other threads fill the cache does not fail."""
+        connector = _connector()
+        connector.bitwarden_manager.get_device_credentials.return_value = _credential()
+        errors = []
+        
+        def fill(start):
+            for i in range(start, start + 500):
+                connector.resolve_credentials(f"10.0.{i // 250}.{i % 250}", "router")
+        
+        def invalidate():
+            try:
+                for _ in range(500):
+                    connector.invalidate_credential_cache("10.0.0.1")
+            except RuntimeError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=fill, args=(n * 500,)) for n in range(4)]
+        threads.append(threading.Thread(target=invalidate))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        
+        assert errors == []
+        assert len(connector._cred_cache) >= 1999
+    
+    def test_concurrent_lookups_share_one_vault_call(self):
+        """Test concurrent lookups of one host wait for a single vault call."""
+        connector = _connector()
+        started = threading.Event()
+        release = threading.Event()
+        
+        def slow_lookup(host, device_type):
+            started.set()
+            release.wait(5)
+            return _credential()
+        
+        lookup = connector.bitwarden_manager.get_device_credentials
+        lookup.side_effect = slow_lookup
+        results = []
+        
+        def resolve():
+            results.append(connector.resolve_credentials("10.0.0.5", "router"))
+        
+        owner = threading.Thread(target=resolve)
+        owner.start()
+        assert started.wait(5)
+        waiter = threading.Thread(target=resolve)
+        waiter.start()
+        release.set()
+        owner.join(5)
+        waiter.join(5)
+        
+        assert lookup.call_count == 1
+        assert [c.username for c in results] == ["admin", "admin"]
+    
+    def test_waiter_falls_back_when_shared_lookup_is_slow(self, monkeypatch):
+        """Test a caller waiting on another's lookup falls back once the lookup budget is spent."""
+        monkeypatch.setattr(esc, "_PREWARM_WAIT", 0.0)
+        connector = _connector()
+        connector.bitwarden_manager.cli_timeout = 0.01
+        started = threading.Event()
+        release = threading.Event()
+        
+        def slow_lookup(host, device_type):
+            started.set()
+            release.wait(5)
+            return _credential()
+        
+        connector.bitwarden_manager.get_device_credentials.side_effect = slow_lookup
+        owner = threading.Thread(target=connector.resolve_credentials, args=("10.0.0.5", "router"))
+        owner.start()
+        assert started.wait(5)
+        
+        try:
+            credentials = connector.resolve_credentials("10.0.0.5", "router",
+                                                        fallback_credentials=self.fallback)
+        finally:
+            release.set()
+            owner.join(5)
+        
+        assert credentials is self.fallback
+
+
+class TestEnhancedConnectionPool:
+    """Test pooling of BitWarden-authenticated connections."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        esc.circuit_breaker_manager.get_circuit_breaker("bitwarden").reset()
+        self.connector = _connector()
+        self.connector.bitwarden_manager.get_device_credentials.return_value = _credential()
+        self.connector.connect = Mock(
+            side_effect=lambda host, credentials, port, device_id: _connection(device_id))
+        self.connector.disconnect = Mock()
+    
+    def _pool(self, **kwargs):
+        """Build a pool that uses the test connector."""
+        pool = esc.EnhancedConnectionPool(**kwargs)
+        pool.enhanced_connector = self.connector
+        return pool
+    
+    def test_connect_reuses_pooled_connection(self):
+        """Test a second connect to the same host reuses the pooled connection."""
+        pool = self._pool()
+        
+        first = pool.connect_with_bitwarden("10.0.0.5", "router")
+        second = pool.connect_with_bitwarden("10.0.0.5", "router")
+        
+        assert first is second
+        assert self.connector.connect.call_count == 1
+    
+    def test_pooled_connection_reused_while_vault_unreachable(self):
+        """Test a live pooled connection is reused without a BitWarden lookup."""
+        pool = self._pool()
+        first = pool.connect_with_bitwarden("10.0.0.5", "router")
+        lookup = self.connector.bitwarden_manager.get_device_credentials
+        lookup.side_effect = esc.BitWardenError("vault unreachable")
+        self.connector.invalidate_credential_cache()
+        
+        assert pool.connect_with_bitwarden("10.0.0.5", "router") is first
+        assert lookup.call_count == 1
+    
+    def test_rejected_login_drops_credentials_cached_by_hostname(self):
+        """Test a rejected login drops credentials cached under the hostname dialled by address."""
+        pool = self._pool()
+        pool._dns_cache["edge-rtr.example"] = (esc.time.monotonic(), "10.0.0.5")
+        self.connector.connect.side_effect = AuthenticationError("login rejected")
+        
+        with pytest.raises(AuthenticationError):
+            pool.connect_with_bitwarden("edge-rtr.example")
+        
+        assert self.connector.connect.call_args[0][0] == "10.0.0.5"
+        assert self.connector._cred_cache == {}
+    
+    def test_duplicate_connection_closed(self):
+        """Test a connection made concurrently for a pooled key is closed, not leaked."""
+        pool = self._pool()
+        pooled = pool.connect_with_bitwarden("10.0.0.5", "router")
+        duplicate = _connection("10.0.0.5:22")
+        
+        assert pool._add_connection("admin@10.0.0.5:22", duplicate) is pooled
+        
+        assert pool.connections["admin@10.0.0.5:22"] is pooled
+        self.connector.disconnect.assert_called_once_with(duplicate)
+    
+    def test_least_recently_used_connection_evicted(self):
+        """Test the least recently used connection is closed when the pool is full."""
+        pool = self._pool(max_connections=2)
+        
+        first = pool.connect_with_bitwarden("10.0.0.1", "router")
+        pool.connect_with_bitwarden("10.0.0.2", "router")
+        pool.connect_with_bitwarden("10.0.0.1", "router")
+        pool.connect_with_bitwarden("10.0.0.3", "router")
+        
+        assert list(pool.connections) == ["admin@10.0.0.1:22", "admin@10.0.0.3:22"]
+        assert pool.connections["admin@10.0.0.1:22"] is first
+        self.connector.disconnect.assert_called_once()
+        assert self.connector.disconnect.call_args[0][0].device_id == "10.0.0.2:22"
+    
+    def test_cleanup_reaps_only_idle_connections(self):
+        """Test heap-based cleanup removes idle connections and keeps used ones."""
+        pool = self._pool(idle_timeout=60)
+        stale = datetime.utcnow() - timedelta(hours=1)
+        idle = _connection("idle:22", last_activity=stale)
+        reused = _connection("reused:22", last_activity=stale)
+        pool._add_connection("idle", idle)
+        pool._add_connection("reused", reused)
+        reused.update_activity()
+        
+        pool.cleanup_idle_connections()
+        
+        assert list(pool.connections) == ["reused"]
+        self.connector.disconnect.assert_called_once_with(idle)
+    
+    def test_get_connection_frees_idle_slot(self):
+        """Test connections added through get_connection are reaped when the pool is full."""
+        pool = self._pool(max_connections=1, idle_timeout=60)
+        stale = datetime.utcnow() - timedelta(hours=1)
+        self.connector.connect.side_effect = (
+            lambda host, credentials, port, device_id: _connection(device_id, last_activity=stale))
+        credentials = AuthenticationCredentials(username="admin", password="secret")
+        
+        first = pool.get_connection("r1", "10.0.0.1", credentials)
+        second = pool.get_connection("r2", "10.0.0.2", credentials)
+        
+        assert list(pool.connections) == ["r2"]
+        assert pool.connections["r2"] is second
+        self.connector.disconnect.assert_called_once_with(first)
+    
+    def test_connect_many(self):
+        """Test bulk connections report each target's connection or error."""
+        pool = self._pool()
+        
+        def connect(host, credentials, port, device_id):
+            if host == "10.0.0.9":
+                raise esc.ConnectionError("unreachable")
+            return _connection(device_id)
+        
+        self.connector.connect.side_effect = connect
+        
+        results = pool.connect_many([("10.0.0.1", "router", 22), ("10.0.0.9", "router", 22)])
+        
+        assert results["10.0.0.1:22"].device_id == "10.0.0.1:22"
+        assert isinstance(results["10.0.0.9:22"], esc.ConnectionError)
+        assert list(pool.connections) == ["admin@10.0.0.1:22"]
@@ -207,8 +207,11 @@ class TestCommandExecutorErrorRecovery:
             mock_stdin = Mock()
             mock_stdout = Mock()
             mock_stderr = Mock()
-            mock_stdout.read.return_value = b"Success output"
-            mock_stderr.read.return_value = b""
+            pending = [b"Success output"]
+            mock_stdout.channel.recv_ready.side_effect = lambda: bool(pending)
+            mock_stdout.channel.recv.side_effect = lambda size: pending.pop(0)
+            mock_stdout.channel.recv_stderr_ready.return_value = False
+            mock_stdout.channel.exit_status_ready.return_value = True
             mock_stdout.channel.recv_exit_status.return_value = 0
             return mock_stdin, mock_stdout, mock_stderr
         
@@ -291,8 +294,11 @@ class TestIntegratedErrorRecovery:
             mock_stdin = Mock()
             mock_stdout = Mock()
             mock_stderr = Mock()
-            mock_stdout.read.return_value = b"Command output"
-            mock_stderr.read.return_value = b""
+            pending = [b"Command output"]
+            mock_stdout.channel.recv_ready.side_effect = lambda: bool(pending)
+            mock_stdout.channel.recv.side_effect = lambda size: pending.pop(0)
+            mock_stdout.channel.recv_stderr_ready.return_value = False
+            mock_stdout.channel.exit_status_ready.return_value = True
             mock_stdout.channel.recv_exit_status.return_value = 0
             return mock_stdin, mock_stdout, mock_stderr
         
@@ -147,6 +147,15 @@ class TestNetArchonLogger:
                 extra={"extra_fields": {"device": "router1", "port": 22}}
             )
     
+    def test_is_enabled_for(self):
+        """Test level checks follow the configured level."""
+        logger = NetArchonLogger("test_enabled")
+        logger.configure(level=LogLevel.INFO)
+        
+        assert logger.is_enabled_for(LogLevel.INFO)
+        assert logger.is_enabled_for(LogLevel.ERROR)
+        assert not logger.is_enabled_for(LogLevel.DEBUG)
+    
     def test_double_configuration_ignored(self):
         """Test that double configuration is ignored."""
         logger = NetArchonLogger("test_double")
@@ -2,6 +2,9 @@
 Tests for NetArchon Monitoring and Metrics Collection
 """
 
+import sys
+import threading
+
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
@@ -158,6 +161,135 @@ GigabitEthernet0/0 is up, line protocol is up
         assert metrics.cpu_utilization == 0.0  # Default value when collection fails
         assert metrics.memory_total == 0  # Default value when collection fails
     
+    def test_collect_system_metrics_runs_commands_concurrently(self):
+        """Test that the system metric commands are in flight at the same time."""
+        barrier = threading.Barrier(5, timeout=5)
+        
+        def mock_execute_command(connection, command, timeout=30):
+            barrier.wait()  # Only passes once all five commands are running
+            return CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
+        
+        collector = MonitoringCollector()
+        collector.command_executor = Mock()
+        collector.command_executor.execute_command.side_effect = mock_execute_command
+        
+        metrics = collector.collect_system_metrics(self.connection)
+        
+        assert metrics.cpu_utilization == 15.5
+        assert metrics.memory_total == 1024000000
+        assert metrics.uptime == 86400
+        assert metrics.temperature == 45.5
+        assert metrics.power_consumption == 150.0
+        assert collector.command_executor.execute_command.call_count == 5
+    
+    def test_collect_system_metrics_batches_supported_devices(self):
+        """Test that chainable devices get their system commands in one batch."""
+        self.connection.device_type = DeviceType.CISCO_NXOS
+        
+        def mock_batch_read(connection, commands, timeout=None):
+            return [CommandResult(True, "OK", "", 1.0, datetime.now(), command, "test_router")
+                    for command in commands]
+        
+        collector = MonitoringCollector()
+        collector.command_executor = Mock()
+        collector.command_executor.execute_batch_read.side_effect = mock_batch_read
+        
+        metrics = collector.collect_system_metrics(self.connection)
+        
+        # CPU and memory share "show system resources", which is sent once
+        batched_commands = collector.command_executor.execute_batch_read.call_args[0][1]
+        assert batched_commands == ['show system resources', 'show version',
+                                    'show environment temperature', 'show environment power']
+        collector.command_executor.execute_command.assert_not_called()
+        assert metrics.cpu_utilization == 15.5
+        assert metrics.memory_total == 1024000000
+        assert metrics.power_consumption == 150.0
+    
+    def test_collect_all(self):
+        """Test collecting system metrics from several devices."""
+        second = ConnectionInfo(
+            device_id="test_switch",
+            host="192.168.1.2",
+            port=22,
+            username="admin",
+            connection_type=ConnectionType.SSH,
+            established_at=datetime.now(),
+            last_activity=datetime.now(),
+            status=ConnectionStatus.CONNECTED
+        )
+        
+        def mock_collect(connection):
+            if connection.device_id == "test_switch":
+                raise MonitoringError("Device unreachable")
+            return connection.device_id
+        
+        collector = MonitoringCollector()
+        with patch.object(collector, 'collect_system_metrics', side_effect=mock_collect):
+            results = collector.collect_all([self.connection, second])
+        
+        assert results["test_router"] == "test_router"
+        assert isinstance(results["test_switch"], MonitoringError)
+        assert collector.collect_all([]) == {}
+    
+    def test_aggregate_metrics_averages_groups(self):
+        """Test that grouped metrics are averaged onto the latest sample."""
+        collector = MonitoringCollector()
+        now = datetime.now()
+        metrics = [
+            MetricData("test_router", MetricType.CPU, "cpu", 10, "percent", now - timedelta(minutes=2)),
+            MetricData("test_router", MetricType.CPU, "cpu", 30, "percent", now),
+            MetricData("test_router", MetricType.CPU, "cpu", 20, "percent", now - timedelta(minutes=1)),
+            MetricData("test_router", MetricType.MEMORY, "memory", 40.0, "percent", now),
+        ]
+        
+        aggregated = {m.metric_name: m for m in collector.aggregate_metrics(metrics)}
+        
+        assert aggregated["cpu"].value == 20.0
+        assert aggregated["cpu"].timestamp == now
+        assert aggregated["cpu"].metadata['sample_count'] == 3
+        assert aggregated["memory"] is metrics[3]
+    
+    def test_compare_metrics_reports_change_percent(self):
+        """Test that significant changes carry their percentage change."""
+        collector = MonitoringCollector()
+        now = datetime.now()
+        previous = [
+            MetricData("test_router", MetricType.CPU, "cpu", 20.0, "percent", now),
+            MetricData("test_router", MetricType.MEMORY, "memory", 50.0, "percent", now),
+        ]
+        current = [
+            MetricData("test_router", MetricType.CPU, "cpu", 30.0, "percent", now),
+            MetricData("test_router", MetricType.MEMORY, "memory", 52.0, "percent", now),
+        ]
+        
+        results = collector.compare_metrics(current, previous)
+        
+        assert results['changes_detected'] is True
+        assert [m.metric_name for m in results['significant_changes']] == ["cpu"]
+        assert results['value_changes'][0]['change_percent'] == 50.0
+    
+    def test_compare_metrics_keys_do_not_collide(self):
+        """Test that underscores in IDs and names cannot merge distinct metrics."""
+        collector = MonitoringCollector()
+        now = datetime.now()
+        previous = [MetricData("edge_1", MetricType.CPU, "cpu", 10.0, "percent", now)]
+        current = [MetricData("edge", MetricType.CPU, "1_cpu", 10.0, "percent", now)]
+        
+        results = collector.compare_metrics(current, previous)
+        
+        assert results['new_metrics'] == current
+        assert results['missing_metrics'] == previous
+    
+    def test_collect_all_interface_metrics(self):
+        """Test collecting interface metrics from several devices."""
+        collector = MonitoringCollector()
+        with patch.object(collector, 'collect_interface_metrics',
+                          side_effect=lambda connection: [connection.device_id]) as mock_collect:
+            results = collector.collect_all_interface_metrics([self.connection])
+        
+        assert results == {"test_router": ["test_router"]}
+        mock_collect.assert_called_once_with(self.connection)
+    
     def test_store_metrics_memory_backend(self):
         """Test metrics storage with memory backend."""
         # Create test metrics
@@ -185,9 +317,61 @@ GigabitEthernet0/0 is up, line protocol is up
         
         # Verify storage success
         assert result is True
-        assert len(self.collector._metrics_storage) == 2
-        assert self.collector._metrics_storage[0].device_id == "test_router"
-        assert self.collector._metrics_storage[1].device_id == "test_router"
+        assert len(self.collector._metrics_storage["test_router"]) == 2
+        assert self.collector._metrics_storage["test_router"][0].metric_type == MetricType.CPU
+        assert self.collector._metrics_storage["test_router"][1].metric_type == MetricType.MEMORY
+    
+    def test_store_metrics_interns_repeated_strings(self):
+        """Test that stored metrics share one copy of repeated names."""
+        metrics = [
+            MetricData("".join(["test_", "router"]), MetricType.CPU, "".join(["cpu_", "util"]),
+                       float(i), "".join(["per", "cent"]), datetime.now())
+            for i in range(2)
+        ]
+        assert metrics[0].metric_name is not metrics[1].metric_name
+        
+        self.collector.store_metrics(metrics)
+        
+        stored = self.collector._metrics_storage["test_router"]
+        assert stored[0].device_id is stored[1].device_id
+        assert stored[0].metric_name is stored[1].metric_name
+        assert stored[0].unit is stored[1].unit
+    
+    def test_store_metrics_drops_oldest_over_limit(self):
+        """Test that per-device history is capped, keeping the newest metrics."""
+        collector = MonitoringCollector(max_metrics_per_device=3)
+        now = datetime.now()
+        
+        collector.store_metrics([
+            MetricData("test_router", MetricType.CPU, "cpu_util", float(i), "%",
+                       now - timedelta(minutes=10 - i))
+            for i in range(5)
+        ])
+        collector.store_metrics([
+            MetricData("other_router", MetricType.CPU, "cpu_util", 1.0, "%", now)
+        ])
+        
+        assert [m.value for m in collector._metrics_storage["test_router"]] == [2.0, 3.0, 4.0]
+        assert len(collector._metric_timestamps["test_router"]) == 3
+        assert len(collector._metrics_storage["other_router"]) == 1
+    
+    def test_store_metric_values(self):
+        """Test storing several readings from one device in a single call."""
+        timestamp = datetime.now()
+        
+        result = self.collector.store_metric_values(
+            "test_router", MetricType.INTERFACE,
+            {"eth0_utilization": 12.5, "eth1_utilization": 40.0}, "percent", timestamp
+        )
+        
+        assert result is True
+        stored = self.collector._metrics_storage["test_router"]
+        assert [(m.metric_name, m.value) for m in stored] == [
+            ("eth0_utilization", 12.5), ("eth1_utilization", 40.0)
+        ]
+        assert all(m.metric_type == MetricType.INTERFACE and m.timestamp == timestamp for m in stored)
+        assert self.collector.get_historical_metrics("test_router", MetricType.INTERFACE) == stored[::-1]
+        assert self.collector.store_metric_values("test_router", MetricType.CPU, {}, "percent") is True
     
     def test_store_metrics_empty_list(self):
         """Test metrics storage with empty list."""
@@ -210,7 +394,7 @@ GigabitEthernet0/0 is up, line protocol is up
         ]
         
         # Store test metrics
-        self.collector._metrics_storage = test_metrics
+        self.collector.store_metrics(test_metrics)
         
         # Test retrieval for specific device (24 hours back)
         metrics = self.collector.get_historical_metrics("test_router", hours_back=24)
@@ -225,6 +409,20 @@ GigabitEthernet0/0 is up, line protocol is up
         assert len(cpu_metrics) == 1
         assert cpu_metrics[0].metric_type == MetricType.CPU
     
+    def test_get_historical_metrics_out_of_order(self):
+        """Test that late-arriving metrics are returned newest first."""
+        now = datetime.now()
+        timestamps = [now - timedelta(hours=hours) for hours in (1, 3, 30, 2)]
+        
+        self.collector.store_metrics([
+            MetricData("test_router", MetricType.CPU, "cpu_util", float(i), "%", timestamp)
+            for i, timestamp in enumerate(timestamps)
+        ])
+        
+        metrics = self.collector.get_historical_metrics("test_router", hours_back=24)
+        
+        assert [m.value for m in metrics] == [0.0, 3.0, 1.0]
+    
     def test_get_historical_metrics_no_data(self):
         """Test historical metrics retrieval with no data."""
         metrics = self.collector.get_historical_metrics("nonexistent_device")
@@ -382,6 +580,14 @@ GigabitEthernet0/0 is up, line protocol is up
         assert metric.timestamp == timestamp
         assert metric.metadata["interface"] == "eth0"
     
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="dataclass slots need Python 3.10+")
+    def test_metric_data_uses_slots(self):
+        """Test that metric records do not carry a per-instance __dict__."""
+        metric = MetricData("test_device", MetricType.CPU, "cpu_util", 10.0, "%", datetime.now())
+        
+        assert not hasattr(metric, '__dict__')
+        assert metric.metadata is None
+    
     def test_interface_metrics_creation(self):
         """Test InterfaceMetrics object creation."""
         timestamp = datetime.now()